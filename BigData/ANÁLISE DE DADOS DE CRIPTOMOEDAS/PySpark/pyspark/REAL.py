@@ -1,13 +1,17 @@
 import os
 import time
-import glob
 import sys
+from pathlib import Path
 import pandas as pd
 from pyspark.sql import SparkSession
 from pyspark.sql.functions import col, from_unixtime
 import pyspark.sql.functions as F
 from pyspark.sql.types import TimestampType, LongType
 
+# Catálogo de pares fica na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from catalogo_pares import CatalogoPares
+
 # ==============================================================================
 # 1. CONFIGURAÇÃO DO SPARK (SIMPLIFICADA)
 # ==============================================================================
@@ -70,7 +74,15 @@ PASTA_ENTRADA = r"C:\Users\eopab\Downloads\CRIPTO\DADOS_CRIPTO_BRL"
 PASTA_SAIDA = r"C:\Users\eopab\Downloads\CRIPTO\DADOS_CRIPTO_BRL\tratados_pyspark_hibrido_final" # Nova pasta
 os.makedirs(PASTA_SAIDA, exist_ok=True)
 
-arquivos_para_processar = glob.glob(os.path.join(PASTA_ENTRADA, "*.parquet"))
+# Filtros de pares (None = sem filtro). Ex: QUOTES_FILTRO = ['BRL'], REGEX_FILTRO = r'^(BTC|ETH)-'
+MOEDAS_FILTRO = None
+QUOTES_FILTRO = None
+REGEX_FILTRO = None
+
+catalogo = CatalogoPares(PASTA_ENTRADA, extensao='.parquet')
+arquivos_para_processar = catalogo.selecionar(
+    moedas=MOEDAS_FILTRO, quotes=QUOTES_FILTRO, regex=REGEX_FILTRO
+)
 if not arquivos_para_processar:
     print(f"ERRO: Nenhum arquivo Parquet encontrado em {PASTA_ENTRADA}")
     spark.stop()
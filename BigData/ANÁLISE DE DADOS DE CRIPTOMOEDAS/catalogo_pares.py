@@ -0,0 +1,153 @@
+import os
+import re
+from typing import NamedTuple
+
+# --- CONFIGURAÇÕES DO CATÁLOGO ---
+# Padrão dos arquivos da Binance/Kaggle: BASE-QUOTE.parquet, BASE-QUOTE-tratado.csv, ...
+PADRAO_ARQUIVO = re.compile(r'^(?P<base>[A-Z0-9]+)-(?P<quote>[A-Z0-9]+)$')
+SUFIXO_TRATADO = '-TRATADO'
+
+# Usadas apenas quando o nome vem sem hífen (ex: 'BTCUSDT-tratado.csv')
+QUOTES_CONHECIDAS = ['USDT', 'BUSD', 'USDC', 'TUSD', 'BRL', 'EUR', 'BTC', 'ETH', 'BNB']
+
+
+class ParMoeda(NamedTuple):
+    base: str
+    quote: str
+    caminho: str
+
+    @property
+    def simbolo(self):
+        return f"{self.base}{self.quote}"
+
+
+def interpretar_nome_arquivo(nome_arquivo):
+    """
+    Extrai (base, quote) do nome de um arquivo de kline.
+    Retorna None quando o nome não segue nenhum dos formatos conhecidos.
+    """
+    radical = os.path.splitext(os.path.basename(nome_arquivo))[0].upper()
+    if radical.endswith(SUFIXO_TRATADO):
+        radical = radical[:-len(SUFIXO_TRATADO)]
+
+    match = PADRAO_ARQUIVO.match(radical)
+    if match:
+        return match.group('base'), match.group('quote')
+
+    # Formato colado (ex: BTCUSDT): tenta as quotes conhecidas
+    if '-' in radical:
+        return None
+    for quote in QUOTES_CONHECIDAS:
+        if radical.endswith(quote) and len(radical) > len(quote):
+            return radical[:-len(quote)], quote
+    return None
+
+
+class CatalogoPares:
+    """
+    Catálogo dos pares disponíveis em uma pasta, montado só a partir dos nomes
+    dos arquivos (nenhum arquivo é aberto). Os índices por base e por quote são
+    dicionários, então cada consulta é O(1); o catálogo só é refeito quando o
+    mtime da pasta muda (arquivo adicionado, removido ou renomeado).
+    """
+
+    def __init__(self, pasta, extensao='.parquet'):
+        self.pasta = pasta
+        self.extensao = extensao.lower()
+        self._mtime = None
+        self._pares = {}
+        self._por_base = {}
+        self._por_quote = {}
+        self._cache_regex = {}
+        self.ignorados = []
+        self.atualizar()
+
+    def atualizar(self, forcar=False):
+        """Reconstrói os índices se a pasta mudou. Retorna True se houve releitura."""
+        try:
+            mtime = os.stat(self.pasta).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if not forcar and mtime == self._mtime:
+            return False
+
+        pares, por_base, por_quote, ignorados = {}, {}, {}, []
+        if mtime is not None:
+            with os.scandir(self.pasta) as entradas:
+                for entrada in entradas:
+                    if not entrada.is_file() or not entrada.name.lower().endswith(self.extensao):
+                        continue
+                    base_quote = interpretar_nome_arquivo(entrada.name)
+                    if base_quote is None:
+                        ignorados.append(entrada.name)
+                        continue
+                    par = ParMoeda(base_quote[0], base_quote[1], entrada.path)
+                    pares[entrada.path] = par
+                    por_base.setdefault(par.base, set()).add(entrada.path)
+                    por_quote.setdefault(par.quote, set()).add(entrada.path)
+
+        self._mtime = mtime
+        self._pares = pares
+        self._por_base = por_base
+        self._por_quote = por_quote
+        self._cache_regex = {}
+        self.ignorados = ignorados
+        return True
+
+    def __len__(self):
+        self.atualizar()
+        return len(self._pares)
+
+    def __iter__(self):
+        self.atualizar()
+        return iter(sorted(self._pares.values(), key=lambda par: par.caminho))
+
+    def par(self, caminho):
+        """Retorna o ParMoeda de um arquivo do catálogo (ou None)."""
+        self.atualizar()
+        return self._pares.get(caminho)
+
+    def por_base(self, base):
+        self.atualizar()
+        return set(self._por_base.get(base.upper(), ()))
+
+    def por_quote(self, quote):
+        self.atualizar()
+        return set(self._por_quote.get(quote.upper(), ()))
+
+    def por_regex(self, padrao):
+        """Seleciona pelos símbolos (BASE-QUOTE) que casam com o regex. O resultado fica em cache."""
+        self.atualizar()
+        if padrao not in self._cache_regex:
+            regex = re.compile(padrao, re.IGNORECASE)
+            self._cache_regex[padrao] = {
+                caminho for caminho, par in self._pares.items()
+                if regex.search(f"{par.base}-{par.quote}")
+            }
+        return set(self._cache_regex[padrao])
+
+    def envolvendo(self, moedas):
+        """Pares em que alguma das moedas aparece como base OU como quote."""
+        selecionados = set()
+        for moeda in moedas:
+            selecionados |= self.por_base(moeda)
+            selecionados |= self.por_quote(moeda)
+        return selecionados
+
+    def selecionar(self, moedas=None, bases=None, quotes=None, regex=None):
+        """
+        Combina os filtros (interseção). Filtros None são ignorados; sem nenhum
+        filtro, retorna todos os arquivos do catálogo. A saída vem ordenada.
+        """
+        self.atualizar()
+        selecionados = set(self._pares)
+        if moedas is not None:
+            selecionados &= self.envolvendo(moedas)
+        if bases is not None:
+            selecionados &= set().union(*(self.por_base(b) for b in bases))
+        if quotes is not None:
+            selecionados &= set().union(*(self.por_quote(q) for q in quotes))
+        if regex is not None:
+            selecionados &= self.por_regex(regex)
+        return sorted(selecionados)
@@ -1,9 +1,14 @@
 import os
-import glob
+import sys
+from pathlib import Path
 import pandas as pd
-from sqlalchemy import create_engine, types
+from sqlalchemy import create_engine, inspect, text, types
 import time
 
+# Catálogo de pares fica na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from catalogo_pares import CatalogoPares
+
 # --- CONFIGURAÇÕES DE BANCO DE DADOS (POSTGRESQL) ---
 # **ATENÇÃO: Mantenha estas credenciais em segredo em um projeto real.**
 DB_USER = "postgres"      # Seu usuário do PostgreSQL
@@ -16,21 +21,77 @@ TABLE_NAME = "dados_kline_30min"       # Nome da tabela que será criada
 # --- CONFIGURAÇÕES DE PASTAS ---
 # Pasta onde estão os CSVs gerados pelo script anterior
 PASTA_ENTRADA = r"C:\Users\eopab\Downloads\CRIPTO\tratamento\dados" 
+# Filtro de pares a carregar (None = todos). Ex: ['BTC', 'ETH']
+MOEDAS_FILTRO = None
 
 # --- CONEXÃO COM O BANCO DE DADOS ---
 # String de conexão usando SQLAlchemy
 DB_URL = f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-try:
-    engine = create_engine(DB_URL)
-    print(f"✅ Conexão com o banco de dados {DB_NAME} estabelecida.")
-except Exception as e:
-    print(f"❌ ERRO ao conectar ao banco de dados: {e}")
-    print("Verifique se o PostgreSQL está rodando, se as credenciais estão corretas e se o banco de dados existe.")
-    exit()
+
+# Cria um dicionário de tipos para forçar o PostgreSQL a aceitar float para valores
+# e Timestamp para a coluna de tempo
+DTYPE_MAP = {
+    'open_time': types.DateTime(),
+    'open': types.Float(precision=10),
+    'high': types.Float(precision=10),
+    'low': types.Float(precision=10),
+    'close': types.Float(precision=10),
+    'volume': types.Float(precision=10),
+    'quote_asset_volume': types.Float(precision=10),
+    'number_of_trades': types.BigInteger(),
+    'taker_buy_base_asset_volume': types.Float(precision=10),
+    'taker_buy_quote_asset_volume': types.Float(precision=10),
+    'symbol': types.String(length=15)
+}
+
+def criar_engine(db_url=DB_URL):
+    """Cria o engine do SQLAlchemy. Encerra o script se a conexão falhar."""
+    try:
+        engine = create_engine(db_url)
+        print(f"✅ Conexão com o banco de dados {engine.url.database} estabelecida.")
+        return engine
+    except Exception as e:
+        print(f"❌ ERRO ao conectar ao banco de dados: {e}")
+        print("Verifique se o PostgreSQL está rodando, se as credenciais estão corretas e se o banco de dados existe.")
+        exit()
+
+def carregar_csv(arquivo, engine, symbol, substituir=False):
+    """
+    Insere um CSV tratado na tabela e retorna o número de linhas.
+    Com substituir=True, as linhas anteriores do mesmo símbolo são apagadas na
+    mesma transação, o que torna a carga idempotente (usado pelo orquestrador).
+    """
+    # 1. Leitura do CSV
+    # O índice 'open_time' é lido como a coluna de data
+    df = pd.read_csv(arquivo, index_col=0) 
+    df.index.name = 'open_time'
+    df['symbol'] = symbol
+    
+    # 2. Mapeamento de Tipos e Limpeza Final
+    
+    # Garante que o índice (open_time) é um objeto datetime
+    df.index = pd.to_datetime(df.index, errors='coerce')
+    
+    # 3. Inserção no PostgreSQL
+    # 'if_exists='append'' garante que os dados de cada CSV sejam adicionados à mesma tabela.
+    # 'index=True' salva o índice 'open_time' como uma coluna no banco.
+    with engine.begin() as conn:
+        if substituir and inspect(conn).has_table(TABLE_NAME):
+            conn.execute(text(f'DELETE FROM {TABLE_NAME} WHERE symbol = :symbol'), {'symbol': symbol})
+        df.to_sql(
+            name=TABLE_NAME, 
+            con=conn, 
+            if_exists='append', 
+            index=True, 
+            dtype=DTYPE_MAP, # Mapeamento de tipos para resolver o OperationalError
+        )
+    return len(df)
 
 def carregar_csv_para_postgres():
     """Lê todos os CSVs da pasta de entrada e insere na tabela PostgreSQL."""
-    arquivos_csv = glob.glob(os.path.join(PASTA_ENTRADA, "*.csv"))
+    engine = criar_engine()
+    catalogo = CatalogoPares(PASTA_ENTRADA, extensao='.csv')
+    arquivos_csv = catalogo.selecionar(moedas=MOEDAS_FILTRO)
     
     if not arquivos_csv:
         print(f"ERRO: Nenhum arquivo .csv encontrado na pasta: {PASTA_ENTRADA}")
@@ -45,50 +106,13 @@ def carregar_csv_para_postgres():
         print(f"[{i+1}/{len(arquivos_csv)}] Lendo e Inserindo: {nome_arquivo}")
         
         try:
-            # 1. Leitura do CSV
-            # O índice 'open_time' é lido como a coluna de data
-            df = pd.read_csv(arquivo, index_col=0) 
-            df.index.name = 'open_time'
-            
             # Adicionar a coluna 'symbol' para identificar o par de moedas
-            # Ex: 'BTCUSDT-tratado.csv' -> 'BTCUSDT'
-            symbol = nome_arquivo.split('-tratado.csv')[0].replace('-', '').upper()
-            df['symbol'] = symbol
-            
-            # 2. Mapeamento de Tipos e Limpeza Final
-            
-            # Garante que o índice (open_time) é um objeto datetime
-            df.index = pd.to_datetime(df.index, errors='coerce')
-
-            # Cria um dicionário de tipos para forçar o PostgreSQL a aceitar float para valores
-            # e Timestamp para a coluna de tempo
-            dtype_map = {
-                'open_time': types.DateTime(),
-                'open': types.Float(precision=10),
-                'high': types.Float(precision=10),
-                'low': types.Float(precision=10),
-                'close': types.Float(precision=10),
-                'volume': types.Float(precision=10),
-                'quote_asset_volume': types.Float(precision=10),
-                'number_of_trades': types.BigInteger(),
-                'taker_buy_base_asset_volume': types.Float(precision=10),
-                'taker_buy_quote_asset_volume': types.Float(precision=10),
-                'symbol': types.String(length=15)
-            }
-            
-            # 3. Inserção no PostgreSQL
-            # 'if_exists='append'' garante que os dados de cada CSV sejam adicionados à mesma tabela.
-            # 'index=True' salva o índice 'open_time' como uma coluna no banco.
-            df.to_sql(
-                name=TABLE_NAME, 
-                con=engine, 
-                if_exists='append', 
-                index=True, 
-                dtype=dtype_map, # Mapeamento de tipos para resolver o OperationalError
-            )
+            # Ex: 'BTC-USDT-tratado.csv' -> 'BTCUSDT' (o catálogo já interpretou o nome)
+            symbol = catalogo.par(arquivo).simbolo
+            linhas = carregar_csv(arquivo, engine, symbol)
             
             contador_sucesso += 1
-            print(f"✅ Inserção de {len(df)} linhas bem-sucedida.")
+            print(f"✅ Inserção de {linhas} linhas bem-sucedida.")
             
         except Exception as e:
             # Imprime o erro detalhado para debugging
@@ -0,0 +1,205 @@
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Os scripts das etapas ficam em pastas com hífen (não importáveis como pacote)
+RAIZ_PROJETO = Path(__file__).resolve().parent
+sys.path.insert(0, str(RAIZ_PROJETO))
+sys.path.insert(0, str(RAIZ_PROJETO / "tratamento-pandas" / "filtragem"))
+sys.path.insert(0, str(RAIZ_PROJETO / "nuvem"))
+
+from catalogo_pares import CatalogoPares
+import filtragem
+
+# ==============================================================================
+# ORQUESTRADOR DO PIPELINE: catálogo -> agregação (Pandas) -> carga (PostgreSQL)
+# ==============================================================================
+# Cada arquivo percorre o DAG  agregar -> carregar. A carga do arquivo N roda em
+# uma thread separada enquanto o arquivo N+1 é agregado. Ao fim de cada etapa o
+# checkpoint (JSON) é gravado de forma atômica; ao reiniciar, etapas já
+# concluídas para a mesma versão do arquivo (tamanho + mtime) são puladas.
+
+ETAPAS = ('agregar', 'carregar')
+NOME_CHECKPOINT = '.checkpoint_pipeline.json'
+
+
+def assinatura_arquivo(caminho):
+    """Identifica a versão de um arquivo de entrada (muda se ele for substituído)."""
+    info = os.stat(caminho)
+    return [info.st_size, info.st_mtime_ns]
+
+
+class Checkpoint:
+    """
+    Estado por arquivo e por etapa, persistido a cada atualização.
+
+    As chaves são os caminhos absolutos dos arquivos: o mesmo arquivo passado
+    como caminho relativo ou absoluto é retomado do mesmo registro.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self.estado = {}
+        self.executadas = set()  # (arquivo, etapa) que rodaram nesta execução (não retomadas)
+        if os.path.exists(caminho):
+            with open(caminho, encoding='utf-8') as f:
+                self.estado = json.load(f)
+
+    def registro(self, arquivo):
+        """Registro do arquivo, descartado se o arquivo de entrada mudou desde a última execução."""
+        assinatura = assinatura_arquivo(arquivo)
+        arquivo = os.path.abspath(arquivo)
+        with self._lock:
+            registro = self.estado.get(arquivo)
+            if registro is None or registro.get('assinatura') != assinatura:
+                registro = {'assinatura': assinatura, 'etapas': {}}
+                self.estado[arquivo] = registro
+            return registro
+
+    def concluida(self, arquivo, etapa):
+        return self.estado.get(os.path.abspath(arquivo), {}).get('etapas', {}).get(etapa, {}).get('status') == 'ok'
+
+    def marcar(self, arquivo, etapa, **dados):
+        arquivo = os.path.abspath(arquivo)
+        with self._lock:
+            self.estado[arquivo]['etapas'][etapa] = dados
+            self.executadas.add((arquivo, etapa))
+            self._salvar()
+
+    def etapa(self, arquivo, etapa):
+        """Dados gravados da etapa do arquivo (dict vazio se ela nunca rodou)."""
+        return self.estado.get(os.path.abspath(arquivo), {}).get('etapas', {}).get(etapa, {})
+
+    def _salvar(self):
+        # Grava em arquivo temporário e troca, para não corromper em caso de queda
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.estado, f, indent=2, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+
+
+def executar_etapa(checkpoint, arquivo, etapa, funcao):
+    """Executa uma etapa, cronometra e grava o resultado no checkpoint. Retorna o resultado ou None."""
+    inicio = time.perf_counter()
+    try:
+        resultado = funcao()
+    except Exception as e:
+        segundos = time.perf_counter() - inicio
+        checkpoint.marcar(arquivo, etapa, status='falha', erro=str(e), segundos=segundos)
+        print(f"❌ FALHA na etapa '{etapa}' de {os.path.basename(arquivo)}: {e}")
+        return None
+    segundos = time.perf_counter() - inicio
+    checkpoint.marcar(arquivo, etapa, status='ok', resultado=resultado, segundos=segundos)
+    print(f"✅ {etapa} de {os.path.basename(arquivo)} em {segundos:.2f}s")
+    return resultado
+
+
+def resumo_tempos(checkpoint, arquivos):
+    """
+    Soma e média dos tempos das etapas que rodaram nesta execução. Etapas
+    retomadas do checkpoint só são contadas (o tempo delas é de execuções anteriores).
+    """
+    print("\n=== TEMPOS POR ETAPA ===")
+    for etapa in ETAPAS:
+        tempos, retomadas = [], 0
+        for arquivo in arquivos:
+            if (os.path.abspath(arquivo), etapa) in checkpoint.executadas:
+                tempos.append(checkpoint.etapa(arquivo, etapa)['segundos'])
+            elif checkpoint.concluida(arquivo, etapa):
+                retomadas += 1
+        linha = f"  {etapa:<9} arquivos={len(tempos):<5}"
+        if tempos:
+            linha += f" total={sum(tempos):.2f}s media={sum(tempos) / len(tempos):.2f}s"
+        if retomadas:
+            linha += f" retomadas={retomadas}"
+        if tempos or retomadas:
+            print(linha)
+
+
+def executar_pipeline(pasta_entrada, pasta_saida, moedas=None, db_url=None,
+                      carregar=True, refazer=False, caminho_checkpoint=None):
+    """Roda o DAG agregar -> carregar sobre os arquivos selecionados pelo catálogo."""
+    os.makedirs(pasta_saida, exist_ok=True)
+    checkpoint = Checkpoint(caminho_checkpoint or os.path.join(pasta_saida, NOME_CHECKPOINT))
+    if refazer:
+        checkpoint.estado = {}
+
+    catalogo = CatalogoPares(pasta_entrada, extensao='.parquet')
+    arquivos = catalogo.selecionar(moedas=moedas)
+    if not arquivos:
+        print(f"ERRO: Nenhum arquivo .parquet selecionado na pasta: {pasta_entrada}")
+        return checkpoint
+
+    engine = None
+    if carregar:
+        import postgres
+        engine = postgres.criar_engine(db_url or postgres.DB_URL)
+
+    print(f"Iniciando pipeline em {len(arquivos)} de {len(catalogo)} arquivos...")
+    inicio_total = time.perf_counter()
+
+    # Uma única thread de carga: preserva a ordem de inserção e sobrepõe com a agregação
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='carga') as executor:
+        for i, arquivo in enumerate(arquivos):
+            nome_arquivo = os.path.basename(arquivo)
+            registro = checkpoint.registro(arquivo)
+            print(f"[{i+1}/{len(arquivos)}] {nome_arquivo}")
+
+            if checkpoint.concluida(arquivo, 'agregar') and os.path.exists(registro['etapas']['agregar']['resultado']):
+                caminho_csv = registro['etapas']['agregar']['resultado']
+                print(f"    [RETOMADA] agregação já concluída: {caminho_csv}")
+            else:
+                caminho_csv = executar_etapa(
+                    checkpoint, arquivo, 'agregar',
+                    lambda: filtragem.processar_parquet(arquivo, pasta_saida=pasta_saida)
+                )
+                if caminho_csv is None:
+                    continue
+
+            if not carregar:
+                continue
+            if checkpoint.concluida(arquivo, 'carregar'):
+                print("    [RETOMADA] carga já concluída")
+                continue
+
+            symbol = catalogo.par(arquivo).simbolo
+            executor.submit(
+                executar_etapa, checkpoint, arquivo, 'carregar',
+                lambda csv=caminho_csv, s=symbol: postgres.carregar_csv(csv, engine, s, substituir=True)
+            )
+
+    print(f"\n=== PIPELINE CONCLUÍDO em {time.perf_counter() - inicio_total:.2f}s ===")
+    resumo_tempos(checkpoint, arquivos)
+    return checkpoint
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pipeline de criptomoedas com checkpoint e retomada.")
+    parser.add_argument('--entrada', default=filtragem.PASTA_ENTRADA, help="Pasta com os parquet de 1 minuto")
+    parser.add_argument('--saida', default=filtragem.PASTA_SAIDA, help="Pasta dos CSVs agregados em 30 minutos")
+    parser.add_argument('--moedas', nargs='*', default=filtragem.MOEDAS_FILTRO,
+                        help="Moedas (base ou quote) a processar. Sem valores = todas")
+    parser.add_argument('--db-url', default=None, help="URL SQLAlchemy do banco (padrão: postgres.DB_URL)")
+    parser.add_argument('--sem-carga', action='store_true', help="Executa apenas a agregação")
+    parser.add_argument('--refazer', action='store_true', help="Ignora o checkpoint e refaz tudo")
+    parser.add_argument('--checkpoint', default=None, help="Caminho do arquivo de checkpoint")
+    args = parser.parse_args(argv)
+
+    executar_pipeline(
+        args.entrada, args.saida,
+        moedas=args.moedas or None,
+        db_url=args.db_url,
+        carregar=not args.sem_carga,
+        refazer=args.refazer,
+        caminho_checkpoint=args.checkpoint,
+    )
+
+
+if __name__ == "__main__":
+    main()
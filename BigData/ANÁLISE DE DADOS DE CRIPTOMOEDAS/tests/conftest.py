@@ -0,0 +1,10 @@
+"""
+Configuração de fixtures para pytest
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
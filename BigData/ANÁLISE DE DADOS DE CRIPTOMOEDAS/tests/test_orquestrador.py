@@ -0,0 +1,147 @@
+"""
+Testes para orquestrador.py (agregação e carga substituídas por funções falsas)
+"""
+
+import os
+import sys
+import types
+import pytest
+import orquestrador
+
+
+@pytest.fixture
+def pastas(tmp_path):
+    """Pasta de entrada com dois parquet (conteúdo irrelevante) e pasta de saída"""
+    entrada, saida = tmp_path / "entrada", tmp_path / "saida"
+    entrada.mkdir()
+    for nome in ("BTC-USDT.parquet", "ETH-USDT.parquet"):
+        (entrada / nome).write_bytes(b"parquet")
+    return entrada, saida
+
+
+@pytest.fixture
+def agregacoes(monkeypatch):
+    """Substitui filtragem.processar_parquet: grava um CSV vazio e registra o arquivo"""
+    chamadas = []
+
+    def processar(arquivo, pasta_saida):
+        chamadas.append(os.path.basename(arquivo))
+        caminho = os.path.join(pasta_saida, os.path.basename(arquivo) + "-tratado.csv")
+        open(caminho, 'w').close()
+        return caminho
+
+    monkeypatch.setattr(orquestrador.filtragem, "processar_parquet", processar)
+    return chamadas
+
+
+@pytest.fixture
+def cargas(monkeypatch):
+    """Módulo postgres falso: registra os símbolos carregados"""
+    chamadas = []
+    postgres = types.SimpleNamespace(
+        DB_URL="postgresql://teste",
+        criar_engine=lambda url: object(),
+        carregar_csv=lambda csv, engine, simbolo, substituir: chamadas.append(simbolo),
+    )
+    monkeypatch.setitem(sys.modules, "postgres", postgres)
+    return chamadas
+
+
+def executar(entrada, saida, **kwargs):
+    kwargs.setdefault('carregar', False)
+    return orquestrador.executar_pipeline(str(entrada), str(saida), moedas=None, **kwargs)
+
+
+class TestRetomada:
+    """Testes do checkpoint: retomada, etapas puladas e invalidação"""
+
+    def test_segunda_execucao_pula_tudo(self, pastas, agregacoes, cargas):
+        entrada, saida = pastas
+        executar(entrada, saida, carregar=True)
+        assert sorted(agregacoes) == ["BTC-USDT.parquet", "ETH-USDT.parquet"]
+        assert sorted(cargas) == ["BTCUSDT", "ETHUSDT"]
+
+        checkpoint = executar(entrada, saida, carregar=True)
+        assert len(agregacoes) == 2 and len(cargas) == 2
+        assert checkpoint.executadas == set()
+
+    def test_retoma_a_carga_que_falhou(self, pastas, agregacoes, monkeypatch):
+        entrada, saida = pastas
+        falhar = [True]
+        carregados = []
+
+        def carregar_csv(csv, engine, simbolo, substituir):
+            if falhar[0] and simbolo == "ETHUSDT":
+                raise ConnectionError("banco fora do ar")
+            carregados.append(simbolo)
+
+        monkeypatch.setitem(sys.modules, "postgres", types.SimpleNamespace(
+            DB_URL="postgresql://teste", criar_engine=lambda url: object(), carregar_csv=carregar_csv))
+        executar(entrada, saida, carregar=True)
+        assert carregados == ["BTCUSDT"]
+
+        falhar[0] = False
+        executar(entrada, saida, carregar=True)
+        # Só a carga que falhou roda de novo; a agregação vem do checkpoint
+        assert carregados == ["BTCUSDT", "ETHUSDT"]
+        assert len(agregacoes) == 2
+
+    def test_arquivo_alterado_roda_de_novo(self, pastas, agregacoes):
+        entrada, saida = pastas
+        executar(entrada, saida)
+        (entrada / "BTC-USDT.parquet").write_bytes(b"parquet com mais linhas")
+        executar(entrada, saida)
+        assert sorted(agregacoes) == ["BTC-USDT.parquet", "BTC-USDT.parquet", "ETH-USDT.parquet"]
+
+    def test_mtime_alterado_roda_de_novo(self, pastas, agregacoes):
+        entrada, saida = pastas
+        executar(entrada, saida)
+        arquivo = entrada / "ETH-USDT.parquet"
+        info = os.stat(arquivo)
+        os.utime(arquivo, ns=(info.st_atime_ns, info.st_mtime_ns + 1_000_000_000))
+        executar(entrada, saida)
+        assert agregacoes.count("ETH-USDT.parquet") == 2
+
+    def test_csv_apagado_refaz_a_agregacao(self, pastas, agregacoes):
+        entrada, saida = pastas
+        executar(entrada, saida)
+        os.remove(saida / "BTC-USDT.parquet-tratado.csv")
+        executar(entrada, saida)
+        assert agregacoes.count("BTC-USDT.parquet") == 2
+
+    def test_refazer_ignora_o_checkpoint(self, pastas, agregacoes):
+        entrada, saida = pastas
+        executar(entrada, saida)
+        executar(entrada, saida, refazer=True)
+        assert len(agregacoes) == 4
+
+    def test_caminho_relativo_e_absoluto(self, pastas, agregacoes, monkeypatch):
+        entrada, saida = pastas
+        monkeypatch.chdir(entrada.parent)
+        executar("entrada", saida)
+        executar(entrada, saida)
+        assert len(agregacoes) == 2
+        checkpoint = orquestrador.Checkpoint(str(saida / orquestrador.NOME_CHECKPOINT))
+        assert all(os.path.isabs(arquivo) for arquivo in checkpoint.estado)
+
+
+class TestResumoTempos:
+    """Testes do resumo: só conta tempo das etapas que rodaram nesta execução"""
+
+    def test_retomadas_nao_somam_tempo(self, pastas, agregacoes, capsys):
+        entrada, saida = pastas
+        executar(entrada, saida)
+        (entrada / "BTC-USDT.parquet").write_bytes(b"nova versao")
+        capsys.readouterr()
+
+        executar(entrada, saida)
+        linha = next(l for l in capsys.readouterr().out.splitlines() if l.strip().startswith("agregar"))
+        assert "arquivos=1 " in linha
+        assert "retomadas=1" in linha
+
+    def test_executadas_da_execucao(self, pastas, agregacoes):
+        entrada, saida = pastas
+        checkpoint = executar(entrada, saida)
+        assert checkpoint.executadas == {
+            (str(entrada / nome), 'agregar') for nome in ("BTC-USDT.parquet", "ETH-USDT.parquet")
+        }
@@ -1,11 +1,15 @@
 import os
-import glob
+import sys
+from pathlib import Path
 import pandas as pd
 
+# Catálogo de pares fica na raiz do projeto
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from catalogo_pares import CatalogoPares
+
 # --- CONFIGURAÇÃO DE PASTAS ---
 PASTA_ENTRADA = r"C:\Users\eopab\Downloads\CRIPTO\DadosCripto"
 PASTA_SAIDA = r"C:\Users\eopab\Downloads\CRIPTO\tratamento\dados"
-os.makedirs(PASTA_SAIDA, exist_ok=True)
 
 # --- CONFIGURAÇÕES DE DADOS ---
 POSSIVEIS_TS_COLUNAS = [
@@ -26,7 +30,7 @@ COLUNAS_AGREGADAS = {
 }
 
 MOEDAS_FILTRO = ['BTC', 'ETH']
-INTERVALO_MINUTOS = '30T'
+INTERVALO_MINUTOS = '30min'
 
 def encontrar_coluna_ts(df, colunas_disponiveis):
     for col in POSSIVEIS_TS_COLUNAS:
@@ -37,7 +41,8 @@ def encontrar_coluna_ts(df, colunas_disponiveis):
             return col
     return None
 
-def processar_parquet(filepath):
+def processar_parquet(filepath, pasta_saida=PASTA_SAIDA):
+    """Agrega um parquet de 1 min em 30 min e grava o CSV tratado. Retorna o caminho de saída."""
     nome_arquivo = os.path.basename(filepath)
     print(f"--- Processando {nome_arquivo} ---")
     
@@ -69,29 +74,35 @@ def processar_parquet(filepath):
     
     # 5. Saída
     nome_saida = os.path.splitext(nome_arquivo)[0] + "-tratado.csv"
-    caminho_saida = os.path.join(PASTA_SAIDA, nome_saida)
+    caminho_saida = os.path.join(pasta_saida, nome_saida)
     df_agg.to_csv(caminho_saida, index=True)
     
     print(f"✅ Arquivo salvo em: {caminho_saida} | Linhas: {len(df_agg)}")
     print(df_agg.head())
+    return caminho_saida
 
 # --- LOOP PRINCIPAL ---
-arquivos_parquet = glob.glob(os.path.join(PASTA_ENTRADA, "*.parquet"))
+def main():
+    os.makedirs(PASTA_SAIDA, exist_ok=True)
+
+    # Seleção pelo nome do par (base OU quote em MOEDAS_FILTRO), sem abrir os arquivos
+    catalogo = CatalogoPares(PASTA_ENTRADA, extensao='.parquet')
+    arquivos_parquet = catalogo.selecionar(moedas=MOEDAS_FILTRO)
 
-if not arquivos_parquet:
-    print(f"ERRO: Nenhum arquivo .parquet encontrado na pasta: {PASTA_ENTRADA}")
-else:
-    print(f"Iniciando processamento em {len(arquivos_parquet)} arquivos...")
-    for arquivo in arquivos_parquet:
-        nome_arquivo = os.path.basename(arquivo).upper()
-        if not any(moeda in nome_arquivo for moeda in MOEDAS_FILTRO):
-            continue
-        try:
-            processar_parquet(arquivo)
-        except ValueError as ve:
-            print(f"❌ FALHA no arquivo {os.path.basename(arquivo)}: {ve}")
-        except Exception as e:
-            print(f"❌ FALHA crítica no arquivo {os.path.basename(arquivo)}: {e}")
+    if not arquivos_parquet:
+        print(f"ERRO: Nenhum arquivo .parquet de {MOEDAS_FILTRO} encontrado na pasta: {PASTA_ENTRADA}")
+    else:
+        print(f"Iniciando processamento em {len(arquivos_parquet)} de {len(catalogo)} arquivos...")
+        for arquivo in arquivos_parquet:
+            try:
+                processar_parquet(arquivo)
+            except ValueError as ve:
+                print(f"❌ FALHA no arquivo {os.path.basename(arquivo)}: {ve}")
+            except Exception as e:
+                print(f"❌ FALHA crítica no arquivo {os.path.basename(arquivo)}: {e}")
     
-    print("\n=== PROCESSAMENTO CONCLUÍDO ===")
+        print("\n=== PROCESSAMENTO CONCLUÍDO ===")
+
 
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,10 @@ from utils.qr_utils import (
     decode_qr_with_multiple_attempts,  # Import new function
     calculate_brightness  # Import brightness calculation
 )
-from utils.storage import save_receipt, is_duplicate, get_all_receipts
+from utils.storage import save_receipt, is_duplicate, get_all_receipts, key_filter
+from utils.frame_pipeline import FramePipeline
+from utils.motion_gate import MotionGate
+from utils.adaptive_throttle import AdaptiveThrottle
 
 st.set_page_config(
     page_title="Leitor QR Fiscal SEFAZ",
@@ -82,15 +85,12 @@ if 'last_captured_frame' not in st.session_state:
     st.session_state.last_captured_frame = None
 if 'capture_requested' not in st.session_state:
     st.session_state.capture_requested = False
-if 'saved_keys' not in st.session_state:
-    st.session_state.saved_keys = set()
-    # Load existing keys from CSV into session state
-    try:
-        df = get_all_receipts()
-        if not df.empty and 'access_key' in df.columns:
-            st.session_state.saved_keys = set(df['access_key'].values)
-    except Exception as e:
-        print(f"[v0] Erro ao carregar chaves existentes: {e}")
+# Keys already saved live in a Bloom filter shared by every session of the process
+# (utils/key_filter.py), confirmed against the SQLite key index on a hit
+try:
+    key_filter()
+except Exception as e:
+    print(f"[v0] Erro ao carregar chaves existentes: {e}")
 
 RTC_CONFIGURATION = RTCConfiguration(
     {"iceServers": [{"urls": ["stun:stun.l.google.com:19302"]}]}
@@ -107,17 +107,37 @@ def process_qr_fiscal(qr_data: str, source: str = "camera") -> tuple[bool, str]:
     Returns:
         Tupla (sucesso, mensagem)
     """
+    success, message, read = check_and_save_qr(qr_data, source)
+    if read:
+        add_last_read(read)
+    return success, message
+
+
+def add_last_read(read: dict):
+    """Adiciona uma leitura às 10 últimas da sessão (só na thread do Streamlit)"""
+    st.session_state.last_reads.insert(0, read)
+    st.session_state.last_reads = st.session_state.last_reads[:10]
+
+
+def check_and_save_qr(qr_data: str, source: str) -> tuple[bool, str, Optional[dict]]:
+    """
+    Valida e salva o cupom sem tocar no session_state (pode rodar fora da
+    thread do Streamlit, como no pipeline do vídeo)
+
+    Returns:
+        Tupla (sucesso, mensagem, leitura para a lista de últimas leituras ou None)
+    """
     access_key = extract_access_key(qr_data)
 
     if not access_key:
-        return False, "Nenhum QR detectado"
+        return False, "Nenhum QR detectado", None
 
     if not is_valid_access_key(access_key):
-        return False, f"Chave inválida: {access_key}"
+        return False, f"Chave inválida: {access_key}", None
 
-# Checa duplicata somente na lista de keys já salvas
-    if access_key in st.session_state.saved_keys:
-        return False, f"Cupom já lido anteriormente\nChave: {access_key[:20]}..."
+# Checa duplicata: filtro de Bloom primeiro, índice só quando o filtro acusa a chave
+    if key_filter().is_duplicate(access_key):
+        return False, f"Cupom já lido anteriormente\nChave: {access_key[:20]}...", None
 
 # Salva cupom
     success = save_receipt(
@@ -127,103 +147,163 @@ def process_qr_fiscal(qr_data: str, source: str = "camera") -> tuple[bool, str]:
 )
 
     if success:
-    # Adiciona à lista de chaves lidas apenas após salvar com sucesso
-        st.session_state.saved_keys.add(access_key)
-
-        st.session_state.last_reads.insert(0, {
+        read = {
             'key': access_key,
             'time': datetime.now().strftime('%H:%M:%S'),
             'source': source,
             'date': datetime.now().strftime('%d/%m/%Y')
-        })
-        st.session_state.last_reads = st.session_state.last_reads[:10]
-
-        return True, f"Chave fiscal extraída com sucesso\n\n{access_key}"
+        }
+        return True, f"Chave fiscal extraída com sucesso\n\n{access_key}", read
+    elif is_duplicate(access_key):
+        # Salva por outro processo depois que este carregou o filtro
+        key_filter().add(access_key)
+        return False, f"Cupom já lido anteriormente\nChave: {access_key[:20]}...", None
     else:
-        return False, "Erro ao salvar cupom"
+        return False, "Erro ao salvar cupom", None
 
 
 class VideoProcessor:
-    """Processador de vídeo para detecção em tempo real de QR codes"""
+    """
+    Processador de vídeo para detecção em tempo real de QR codes
+
+    recv (thread do WebRTC) só entrega o frame ao pipeline e desenha o último
+    resultado; a decodificação e o salvamento rodam na thread do pipeline
+    (utils/frame_pipeline.py) e os resultados voltam pela fila dele.
+    """
     
     def __init__(self):
-        self.last_process_time = 0
-        self.throttle_ms = 250  # Increased throttle to 250ms to reduce overhead and improve stability
+        # Intervalo entre decodificações ajustado pelo tempo de decodificação e pela CPU
+        self.throttle = AdaptiveThrottle()
+        self.box_ttl_s = 1.0  # Por quanto tempo o retângulo do último QR continua desenhado
+        self.motion_gate = MotionGate()  # Pula a decodificação de frames parados
         self.frame_with_box = None
         self.last_status = "Aguardando..."
+        self.pipeline = FramePipeline(self._decode_frame, min_interval_ms=self.throttle.interval_ms,
+                                      name="qr-video-decode")
     
     def recv(self, frame):
-        """Processa cada frame do vídeo"""
+        """Recebe cada frame do vídeo: não decodifica aqui, só entrega ao pipeline"""
         img = np.zeros((480, 640, 3), dtype=np.uint8)
         
         try:
             img = frame.to_ndarray(format="bgr24")
-
-            
-            current_time = time.time() * 1000
+            self.pipeline.submit(img)
+            # Desenha numa cópia: o pipeline pode estar lendo img
+            img = img.copy()
             
-            # Throttle processing
-            if current_time - self.last_process_time >= self.throttle_ms:
-                self.last_process_time = current_time
-                
-                sharpness = calculate_sharpness(img)
-                
-                if sharpness < 100:
-                    enhanced = apply_auto_focus_simulation(img, sharpness_threshold=100)
-                else:
-                    enhanced = img
-                
-                frame_rgb = cv2.cvtColor(enhanced, cv2.COLOR_BGR2RGB)
-                qr_data_list, qr_coords_list = decode_qr_from_image(frame_rgb)
-                
-                print(f"[DEBUG] sharpness={sharpness:.2f}, QR detected={len(qr_data_list)}")
-                
-                if qr_data_list:
-                    st.session_state.current_status = "Lendo QR Code..."
-                    
-                    for coords in qr_coords_list:
-                        x, y, w, h = coords
-                        cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 4)
-                        
-                        cv2.putText(
-                            img, 
-                            "QR DETECTADO", 
-                            (x, y - 10), 
-                            cv2.FONT_HERSHEY_SIMPLEX, 
-                            0.7, 
-                            (0, 255, 0), 
-                            2
-                        )
+            result = self.pipeline.latest
+            if result and time.monotonic() - result.finished_at < self.box_ttl_s:
+                for coords in result.value["coords"]:
+                    x, y, w, h = coords
+                    cv2.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 4)
                     
-                    # Process QR codes
-                    for qr_data in qr_data_list:
-                        success, message = process_qr_fiscal(qr_data, source="camera")
-                        
-                        if success:
-                            st.session_state.current_status = message
-                            self.last_status = message
-                            print(f"[v0] QR processado com sucesso: {message[:50]}...")
-                            break
-                        elif "já lido" in message:
-                            st.session_state.current_status = message
-                            self.last_status = message
-                            print(f"[v0] QR duplicado detectado")
-                        else:
-                            st.session_state.current_status = "Nenhum QR detectado"
-                            self.last_status = "Nenhum QR detectado"
-                else:
-                    st.session_state.current_status = "Nenhum QR detectado"
-                    self.last_status = "Nenhum QR detectado"
+                    cv2.putText(
+                        img, 
+                        "QR DETECTADO", 
+                        (x, y - 10), 
+                        cv2.FONT_HERSHEY_SIMPLEX, 
+                        0.7, 
+                        (0, 255, 0), 
+                        2
+                    )
         
         except Exception as e:
             print(f"[v0] Erro no processamento de vídeo: {e}")
             import traceback
             traceback.print_exc()
         
-        self.frame_with_box = img.copy()
+        self.frame_with_box = img
         
         return av.VideoFrame.from_ndarray(img, format="bgr24")
 
+    def on_ended(self):
+        """Chamado pelo streamlit-webrtc quando o vídeo termina"""
+        self.pipeline.stop()
+        self.throttle.close()
+
+    def metrics(self) -> dict:
+        """Taxa atual de decodificação desta sessão e carga do processo"""
+        return {
+            **self.throttle.metrics(),
+            "frames_dropped": self.pipeline.dropped,
+            "static_skip_ratio": self.motion_gate.skip_ratio,
+            "global": self.throttle.admission.metrics(),
+        }
+
+    def _decode_frame(self, img: np.ndarray) -> Optional[dict]:
+        """Decodifica e salva (thread do pipeline). Retorna coordenadas, status e leituras novas"""
+        decision = self.motion_gate.check(img)
+        if not decision.decode and decision.result is not None:
+            # Cena parada ou o mesmo QR no lugar: reaproveita o último resultado, sem salvar de novo
+            return {**decision.result, "reads": []}
+        
+        with self.throttle.admission.admit() as admitted:
+            if not admitted:
+                # Todas as vagas de decodificação do processo ocupadas: pula o frame
+                self.throttle.skip()
+                return None
+            start = time.perf_counter()
+            qr_data_list, qr_coords_list = self._decode(img)
+            self.pipeline.min_interval_ms = self.throttle.record(time.perf_counter() - start)
+        
+        status, reads = "Nenhum QR detectado", []
+        for qr_data in qr_data_list:
+            success, message, read = check_and_save_qr(qr_data, source="camera")
+            
+            if success:
+                status = message
+                reads.append(read)
+                print(f"[v0] QR processado com sucesso: {message[:50]}...")
+                break
+            elif "já lido" in message:
+                status = message
+                print(f"[v0] QR duplicado detectado")
+        
+        self.last_status = status
+        result = {"coords": qr_coords_list, "status": status, "reads": reads}
+        self.motion_gate.remember(img, result, qr_coords_list[0] if qr_coords_list else None)
+        return result
+
+    def _decode(self, img: np.ndarray):
+        sharpness = calculate_sharpness(img)
+        
+        if sharpness < 100:
+            enhanced = apply_auto_focus_simulation(img, sharpness_threshold=100)
+        else:
+            enhanced = img
+        
+        frame_rgb = cv2.cvtColor(enhanced, cv2.COLOR_BGR2RGB)
+        qr_data_list, qr_coords_list = decode_qr_from_image(frame_rgb)
+        
+        print(f"[DEBUG] sharpness={sharpness:.2f}, QR detected={len(qr_data_list)}")
+        return qr_data_list, qr_coords_list
+
+
+def show_status(placeholder, status: str):
+    """Mostra o status da leitura no placeholder (substituindo o anterior)"""
+    with placeholder.container():
+        if "sucesso" in status.lower():
+            st.markdown(f"""
+            <div class="status-success">
+                <h4 style="color: #00ff88; margin: 0;">✅ Sucesso!</h4>
+                <p style="margin: 5px 0 0 0;">{status}</p>
+            </div>
+            """, unsafe_allow_html=True)
+        elif "lendo" in status.lower():
+            st.markdown(f"""
+            <div class="status-reading">
+                <h4 style="color: #3b82f6; margin: 0;">🔍 {status}</h4>
+            </div>
+            """, unsafe_allow_html=True)
+        elif "nenhum" in status.lower():
+            st.markdown(f"""
+            <div class="status-error">
+                <h4 style="color: #ff4444; margin: 0;">❌ {status}</h4>
+            </div>
+            """, unsafe_allow_html=True)
+        else:
+            st.info(status)
+
 with st.sidebar:
     st.markdown("### 📋 Últimas 10 Leituras")
     
@@ -317,29 +397,9 @@ with tab1:
         
         st.markdown("### 📊 Status da Leitura")
         
-        status = st.session_state.current_status
-        
-        if "sucesso" in status.lower():
-            st.markdown(f"""
-            <div class="status-success">
-                <h4 style="color: #00ff88; margin: 0;">✅ Sucesso!</h4>
-                <p style="margin: 5px 0 0 0;">{status}</p>
-            </div>
-            """, unsafe_allow_html=True)
-        elif "lendo" in status.lower():
-            st.markdown(f"""
-            <div class="status-reading">
-                <h4 style="color: #3b82f6; margin: 0;">🔍 {status}</h4>
-            </div>
-            """, unsafe_allow_html=True)
-        elif "nenhum" in status.lower():
-            st.markdown(f"""
-            <div class="status-error">
-                <h4 style="color: #ff4444; margin: 0;">❌ {status}</h4>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.info(status)
+        status_placeholder = st.empty()
+        show_status(status_placeholder, st.session_state.current_status)
+        rate_placeholder = st.empty()
     
     with col2:
         st.markdown("### 📖 Instruções")
@@ -404,10 +464,17 @@ with tab2:
                 
                 st.info(f"📊 Brilho da imagem: {brightness:.1f}/255")
                 
-                qr_data_list, qr_coords_list, stats = decode_qr_with_multiple_attempts(img_array)
+                qr_data_list, qr_coords_list, stats = decode_qr_with_multiple_attempts(img_array, parallel=True)
                 
                 st.info(f"🔍 Tentativas: {stats['attempts']} | ⏱️ Tempo: {stats['processing_time']:.2f}s")
-                
+                if stats.get('estimated_time_saved'):
+                    st.caption(f"⚡ Ordem adaptativa: ~{stats['estimated_time_saved'] * 1000:.0f} ms economizados "
+                               f"({len(stats['variants_computed'])} de 5 variantes calculadas)")
+                if stats.get('roi'):
+                    _, _, roi_w, roi_h = stats['roi']
+                    st.caption(f"🎯 QR localizado: tentativas em {roi_w}x{roi_h} px "
+                               f"({roi_w * roi_h / (img_array.shape[0] * img_array.shape[1]):.0%} da imagem)")
+
                 if stats['method_used']:
                     st.success(f"✅ Método usado: {stats['method_used']}")
                 
@@ -532,3 +599,22 @@ with tab3:
 )
 
 st.markdown("---")
+
+# Resultados do vídeo: chegam pela fila do pipeline e são aplicados aqui, na
+# thread do Streamlit (a thread do WebRTC não escreve no session_state).
+# Fica no fim do script para não atrasar a renderização das abas.
+while ctx.state.playing and ctx.video_processor:
+    result = ctx.video_processor.pipeline.get_result(timeout=0.5)
+    if result is None:
+        continue
+    for read in result.value["reads"]:
+        add_last_read(read)
+    metrics = ctx.video_processor.metrics()
+    rate_placeholder.caption(
+        f"⚙️ {metrics['rate_hz']:.1f} leituras/s (intervalo {metrics['interval_ms']:.0f} ms) | "
+        f"CPU {metrics['global']['cpu']:.0%} | {metrics['global']['active_sessions']} câmera(s) | "
+        f"{metrics['static_skip_ratio']:.0%} dos frames sem mudança"
+    )
+    if result.value["status"] != st.session_state.current_status:
+        st.session_state.current_status = result.value["status"]
+        show_status(status_placeholder, st.session_state.current_status)
@@ -0,0 +1,99 @@
+"""
+Benchmark: decode_qr_with_multiple_attempts sequencial x paralelo (pool de threads)
+
+Gera imagens difíceis de cupons (desfocada, girada, amarelada, combinações e
+uma sem QR legível, que esgota todas as tentativas) e mede a mediana do tempo
+de parede de cada modo. As estatísticas adaptativas ficam só em memória, com
+uma instância nova por modo, para que um não ensine a ordem ao outro.
+
+Uso (a partir da pasta do projeto):
+    python scripts/benchmark_decode_parallel.py --repeticoes 5 --workers 4
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+import cv2
+import numpy as np
+import qrcode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.decode_strategy import DecodeStats
+from utils.qr_utils import DECODE_WORKERS, decode_qr_with_multiple_attempts
+
+URL_EXEMPLO = "https://nfeweb.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p=52250339346861034147651070004999491107141815|2|1|1|DF46C0CAD32EF01BE6B47848D0D7BD145878E215"
+
+
+def gerar_cupom(lado=1200):
+    """QR da NFC-e sobre um 'papel' com ruído, em BGR"""
+    qr = np.array(qrcode.make(URL_EXEMPLO, box_size=8, border=4).convert("L"))
+    papel = np.random.default_rng(0).normal(235, 8, (lado, lado)).clip(0, 255).astype(np.uint8)
+    y = x = (lado - qr.shape[0]) // 2
+    papel[y:y + qr.shape[0], x:x + qr.shape[1]] = qr
+    return cv2.cvtColor(papel, cv2.COLOR_GRAY2BGR)
+
+
+def desfocar(imagem):
+    return cv2.GaussianBlur(imagem, (0, 0), 3.0)
+
+
+def girar(imagem, angulo=8):
+    h, w = imagem.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), angulo, 1.0)
+    return cv2.warpAffine(imagem, M, (w, h), borderValue=(235, 235, 235))
+
+
+def amarelar(imagem):
+    """Papel térmico envelhecido: pouco contraste e tom amarelo"""
+    baixo_contraste = cv2.convertScaleAbs(imagem, alpha=0.35, beta=120)
+    return (baixo_contraste * np.array([0.55, 0.95, 1.0])).astype(np.uint8)
+
+
+CENARIOS = {
+    "desfocada": lambda c: desfocar(c),
+    "girada 8°": lambda c: girar(c),
+    "amarelada": lambda c: amarelar(c),
+    "amarelada + girada": lambda c: girar(amarelar(c), -7),
+    "desfocada + girada": lambda c: girar(desfocar(c), 6),
+    "ilegível (esgota tentativas)": lambda c: cv2.GaussianBlur(c, (0, 0), 12),
+}
+
+
+def medir(imagem, parallel, workers, repeticoes):
+    tempos, stats = [], None
+    for _ in range(repeticoes):
+        decode_stats = DecodeStats(path=None)
+        inicio = time.perf_counter()
+        _, _, stats = decode_qr_with_multiple_attempts(imagem, parallel=parallel, workers=workers,
+                                                       decode_stats=decode_stats)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=DECODE_WORKERS)
+    args = parser.parse_args()
+
+    cupom = gerar_cupom()
+    linhas = []
+    for nome, transformar in CENARIOS.items():
+        imagem = transformar(cupom)
+        t_seq, s_seq = medir(imagem, False, args.workers, args.repeticoes)
+        t_par, s_par = medir(imagem, True, args.workers, args.repeticoes)
+        linhas.append((nome, t_seq, s_seq, t_par, s_par))
+
+    print(f"\n{'Cenário':<30} {'Sequencial':>12} {'Paralelo':>12} {'Ganho':>7}   Método (seq / par)")
+    for nome, t_seq, s_seq, t_par, s_par in linhas:
+        print(f"{nome:<30} {t_seq * 1000:>9.1f} ms {t_par * 1000:>9.1f} ms {t_seq / t_par:>6.2f}x   "
+              f"{s_seq['method_used']} ({s_seq['attempts']}) / {s_par['method_used']} ({s_par['attempts']})")
+    print(f"\nWorkers: {args.workers} | Repetições: {args.repeticoes} (mediana)")
+
+
+if __name__ == "__main__":
+    main()
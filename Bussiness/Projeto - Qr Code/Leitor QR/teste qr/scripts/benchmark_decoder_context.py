@@ -0,0 +1,109 @@
+"""
+Benchmark: trabalho por frame do vídeo com e sem o DecoderContext
+
+Repete o trabalho de um frame do vídeo (nitidez, foco simulado, localização
+e leitura do QR com o OpenCV) de duas formas: como era antes, criando
+cv2.QRCodeDetector e arrays novos a cada chamada, e pelas funções atuais
+de utils/, que reaproveitam os objetos e buffers da thread.
+Mede a mediana da latência e a memória alocada por frame (tracemalloc, que
+enxerga os arrays do numpy criados pelo OpenCV).
+
+Uso (a partir da pasta do projeto):
+    python scripts/benchmark_decoder_context.py --frames 200
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import tracemalloc
+from pathlib import Path
+
+import cv2
+import numpy as np
+import qrcode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.qr_locator import LOCATE_MAX_SIDE, crop_qr_region
+from utils.qr_utils import (
+    apply_auto_focus_simulation,
+    calculate_sharpness,
+    try_opencv_qr
+)
+
+URL_EXEMPLO = "https://nfeweb.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p=52250339346861034147651070004999491107141815|2|1|1|DF46C0CAD32EF01BE6B47848D0D7BD145878E215"
+
+
+def gerar_frames(quantidade, largura=1280, altura=720):
+    """Frames de webcam com um cupom levemente desfocado, com ruído diferente em cada um"""
+    qr = np.array(qrcode.make(URL_EXEMPLO, box_size=6, border=4).convert("L"))
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(quantidade):
+        cena = rng.normal(200, 12, (altura, largura)).clip(0, 255).astype(np.uint8)
+        cena[100:100 + qr.shape[0], 500:500 + qr.shape[1]] = qr
+        frames.append(cv2.cvtColor(cv2.GaussianBlur(cena, (0, 0), 1.0), cv2.COLOR_GRAY2BGR))
+    return frames
+
+
+def frame_antigo(img):
+    """Como era: detector e arrays novos a cada chamada"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    if cv2.Laplacian(gray, cv2.CV_64F).var() < 100:
+        blurred = cv2.GaussianBlur(img, (5, 5), 0)
+        equalized = cv2.equalizeHist(cv2.cvtColor(blurred, cv2.COLOR_BGR2GRAY))
+        img = cv2.cvtColor(equalized, cv2.COLOR_GRAY2BGR)
+
+    h, w = img.shape[:2]
+    scale = LOCATE_MAX_SIDE / max(h, w)
+    small = cv2.resize(cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    found, points = cv2.QRCodeDetector().detect(small)
+    if not found:
+        return []
+    x, y, bw, bh = cv2.boundingRect((points.reshape(-1, 2) / scale).astype(np.float32))
+    pad = int(0.25 * max(bw, bh))
+    crop = img[max(0, y - pad):y + bh + pad, max(0, x - pad):x + bw + pad]
+    data = cv2.QRCodeDetector().detectAndDecode(crop)[0]
+    return [data] if data else []
+
+
+def frame_atual(img):
+    """As mesmas etapas pelas funções de utils/, com o DecoderContext da thread"""
+    if calculate_sharpness(img) < 100:
+        img = apply_auto_focus_simulation(img, sharpness_threshold=100)
+    roi = crop_qr_region(img)
+    return try_opencv_qr(roi.image) if roi is not None else []
+
+
+def medir(funcao, frames):
+    assert funcao(frames[0]), "QR não lido no frame de teste"  # Aquecimento (cria o contexto e os buffers)
+    tempos, alocado = [], []
+    for frame in frames:
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        funcao(frame)
+        tempos.append(time.perf_counter() - inicio)
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        alocado.append(pico)
+    return statistics.median(tempos), statistics.median(alocado)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    frames = gerar_frames(args.frames)
+    t_antigo, m_antigo = medir(frame_antigo, frames)
+    t_atual, m_atual = medir(frame_atual, frames)
+
+    print(f"\n{'Modo':<28} {'Latência (mediana)':>20} {'Memória alocada/frame':>24}")
+    print(f"{'Objetos novos por chamada':<28} {t_antigo * 1000:>17.2f} ms {m_antigo / 1024:>21.0f} KB")
+    print(f"{'DecoderContext da thread':<28} {t_atual * 1000:>17.2f} ms {m_atual / 1024:>21.0f} KB")
+    print(f"\nFrames: {args.frames} ({frames[0].shape[1]}x{frames[0].shape[0]})")
+
+
+if __name__ == "__main__":
+    main()
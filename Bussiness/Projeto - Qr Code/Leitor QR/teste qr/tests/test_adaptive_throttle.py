@@ -0,0 +1,144 @@
+"""
+Testes para utils/adaptive_throttle.py
+"""
+
+import threading
+import time
+import pytest
+from utils.adaptive_throttle import (
+    MAX_INTERVAL_MS,
+    MIN_INTERVAL_MS,
+    AdaptiveThrottle,
+    AdmissionControl,
+    CpuMeter
+)
+
+
+class FixedCpu(CpuMeter):
+    """Medidor com utilização e número de núcleos definidos pelo teste"""
+
+    def __init__(self, value=0.3, cpu_count=4):
+        super().__init__()
+        self.value = value
+        self.cpu_count = cpu_count
+
+    def utilisation(self):
+        return self.value
+
+
+@pytest.fixture
+def cpu():
+    return FixedCpu()
+
+
+@pytest.fixture
+def admission(cpu):
+    return AdmissionControl(max_concurrent=2, cpu=cpu)
+
+
+class TestCpuMeter:
+    """Testes da medida de CPU do processo"""
+
+    def test_busy_loop_is_measured(self):
+        meter = CpuMeter(sample_s=0.1)
+        end = time.monotonic() + 0.15
+        while time.monotonic() < end:
+            pass
+        assert 0 < meter.utilisation() <= 1
+
+
+class TestAdaptiveThrottle:
+    """Testes do intervalo por sessão"""
+
+    def test_fast_decodes_go_to_minimum(self, admission):
+        throttle = AdaptiveThrottle(admission)
+        for _ in range(10):
+            throttle.record(0.01)
+        assert throttle.interval_ms == MIN_INTERVAL_MS
+
+    def test_slow_decodes_widen_interval(self, admission):
+        throttle = AdaptiveThrottle(admission)
+        for _ in range(10):
+            throttle.record(0.3)
+        # 300 ms por decodificação com no máximo meio núcleo: ~600 ms de intervalo
+        assert throttle.interval_ms == pytest.approx(600, rel=0.05)
+
+    def test_more_sessions_share_the_cpu(self, admission, cpu):
+        cpu.cpu_count = 1
+        throttles = [AdaptiveThrottle(admission) for _ in range(4)]
+        for _ in range(10):
+            throttles[0].record(0.05)
+        # 1 núcleo * 0,7 / 4 sessões = 0,175 de núcleo por sessão
+        assert throttles[0].interval_ms == pytest.approx(50 / 0.175, rel=0.05)
+        for throttle in throttles[1:]:
+            throttle.close()
+        throttles[0].record(0.05)
+        assert throttles[0].interval_ms < 50 / 0.175
+
+    def test_backs_off_under_cpu_pressure_and_recovers(self, admission, cpu):
+        throttle = AdaptiveThrottle(admission)
+        cpu.value = 0.95
+        for _ in range(5):
+            throttle.record(0.1)
+        busy = throttle.interval_ms
+        assert busy > 200 and throttle.backoff > 1
+        cpu.value = 0.2
+        for _ in range(50):
+            throttle.record(0.1)
+        assert throttle.interval_ms < busy
+        assert throttle.backoff == 1.0
+
+    def test_interval_is_capped(self, admission, cpu):
+        throttle = AdaptiveThrottle(admission)
+        cpu.value = 1.0
+        for _ in range(20):
+            throttle.record(2.0)
+        assert throttle.interval_ms == MAX_INTERVAL_MS
+
+    def test_metrics(self, admission):
+        throttle = AdaptiveThrottle(admission)
+        throttle.record(0.3)
+        throttle.skip()
+        metrics = throttle.metrics()
+        assert metrics["rate_hz"] == pytest.approx(1000 / metrics["interval_ms"])
+        assert metrics["decodes"] == 1 and metrics["skipped"] == 1
+
+
+class TestAdmissionControl:
+    """Testes do limite global de decodificações"""
+
+    def test_rejects_beyond_max_concurrent(self, admission):
+        with admission.admit() as first, admission.admit() as second, admission.admit() as third:
+            assert (first, second, third) == (True, True, False)
+            assert admission.metrics()["in_flight"] == 2
+        assert admission.rejected == 1
+        with admission.admit() as again:
+            assert again
+
+    def test_concurrent_threads(self, admission):
+        inside, peak, lock = [0], [0], threading.Lock()
+
+        def worker():
+            for _ in range(20):
+                with admission.admit() as admitted:
+                    if admitted:
+                        with lock:
+                            inside[0] += 1
+                            peak[0] = max(peak[0], inside[0])
+                        time.sleep(0.001)
+                        with lock:
+                            inside[0] -= 1
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] <= admission.max_concurrent
+
+    def test_sessions_registry(self, admission):
+        throttle = AdaptiveThrottle(admission)
+        assert admission.metrics()["active_sessions"] == 1
+        assert admission.metrics()["total_rate_hz"] == pytest.approx(throttle.rate_hz)
+        throttle.close()
+        assert admission.active_sessions == 0
@@ -0,0 +1,126 @@
+"""
+Testes para utils/decode_strategy.py
+"""
+
+import json
+import time
+import numpy as np
+import pytest
+from utils import decode_strategy
+from utils.decode_strategy import (
+    DEFAULT_ORDER,
+    MAX_ATTEMPTS,
+    DecodeStats,
+    LazyVariants
+)
+
+
+@pytest.fixture
+def stats_file(tmp_path):
+    return str(tmp_path / "decode_stats.json")
+
+
+class TestLazyVariants:
+    """Testes do cálculo sob demanda das variantes"""
+
+    def test_computes_only_requested(self):
+        variants = LazyVariants(np.full((64, 64), 128, dtype=np.uint8))
+        variants.get("original")
+        variants.get("equalized")
+        variants.get("original")
+        assert variants.computed == ["original", "equalized"]
+        assert set(variants.build_times) == {"original", "equalized"}
+
+
+class TestDecodeStats:
+    """Testes da ordenação adaptativa"""
+
+    def test_default_order_without_history(self, stats_file):
+        assert DecodeStats(stats_file).schedule() == DEFAULT_ORDER[:MAX_ATTEMPTS]
+
+    def test_successful_combo_moves_first(self, stats_file):
+        stats = DecodeStats(stats_file)
+        winner = ("adaptive", 5)
+        for _ in range(10):
+            stats.record([(("original", 0), 0.01), (winner, 0.01)], winner, {"original": 0.001})
+        assert stats.schedule()[0] == winner
+
+    def test_untried_combos_get_explored(self, stats_file):
+        stats = DecodeStats(stats_file)
+        for _ in range(20):
+            stats.record([(combo, 0.01) for combo in stats.schedule()], None, {})
+        assert any(combo not in DEFAULT_ORDER[:MAX_ATTEMPTS] for combo in stats.schedule())
+
+    def test_cheaper_combo_first_on_equal_success(self, stats_file):
+        stats = DecodeStats(stats_file)
+        for _ in range(20):
+            stats.record([(("original", 0), 0.10)], ("original", 0), {})
+            stats.record([(("equalized", 0), 0.01)], ("equalized", 0), {})
+        assert stats.schedule()[0] == ("equalized", 0)
+
+    def test_persisted(self, stats_file):
+        stats = DecodeStats(stats_file, save_every=1)
+        stats.record([(("blur", -10), 0.02)], ("blur", -10), {"blur": 0.003})
+
+        with open(stats_file, encoding="utf-8") as f:
+            assert json.load(f)["combos"]["blur_rot-10"]["successes"] == 1
+        assert DecodeStats(stats_file).combos["blur_rot-10"]["tries"] == 1
+
+    def test_estimate_default_time(self, stats_file):
+        stats = DecodeStats(stats_file)
+        assert stats.estimate_default_time(None) is None
+
+        stats.record([(combo, 0.01) for combo in DEFAULT_ORDER[:3]], DEFAULT_ORDER[2],
+                     {name: 0.002 for name in decode_strategy.VARIANT_BUILDERS})
+        assert stats.estimate_default_time(DEFAULT_ORDER[2]) == pytest.approx(5 * 0.002 + 3 * 0.01)
+        assert stats.estimate_default_time(None) == pytest.approx(5 * 0.002 + MAX_ATTEMPTS * 0.01)
+
+
+class TestParallelDecode:
+    """Testes do modo paralelo de decode_qr_with_multiple_attempts"""
+
+    @pytest.fixture
+    def qr_utils(self, monkeypatch):
+        qr_utils = pytest.importorskip("utils.qr_utils", exc_type=ImportError)
+        started = []
+
+        def fake_attempt(rotated):
+            started.append(rotated)
+            time.sleep(0.05)
+            if rotated.mean() > 200:  # Cinza 150: só a variante "contrast" passa de 200
+                return ["URL"], [(0, 0, 1, 1)], "fake"
+            return [], [], None
+
+        monkeypatch.setattr(qr_utils, "_decode_attempt", fake_attempt)
+        monkeypatch.setattr(qr_utils, "_rotate", lambda variant, ang: variant)
+        qr_utils.started = started
+        return qr_utils
+
+    def test_same_result_as_sequential(self, qr_utils, stats_file):
+        image = np.full((64, 64), 150, dtype=np.uint8)
+        sequential = qr_utils.decode_qr_with_multiple_attempts(image, decode_stats=DecodeStats(None))
+        parallel = qr_utils.decode_qr_with_multiple_attempts(image, parallel=True, workers=4,
+                                                             decode_stats=DecodeStats(None))
+        assert parallel[0] == sequential[0] == ["URL"]
+        assert parallel[2]["parallel"] is True
+        assert parallel[2]["method_used"].startswith("fake_contrast")
+
+    def test_cancels_outstanding_attempts(self, qr_utils):
+        image = np.full((64, 64), 210, dtype=np.uint8)  # A primeira tentativa ("original") já decodifica
+        start = time.perf_counter()
+        qr_utils.decode_qr_with_multiple_attempts(image, parallel=True, workers=4, decode_stats=DecodeStats(None))
+        assert time.perf_counter() - start < 12 * 0.05
+        time.sleep(0.1)  # Tentativas já iniciadas terminam; as demais nem começam
+        assert len(qr_utils.started) < MAX_ATTEMPTS
+
+    def test_stats_only_for_attempts_with_known_outcome(self, qr_utils):
+        stats = DecodeStats(None)
+        image = np.full((64, 64), 210, dtype=np.uint8)  # Todas decodificam; "original" é a primeira
+        qr_utils.decode_qr_with_multiple_attempts(image, parallel=True, workers=4, decode_stats=stats)
+        time.sleep(0.15)  # As tentativas que já rodavam terminam
+
+        recorded = {name: entry for name, entry in stats.combos.items()}
+        # Toda tentativa iniciada é registrada com o resultado real; as canceladas ficam como não tentadas
+        assert sum(entry["tries"] for entry in recorded.values()) == len(qr_utils.started)
+        assert all(entry["successes"] == entry["tries"] for entry in recorded.values())
+        assert len(qr_utils.started) < MAX_ATTEMPTS
@@ -0,0 +1,52 @@
+"""
+Testes para utils/decoder_context.py
+"""
+
+import threading
+import numpy as np
+from utils.decoder_context import DecoderContext, get_decoder_context
+
+
+class TestDecoderContext:
+    """Testes dos buffers reaproveitados"""
+
+    def test_buffer_reused_for_same_shape(self):
+        ctx = DecoderContext()
+        first = ctx.buffer("gray", (480, 640))
+        assert ctx.buffer("gray", (480, 640)) is first
+        assert ctx.allocations == 1
+
+    def test_buffer_reallocated_when_shape_changes(self):
+        ctx = DecoderContext()
+        ctx.buffer("gray", (480, 640))
+        resized = ctx.buffer("gray", (720, 1280))
+        assert resized.shape == (720, 1280)
+        assert ctx.buffer("gray", (720, 1280), np.float64).dtype == np.float64
+        assert ctx.allocations == 3
+
+    def test_gray_writes_into_buffer(self):
+        ctx = DecoderContext()
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        frame[..., 2] = 255  # Vermelho (BGR)
+        gray = ctx.gray(frame)
+        assert gray is ctx.gray(frame)
+        assert gray.shape == (48, 64) and gray[0, 0] == 76
+
+    def test_gray_input_returned_as_is(self):
+        gray = np.zeros((48, 64), dtype=np.uint8)
+        assert DecoderContext().gray(gray) is gray
+
+
+class TestGetDecoderContext:
+    """Testes do contexto por thread"""
+
+    def test_same_context_in_same_thread(self):
+        assert get_decoder_context() is get_decoder_context()
+
+    def test_one_context_per_thread(self):
+        contexts = []
+        thread = threading.Thread(target=lambda: contexts.append(get_decoder_context()))
+        thread.start()
+        thread.join()
+        assert contexts[0] is not get_decoder_context()
+        assert contexts[0].qr_detector is not get_decoder_context().qr_detector
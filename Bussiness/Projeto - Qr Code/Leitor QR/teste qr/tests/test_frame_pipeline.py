@@ -0,0 +1,118 @@
+"""
+Testes para utils/frame_pipeline.py
+"""
+
+import threading
+import time
+import pytest
+from utils.frame_pipeline import FramePipeline, LatestFrameSlot
+
+
+@pytest.fixture
+def pipelines():
+    created = []
+    yield created
+    for pipeline in created:
+        pipeline.stop()
+
+
+def _slow(seconds, seen=None):
+    def process(frame):
+        if seen is not None:
+            seen.append(frame)
+        time.sleep(seconds)
+        return frame * 10
+    return process
+
+
+class TestLatestFrameSlot:
+    """Testes do buffer de uma vaga"""
+
+    def test_newest_frame_wins(self):
+        slot = LatestFrameSlot()
+        slot.put("a")
+        slot.put("b")
+        slot.put("c")
+        assert slot.take(timeout=0)[1] == "c"
+        assert slot.dropped == 2
+
+    def test_take_times_out_when_empty(self):
+        slot = LatestFrameSlot()
+        start = time.monotonic()
+        assert slot.take(timeout=0.05) is None
+        assert time.monotonic() - start >= 0.04
+
+    def test_take_wakes_on_put(self):
+        slot = LatestFrameSlot()
+        threading.Timer(0.02, slot.put, args=("x",)).start()
+        assert slot.take(timeout=1)[1] == "x"
+
+
+class TestFramePipeline:
+    """Testes da thread de processamento"""
+
+    def test_result_comes_back_through_queue(self, pipelines):
+        pipeline = FramePipeline(lambda frame: frame * 2)
+        pipelines.append(pipeline)
+        frame_id = pipeline.submit(21)
+        result = pipeline.get_result(timeout=1)
+        assert result.frame_id == frame_id and result.value == 42
+        assert pipeline.latest == result
+
+    def test_submit_does_not_wait_for_processing(self, pipelines):
+        pipeline = FramePipeline(_slow(0.2))
+        pipelines.append(pipeline)
+        start = time.monotonic()
+        for frame in range(20):
+            pipeline.submit(frame)
+        assert time.monotonic() - start < 0.05
+
+    def test_frames_do_not_queue_up(self, pipelines):
+        seen = []
+        pipeline = FramePipeline(_slow(0.05, seen))
+        pipelines.append(pipeline)
+        for frame in range(30):
+            pipeline.submit(frame)
+            time.sleep(0.005)
+        time.sleep(0.2)
+        assert len(seen) < 10
+        assert seen[-1] == 29  # O último frame entregue é processado
+        assert pipeline.dropped >= 30 - len(seen)
+
+    def test_min_interval_between_decodes(self, pipelines):
+        seen = []
+        pipeline = FramePipeline(_slow(0, seen), min_interval_ms=100)
+        pipelines.append(pipeline)
+        end = time.monotonic() + 0.35
+        while time.monotonic() < end:
+            pipeline.submit(1)
+            time.sleep(0.01)
+        assert 2 <= len(seen) <= 5
+
+    def test_error_does_not_stop_worker(self, pipelines):
+        def process(frame):
+            if frame == "bad":
+                raise ValueError("frame corrompido")
+            return frame
+
+        pipeline = FramePipeline(process)
+        pipelines.append(pipeline)
+        pipeline.submit("bad")
+        time.sleep(0.05)
+        pipeline.submit("ok")
+        assert pipeline.get_result(timeout=1).value == "ok"
+        assert pipeline.errors == 1
+
+    def test_none_is_not_published(self, pipelines):
+        pipeline = FramePipeline(lambda frame: None if frame == "pular" else frame)
+        pipelines.append(pipeline)
+        pipeline.submit("pular")
+        time.sleep(0.05)
+        pipeline.submit("ok")
+        assert pipeline.get_result(timeout=1).value == "ok"
+        assert pipeline.processed == 2
+
+    def test_stop(self):
+        pipeline = FramePipeline(lambda frame: frame)
+        pipeline.stop()
+        assert not pipeline.running
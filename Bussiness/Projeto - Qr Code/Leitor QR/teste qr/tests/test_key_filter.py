@@ -0,0 +1,89 @@
+"""
+Testes para utils/key_filter.py
+"""
+
+import csv
+import pytest
+from utils import key_filter as key_filter_module
+from utils.key_filter import BloomFilter, KeyFilter
+from utils.key_index import KeyIndex
+
+
+def key(n):
+    return f"{n:044d}"
+
+
+@pytest.fixture
+def index(tmp_path):
+    csv_file = tmp_path / "receipts.csv"
+    with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["access_key", "timestamp", "source"])
+        for n in range(500):
+            writer.writerow([key(n), "2025-10-22 22:48:35", "upload"])
+    index = KeyIndex(str(csv_file))
+    yield index
+    index.close()
+
+
+class TestBloomFilter:
+    """Testes do filtro de Bloom"""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        bloom.update(key(n) for n in range(1000))
+        assert all(key(n) in bloom for n in range(1000))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(10_000, error_rate=0.01)
+        bloom.update(key(n) for n in range(10_000))
+        false_positives = sum(key(n) in bloom for n in range(10_000, 30_000))
+        assert false_positives / 20_000 < 0.02
+
+    def test_serialization(self):
+        bloom = BloomFilter(100)
+        bloom.add(key(1))
+        restored = BloomFilter.from_bytes(bloom.to_bytes())
+        assert key(1) in restored
+        assert restored.count == 1
+        with pytest.raises(ValueError):
+            BloomFilter.from_bytes(b"XXXX" + bloom.to_bytes()[4:])
+
+
+class TestKeyFilter:
+    """Testes do filtro persistido em frente ao índice"""
+
+    def test_built_from_index(self, index):
+        key_filter = KeyFilter(index)
+        assert key_filter.is_duplicate(key(10))
+        assert not key_filter.is_duplicate(key(999))
+
+    def test_new_key_skips_index(self, index, monkeypatch):
+        key_filter = KeyFilter(index)
+        monkeypatch.setattr(index, "contains", lambda k: pytest.fail("índice consultado"))
+        assert not key_filter.is_duplicate(key(999))
+
+    def test_add(self, index):
+        key_filter = KeyFilter(index)
+        key_filter.add(key(999))
+        assert key_filter.might_contain(key(999))
+
+    def test_loads_from_disk(self, index, monkeypatch):
+        KeyFilter(index)
+        monkeypatch.setattr(KeyFilter, "_build", lambda self: pytest.fail("filtro reconstruído"))
+        assert KeyFilter(index).might_contain(key(10))
+
+    def test_stale_file_is_rebuilt(self, index):
+        KeyFilter(index)
+        index.add(key(999))  # Outro processo salvou uma chave depois da gravação do filtro
+        assert KeyFilter(index).might_contain(key(999))
+
+    def test_grows_when_full(self, index, monkeypatch):
+        monkeypatch.setattr(key_filter_module, "MIN_CAPACITY", 10)
+        key_filter = KeyFilter(index)
+        capacity = key_filter._bloom.capacity
+        for n in range(1000, 1000 + capacity):
+            index.add(key(n))
+            key_filter.add(key(n))
+        assert key_filter._bloom.capacity > capacity
+        assert key_filter.is_duplicate(key(1000))
@@ -0,0 +1,85 @@
+"""
+Testes para utils/key_index.py
+"""
+
+import csv
+import pytest
+from utils.key_index import KeyIndex, read_csv_keys
+
+KEY_A = "52250610475863000179650040001336021000002497"
+KEY_B = "05250610475863000179650030001540541000012998"  # Zero à esquerda
+
+
+def write_csv(path, keys):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["access_key", "timestamp", "source"])
+        for key in keys:
+            writer.writerow([key, "2025-10-22 22:48:35", "upload"])
+
+
+def append_key(path, key):
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerow([key, "2025-10-22 22:59:12", "camera"])
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    path = tmp_path / "receipts.csv"
+    write_csv(path, [KEY_A])
+    return str(path)
+
+
+@pytest.fixture
+def index(csv_file):
+    index = KeyIndex(csv_file)
+    yield index
+    index.close()
+
+
+class TestKeyIndex:
+    """Testes do índice persistente de chaves"""
+
+    def test_builds_from_existing_csv(self, index):
+        assert index.contains(KEY_A)
+        assert not index.contains(KEY_B)
+
+    def test_keeps_leading_zeros(self, csv_file):
+        write_csv(csv_file, [KEY_B])
+        assert list(read_csv_keys(csv_file)) == [KEY_B]
+
+    def test_add_new_and_duplicate(self, index, csv_file):
+        assert index.add(KEY_B, on_new=lambda: append_key(csv_file, KEY_B)) is True
+        assert index.add(KEY_B, on_new=lambda: pytest.fail("gravou duplicata")) is False
+        assert index.count() == 2
+
+    def test_add_does_not_trigger_rebuild(self, index, csv_file, monkeypatch):
+        index.contains(KEY_A)
+        monkeypatch.setattr(index, "_rebuild", lambda: pytest.fail("índice reconstruído"))
+
+        index.add(KEY_B, on_new=lambda: append_key(csv_file, KEY_B))
+        assert index.contains(KEY_B)
+
+    def test_failed_write_is_not_indexed(self, index):
+        def fail():
+            raise OSError("disco cheio")
+
+        with pytest.raises(OSError):
+            index.add(KEY_B, on_new=fail)
+        assert not index.contains(KEY_B)
+
+    def test_external_change_rebuilds(self, index, csv_file):
+        assert index.contains(KEY_A)
+        write_csv(csv_file, [KEY_B])
+        assert not index.contains(KEY_A)
+        assert index.contains(KEY_B)
+
+    def test_persists_between_instances(self, index, csv_file):
+        index.add(KEY_B, on_new=lambda: append_key(csv_file, KEY_B))
+        index.close()
+
+        reopened = KeyIndex(csv_file)
+        try:
+            assert reopened.contains(KEY_B)
+        finally:
+            reopened.close()
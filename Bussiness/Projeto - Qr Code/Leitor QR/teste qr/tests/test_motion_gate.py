@@ -0,0 +1,109 @@
+"""
+Testes para utils/motion_gate.py
+"""
+
+import time
+import numpy as np
+import pytest
+from utils.motion_gate import MotionGate, changed_fraction, frame_signature
+
+QR_BOX = (400, 200, 160, 160)
+
+
+@pytest.fixture
+def scene():
+    """Frame 1280x720: mesa escura, cupom branco e um 'QR' (xadrez) no QR_BOX, com ruído de sensor"""
+    rng = np.random.default_rng(0)
+    frame = rng.normal(80, 3, (720, 1280, 3)).clip(0, 255).astype(np.uint8)
+    frame[100:620, 340:620] = 230
+    x, y, w, h = QR_BOX
+    checker = (np.indices((h, w)).sum(axis=0) // 20 % 2 * 255).astype(np.uint8)
+    frame[y:y + h, x:x + w] = checker[..., None]
+    return frame
+
+
+@pytest.fixture
+def empty_desk(scene):
+    return np.full_like(scene, 80)
+
+
+def _noisy(frame, seed):
+    noise = np.random.default_rng(seed).integers(-3, 4, frame.shape)
+    return (frame.astype(np.int16) + noise).clip(0, 255).astype(np.uint8)
+
+
+def _gate(**kwargs):
+    kwargs.setdefault("refresh_s", 60)
+    kwargs.setdefault("settle_s", 0)
+    return MotionGate(**kwargs)
+
+
+class TestSignature:
+    """Testes da miniatura do frame"""
+
+    def test_signature_is_small_gray(self, scene):
+        assert frame_signature(scene).shape == (24, 32)
+
+    def test_sensor_noise_is_below_threshold(self, scene):
+        assert changed_fraction(frame_signature(scene), frame_signature(_noisy(scene, 1))) == 0
+
+
+class TestMotionGate:
+    """Testes da decisão de decodificar"""
+
+    def test_first_frame_is_decoded(self, scene):
+        assert _gate().check(scene).decode
+
+    def test_static_scene_reuses_result(self, scene):
+        gate = _gate()
+        gate.check(scene)
+        gate.remember(scene, {"status": "Nenhum QR detectado"})
+        decision = gate.check(_noisy(scene, 2))
+        assert not decision.decode
+        assert decision.reason == "static"
+        assert decision.result == {"status": "Nenhum QR detectado"}
+
+    def test_scene_change_is_decoded(self, scene, empty_desk):
+        gate = _gate()
+        gate.remember(empty_desk, "antes")
+        decision = gate.check(scene)
+        assert decision.decode and decision.reason == "changed"
+
+    def test_same_qr_in_view_reuses_result(self, scene):
+        gate = _gate()
+        gate.remember(scene, "lido", qr_box=QR_BOX)
+        moved_background = scene.copy()
+        moved_background[:, :300] = 200  # Mão entrando pela esquerda
+        moved_background[:, 700:] = 10  # e sombra na direita
+        decision = gate.check(moved_background)
+        assert not decision.decode
+        assert decision.reason == "same_qr" and decision.result == "lido"
+
+    def test_moved_qr_is_decoded(self, scene):
+        gate = _gate()
+        gate.remember(scene, "lido", qr_box=QR_BOX)
+        decision = gate.check(np.roll(scene, 300, axis=1))
+        assert decision.decode
+
+    def test_refresh_after_interval(self, scene):
+        gate = _gate(refresh_s=0.05)
+        gate.remember(scene, "antes")
+        time.sleep(0.06)
+        assert gate.check(scene).reason == "refresh"
+
+    def test_keeps_decoding_while_scene_settles(self, scene, empty_desk):
+        gate = _gate(settle_s=0.2)
+        gate.remember(empty_desk, "antes")
+        assert gate.check(scene).reason == "changed"
+        gate.remember(scene, "tremido, sem QR")
+        assert gate.check(scene).reason == "settling"
+        time.sleep(0.2)
+        assert gate.check(scene).reason == "static"
+
+    def test_skip_ratio(self, scene):
+        gate = _gate()
+        gate.check(scene)
+        gate.remember(scene, "x")
+        for seed in range(3):
+            gate.check(_noisy(scene, seed))
+        assert gate.skip_ratio == pytest.approx(0.75)
@@ -0,0 +1,78 @@
+"""
+Testes para utils/qr_locator.py
+"""
+
+import cv2
+import numpy as np
+import pytest
+from utils.decode_strategy import DecodeStats
+from utils.qr_locator import Roi, crop_qr_region, locate_qr
+
+qrcode = pytest.importorskip("qrcode")
+
+URL_EXEMPLO = ("https://nfeweb.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?"
+               "p=52250339346861034147651070004999491107141815|2|1|1|DF46C0CAD32EF01BE6B47848D0D7BD145878E215")
+QR_X, QR_Y = 600, 1500
+
+
+@pytest.fixture(scope="module")
+def receipt_photo():
+    """'Foto' 1800x2400 de um cupom com o QR pequeno no canto inferior"""
+    qr = np.array(qrcode.make(URL_EXEMPLO, box_size=6, border=4).convert("L"))
+    paper = np.random.default_rng(0).normal(235, 8, (2400, 1800)).clip(0, 255).astype(np.uint8)
+    paper[QR_Y:QR_Y + qr.shape[0], QR_X:QR_X + qr.shape[1]] = qr
+    return cv2.cvtColor(paper, cv2.COLOR_GRAY2BGR), qr.shape[0]
+
+
+def _inside(inner, outer):
+    ix, iy, iw, ih = inner
+    ox, oy, ow, oh = outer
+    return ox <= ix and oy <= iy and ix + iw <= ox + ow and iy + ih <= oy + oh
+
+
+class TestLocateQr:
+    """Testes da localização na imagem reduzida"""
+
+    def test_finds_qr_in_full_resolution_coords(self, receipt_photo):
+        image, side = receipt_photo
+        x, y, w, h = locate_qr(image)
+        assert _inside((x, y, w, h), (QR_X, QR_Y, side, side))
+        assert w > side * 0.7
+
+    def test_finds_blurred_qr(self, receipt_photo):
+        image, side = receipt_photo
+        assert locate_qr(cv2.GaussianBlur(image, (0, 0), 3)) is not None
+
+    def test_blank_image(self):
+        assert locate_qr(np.full((1000, 1000), 230, dtype=np.uint8)) is None
+
+
+class TestCropQrRegion:
+    """Testes do recorte com margem"""
+
+    def test_crop_contains_whole_qr_and_is_small(self, receipt_photo):
+        image, side = receipt_photo
+        roi = crop_qr_region(image)
+        assert _inside((QR_X, QR_Y, side, side), (roi.x, roi.y, roi.image.shape[1], roi.image.shape[0]))
+        assert roi.image.size * 10 < image.size
+        data, _, _ = cv2.QRCodeDetector().detectAndDecode(roi.image)
+        assert data == URL_EXEMPLO
+
+    def test_no_crop_when_qr_fills_image(self, receipt_photo):
+        image, side = receipt_photo
+        close_up = image[QR_Y - 20:QR_Y + side + 20, QR_X - 20:QR_X + side + 20]
+        assert crop_qr_region(close_up) is None
+
+    def test_decode_runs_on_crop(self, receipt_photo):
+        qr_utils = pytest.importorskip("utils.qr_utils", exc_type=ImportError)
+        image, side = receipt_photo
+        data, coords, stats = qr_utils.decode_qr_with_multiple_attempts(image, decode_stats=DecodeStats(None))
+        assert data == [URL_EXEMPLO]
+        assert stats["roi"] is not None
+        # Coordenadas na imagem original, não no recorte
+        x, y, w, h = coords[0]
+        assert abs(x - QR_X) < side * 0.2 and abs(y - QR_Y) < side * 0.2
+
+    def test_coords_back_to_image(self):
+        roi = Roi(np.zeros((10, 10), dtype=np.uint8), 100, 200)
+        assert roi.to_image_coords((1, 2, 3, 4)) == (101, 202, 3, 4)
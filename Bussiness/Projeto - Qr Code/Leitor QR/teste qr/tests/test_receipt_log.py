@@ -0,0 +1,165 @@
+"""
+Testes para utils/receipt_log.py
+"""
+
+import csv
+import time
+import multiprocessing
+import pytest
+from utils.receipt_log import ReceiptLog, file_signature
+from utils.key_index import KeyIndex
+
+COLUMNS = ["access_key", "timestamp", "source"]
+
+
+def row(n):
+    return {"access_key": f"{n:044d}", "timestamp": "2025-10-22 22:48:35", "source": "camera"}
+
+
+def read_rows(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def write_from_process(path, start):
+    log = ReceiptLog(path, COLUMNS, flush_every=5, flush_interval_ms=10_000)
+    for n in range(start, start + 50):
+        log.append(row(n))
+    log.flush()
+
+
+@pytest.fixture
+def csv_file(tmp_path):
+    return str(tmp_path / "receipts.csv")
+
+
+class TestReceiptLog:
+    """Testes do escritor append-only com commit em grupo"""
+
+    def test_writes_in_batches(self, csv_file):
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=3, flush_interval_ms=10_000)
+        log.append(row(1))
+        log.append(row(2))
+        assert len(log.pending()) == 2
+        assert file_signature(csv_file) == "missing"
+
+        log.append(row(3))
+        assert log.pending() == []
+        assert [r["access_key"] for r in read_rows(csv_file)] == [row(n)["access_key"] for n in (1, 2, 3)]
+
+    def test_flushes_after_interval(self, csv_file):
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=100, flush_interval_ms=20)
+        log.append(row(1))
+
+        deadline = time.time() + 2
+        while log.pending() and time.time() < deadline:
+            time.sleep(0.01)
+        assert len(read_rows(csv_file)) == 1
+
+    def test_appends_with_existing_header(self, csv_file):
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            f.write("timestamp,access_key,source,device_id\n2025-10-22 22:48:35,1,upload,pc\n")
+
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=1)
+        log.append(row(2))
+        rows = read_rows(csv_file)
+        assert rows[1]["access_key"] == row(2)["access_key"]
+        assert rows[1]["device_id"] == ""
+
+    def test_repairs_torn_last_line(self, csv_file):
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:
+            f.write("access_key,timestamp,source\n" + row(1)["access_key"] + ",2025-10")
+
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=1)
+        log.append(row(2))
+        assert log.compact() == 1
+        assert [r["access_key"] for r in read_rows(csv_file)] == [row(2)["access_key"]]
+
+    def test_compact_removes_duplicates(self, csv_file):
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=10)
+        for n in (1, 2, 1, 3, 2):
+            log.append(row(n))
+
+        assert log.compact(unique="access_key") == 3
+        assert [r["access_key"] for r in read_rows(csv_file)] == [row(n)["access_key"] for n in (1, 2, 3)]
+
+    def test_discard(self, csv_file):
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=10)
+        log.append(row(1))
+        assert log.discard() == 1
+        assert log.flush() == 0
+
+    def test_multiple_processes(self, csv_file):
+        processes = [
+            multiprocessing.get_context("spawn").Process(target=write_from_process, args=(csv_file, start))
+            for start in (0, 1000, 2000)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(timeout=30)
+
+        rows = read_rows(csv_file)
+        assert len(rows) == 150
+        assert len({r["access_key"] for r in rows}) == 150
+
+
+class TestKeyIndexWithLog:
+    """Integração entre o buffer do escritor e o índice de chaves"""
+
+    def make(self, csv_file):
+        log = ReceiptLog(csv_file, COLUMNS, flush_every=10, flush_interval_ms=10_000,
+                         on_flush=lambda before, after: index.advance(before, after))
+        index = KeyIndex(csv_file, pending_keys=lambda: [r["access_key"] for r in log.pending()])
+        return log, index
+
+    def test_flush_does_not_rebuild_index(self, csv_file, monkeypatch):
+        log, index = self.make(csv_file)
+        index.add(row(1)["access_key"], on_new=lambda: log.append(row(1)))
+
+        monkeypatch.setattr(index, "_rebuild", lambda: pytest.fail("índice reconstruído"))
+        log.flush()
+        assert index.contains(row(1)["access_key"])
+        index.close()
+
+    def test_lost_buffer_is_forgotten_by_next_process(self, csv_file):
+        log, index = self.make(csv_file)
+        index.add(row(1)["access_key"], on_new=lambda: log.append(row(1)))
+        index.close()  # Processo cai sem gravar o buffer
+
+        reopened = KeyIndex(csv_file)
+        assert not reopened.contains(row(1)["access_key"])
+        reopened.close()
+
+    def test_two_processes_share_buffered_keys(self, csv_file, monkeypatch):
+        log_a, index_a = self.make(csv_file)
+        log_b, index_b = self.make(csv_file)
+        key = row(1)["access_key"]
+        assert index_a.add(key, on_new=lambda: log_a.append(row(1)))
+
+        # B enxerga a chave que ainda está no buffer de A, sem reconstruir o índice
+        monkeypatch.setattr(index_a, "_rebuild", lambda: pytest.fail("índice reconstruído"))
+        monkeypatch.setattr(index_b, "_rebuild", lambda: pytest.fail("índice reconstruído"))
+        assert index_b.contains(key)
+        assert not index_b.add(key, on_new=lambda: log_b.append(row(1)))
+        assert index_b.add(row(2)["access_key"], on_new=lambda: log_b.append(row(2)))
+
+        log_a.flush()
+        log_b.flush()
+        assert sorted(r["access_key"] for r in read_rows(csv_file)) == [key, row(2)["access_key"]]
+        index_a.close()
+        index_b.close()
+
+    def test_rebuild_keeps_other_process_buffer(self, csv_file):
+        log_a, index_a = self.make(csv_file)
+        log_b, index_b = self.make(csv_file)
+        index_a.add(row(1)["access_key"], on_new=lambda: log_a.append(row(1)))
+
+        with open(csv_file, 'w', newline='', encoding='utf-8') as f:  # Edição externa
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerow(row(3))
+        assert index_b.contains(row(3)["access_key"])  # Reconstruiu a partir do CSV...
+        assert not index_b.add(row(1)["access_key"])   # ...sem perder o buffer de A
+        index_a.close()
+        index_b.close()
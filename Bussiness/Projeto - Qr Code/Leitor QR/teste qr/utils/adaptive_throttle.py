@@ -0,0 +1,195 @@
+"""
+Intervalo de decodificação do vídeo ajustado pela carga
+
+Cada sessão de câmera tem um AdaptiveThrottle: o intervalo entre duas
+decodificações sai da média móvel (EWMA) do tempo de decodificação dividida
+pela fatia de CPU que cabe à sessão (CPU da máquina dividida entre as sessões
+ativas). Se o processo passa de HIGH_CPU o intervalo cresce de forma
+multiplicativa; abaixo de LOW_CPU volta aos poucos. Por cima disso, o
+AdmissionControl do processo limita quantas decodificações rodam ao mesmo
+tempo em todas as sessões: quem não consegue vaga pula o frame.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+MIN_INTERVAL_MS = 100
+MAX_INTERVAL_MS = 2000
+INITIAL_INTERVAL_MS = 250
+DECODE_SMOOTHING = 0.3   # Peso da última medida na EWMA do tempo de decodificação
+TARGET_CPU = 0.7         # Fração da CPU da máquina que as decodificações podem ocupar
+MAX_SESSION_SHARE = 0.5  # Fração máxima de um núcleo para uma sessão (o vídeo também precisa de CPU)
+HIGH_CPU = 0.85          # Acima disso (CPU do processo / núcleos) o intervalo aumenta
+LOW_CPU = 0.6            # Abaixo disso a folga acumulada é devolvida
+BACKOFF_UP = 1.5
+BACKOFF_DOWN = 0.9
+MAX_BACKOFF = 8.0
+CPU_SAMPLE_S = 0.5       # Intervalo mínimo entre duas medidas de CPU
+
+
+class CpuMeter:
+    """Utilização de CPU do processo (0 a 1, relativa a todos os núcleos), por os.times()"""
+
+    def __init__(self, sample_s: float = CPU_SAMPLE_S):
+        self.sample_s = sample_s
+        self.cpu_count = os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._last_wall = time.monotonic()
+        self._last_cpu = self._process_time()
+        self._value = 0.0
+
+    def utilisation(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_wall >= self.sample_s:
+                cpu = self._process_time()
+                self._value = min(1.0, (cpu - self._last_cpu) / (now - self._last_wall) / self.cpu_count)
+                self._last_wall, self._last_cpu = now, cpu
+            return self._value
+
+    @staticmethod
+    def _process_time() -> float:
+        times = os.times()
+        return times.user + times.system
+
+
+class AdmissionControl:
+    """
+    Limite global de decodificações simultâneas e registro das sessões ativas
+
+    Args:
+        max_concurrent: Decodificações ao mesmo tempo no processo (padrão: núcleos)
+    """
+
+    def __init__(self, max_concurrent: Optional[int] = None, cpu: Optional[CpuMeter] = None):
+        self.cpu = cpu or CpuMeter()
+        self.max_concurrent = max_concurrent or self.cpu.cpu_count
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._sessions: List["AdaptiveThrottle"] = []
+
+    @contextmanager
+    def admit(self):
+        """Reserva uma vaga, se houver; devolve True/False (sem esperar)"""
+        with self._lock:
+            admitted = self._in_flight < self.max_concurrent
+            if admitted:
+                self._in_flight += 1
+            else:
+                self.rejected += 1
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                with self._lock:
+                    self._in_flight -= 1
+
+    def register(self, throttle: "AdaptiveThrottle"):
+        with self._lock:
+            self._sessions.append(throttle)
+
+    def unregister(self, throttle: "AdaptiveThrottle"):
+        with self._lock:
+            if throttle in self._sessions:
+                self._sessions.remove(throttle)
+
+    @property
+    def active_sessions(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            sessions = list(self._sessions)
+            in_flight = self._in_flight
+        return {
+            "active_sessions": len(sessions),
+            "in_flight": in_flight,
+            "max_concurrent": self.max_concurrent,
+            "rejected": self.rejected,
+            "cpu": self.cpu.utilisation(),
+            "total_rate_hz": sum(session.rate_hz for session in sessions),
+        }
+
+
+class AdaptiveThrottle:
+    """
+    Intervalo de decodificação de uma sessão de câmera
+
+    Args:
+        admission: Controle global (padrão: o do processo)
+    """
+
+    def __init__(self, admission: Optional[AdmissionControl] = None,
+                 min_interval_ms: float = MIN_INTERVAL_MS, max_interval_ms: float = MAX_INTERVAL_MS,
+                 initial_interval_ms: float = INITIAL_INTERVAL_MS):
+        self.admission = admission or get_admission_control()
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.interval_ms = initial_interval_ms
+        self.decode_ms: Optional[float] = None  # EWMA
+        self.backoff = 1.0
+        self.decodes = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        self.admission.register(self)
+
+    def record(self, seconds: float) -> float:
+        """Registra o tempo de uma decodificação e devolve o novo intervalo (ms)"""
+        cpu = self.admission.cpu.utilisation()
+        sessions = max(1, self.admission.active_sessions)
+        with self._lock:
+            ms = seconds * 1000
+            self.decode_ms = ms if self.decode_ms is None else \
+                (1 - DECODE_SMOOTHING) * self.decode_ms + DECODE_SMOOTHING * ms
+            self.decodes += 1
+
+            if cpu > HIGH_CPU:
+                self.backoff = min(MAX_BACKOFF, self.backoff * BACKOFF_UP)
+            elif cpu < LOW_CPU:
+                self.backoff = max(1.0, self.backoff * BACKOFF_DOWN)
+
+            # Decodificar decode_ms a cada intervalo ocupa decode_ms / intervalo de um núcleo
+            share = min(MAX_SESSION_SHARE, self.admission.cpu.cpu_count * TARGET_CPU / sessions)
+            interval = self.decode_ms / share * self.backoff
+            self.interval_ms = min(self.max_interval_ms, max(self.min_interval_ms, interval))
+            return self.interval_ms
+
+    def skip(self):
+        """Frame pulado por falta de vaga no AdmissionControl"""
+        with self._lock:
+            self.skipped += 1
+
+    @property
+    def rate_hz(self) -> float:
+        return 1000 / self.interval_ms
+
+    def metrics(self) -> Dict:
+        with self._lock:
+            return {
+                "interval_ms": self.interval_ms,
+                "rate_hz": self.rate_hz,
+                "decode_ms": self.decode_ms,
+                "backoff": self.backoff,
+                "decodes": self.decodes,
+                "skipped": self.skipped,
+            }
+
+    def close(self):
+        self.admission.unregister(self)
+
+
+_admission = None
+_admission_lock = threading.Lock()
+
+def get_admission_control() -> AdmissionControl:
+    """Controle de admissão compartilhado por todas as sessões do processo"""
+    global _admission
+    with _admission_lock:
+        if _admission is None:
+            _admission = AdmissionControl()
+        return _admission
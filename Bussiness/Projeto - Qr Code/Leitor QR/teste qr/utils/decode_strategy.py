@@ -0,0 +1,194 @@
+"""
+Ordem adaptativa das tentativas de decodificação de QR Code
+
+decode_qr_with_multiple_attempts testa combinações (variante da imagem, ângulo
+de rotação). Aqui ficam as variantes, calculadas só quando usadas, e as
+estatísticas de sucesso e custo de cada combinação no nosso tráfego, gravadas
+em disco. A cada imagem as combinações são ordenadas pela razão
+P(sucesso) / custo, que minimiza o tempo esperado de uma busca sequencial.
+Sem histórico, a ordem é a original (variante a variante, ângulos 0, ±5, ±10).
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+STATS_FILE = "decode_stats.json"
+MAX_ATTEMPTS = 12
+ROTATION_ANGLES = (0, 5, -5, 10, -10)
+PRIOR_WEIGHT = 5     # Peso (em tentativas) da ordem original nas primeiras leituras
+COST_SMOOTHING = 0.2  # Média móvel exponencial do custo de cada tentativa
+SAVE_EVERY = 20       # Leituras entre duas gravações das estatísticas
+
+VARIANT_BUILDERS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "original": lambda gray: gray,
+    "equalized": cv2.equalizeHist,
+    "contrast": lambda gray: cv2.convertScaleAbs(gray, alpha=1.5, beta=0),
+    "adaptive": lambda gray: cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                                   cv2.THRESH_BINARY, 31, 8),
+    "blur": lambda gray: cv2.medianBlur(gray, 3),
+}
+
+Combo = Tuple[str, int]
+DEFAULT_ORDER: List[Combo] = [(name, angle) for name in VARIANT_BUILDERS for angle in ROTATION_ANGLES]
+
+
+def combo_name(combo: Combo) -> str:
+    return f"{combo[0]}_rot{combo[1]}"
+
+
+class LazyVariants:
+    """Variantes de uma imagem em tons de cinza, calculadas (e cronometradas) no primeiro uso"""
+
+    def __init__(self, gray: np.ndarray):
+        self.gray = gray
+        self._cache: Dict[str, np.ndarray] = {}
+        self.build_times: Dict[str, float] = {}
+        # Uma trava por variante: threads que pedem variantes diferentes não esperam umas pelas outras
+        self._locks = {name: threading.Lock() for name in VARIANT_BUILDERS}
+
+    def get(self, name: str) -> np.ndarray:
+        with self._locks[name]:
+            if name not in self._cache:
+                start = time.perf_counter()
+                variant = VARIANT_BUILDERS[name](self.gray)
+                self.build_times[name] = time.perf_counter() - start
+                self._cache[name] = variant
+            return self._cache[name]
+
+    @property
+    def computed(self) -> List[str]:
+        return [name for name in VARIANT_BUILDERS if name in self._cache]
+
+
+class DecodeStats:
+    """
+    Estatísticas persistidas de cada combinação (variante, ângulo)
+
+    Args:
+        path: Arquivo JSON (None desativa a gravação)
+        save_every: Leituras entre duas gravações
+    """
+
+    def __init__(self, path: Optional[str] = STATS_FILE, save_every: int = SAVE_EVERY):
+        self.path = path
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        # combo -> {"tries", "successes", "cost"}; variante -> custo de cálculo
+        self.combos: Dict[str, Dict[str, float]] = {}
+        self.variant_costs: Dict[str, float] = {}
+        self._load()
+
+    def schedule(self, limit: int = MAX_ATTEMPTS) -> List[Combo]:
+        """As `limit` combinações mais promissoras, em ordem de tentativa"""
+        with self._lock:
+            default_cost = self._mean_cost()
+            scored = []
+            for rank, combo in enumerate(DEFAULT_ORDER):
+                entry = self.combos.get(combo_name(combo), {})
+                prior_rate = 0.5 / (1 + rank)  # Preserva a ordem original sem histórico
+                rate = (entry.get("successes", 0) + PRIOR_WEIGHT * prior_rate) / (entry.get("tries", 0) + PRIOR_WEIGHT)
+                cost = entry.get("cost") or default_cost
+                scored.append((-rate / cost, rank, combo))
+            scored.sort()
+            return [combo for _, _, combo in scored[:limit]]
+
+    def record(self, tried: List[Tuple[Combo, float]], winner: Optional[Combo], build_times: Dict[str, float]):
+        """
+        Registra uma leitura
+
+        Args:
+            tried: (combinação, segundos) de cada tentativa feita
+            winner: Combinação que decodificou (None se nenhuma)
+            build_times: Segundos gastos para calcular cada variante usada
+        """
+        with self._lock:
+            for combo, seconds in tried:
+                entry = self.combos.setdefault(combo_name(combo), {"tries": 0, "successes": 0, "cost": None})
+                entry["tries"] += 1
+                entry["successes"] += combo == winner
+                entry["cost"] = _smooth(entry["cost"], seconds)
+            for name, seconds in build_times.items():
+                self.variant_costs[name] = _smooth(self.variant_costs.get(name), seconds)
+            self._unsaved += 1
+            should_save = self._unsaved >= self.save_every
+        if should_save:
+            self.save()
+
+    def estimate_default_time(self, winner: Optional[Combo]) -> Optional[float]:
+        """
+        Tempo estimado da ordem fixa original para a mesma imagem: as cinco
+        variantes calculadas de antemão e as tentativas até a vencedora (ou as
+        MAX_ATTEMPTS, se a vencedora estava fora delas). None sem histórico.
+        """
+        with self._lock:
+            if not self.variant_costs or not self.combos:
+                return None
+            default_cost = self._mean_cost()
+            mean_build = sum(self.variant_costs.values()) / len(self.variant_costs)
+            total = sum(self.variant_costs.get(name, mean_build) for name in VARIANT_BUILDERS)
+            for combo in DEFAULT_ORDER[:MAX_ATTEMPTS]:
+                total += self.combos.get(combo_name(combo), {}).get("cost") or default_cost
+                if combo == winner:
+                    break
+            return total
+
+    def save(self):
+        """Grava as estatísticas de forma atômica"""
+        with self._lock:
+            if not self.path or not self._unsaved:
+                return
+            data = json.dumps({"combos": self.combos, "variant_costs": self.variant_costs}, indent=1)
+            self._unsaved = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"[v1] Erro ao gravar estatísticas de decodificação: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # --- Funções internas ---
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self.combos = data.get("combos", {})
+            self.variant_costs = data.get("variant_costs", {})
+        except (OSError, ValueError) as e:
+            print(f"[v1] Estatísticas de decodificação ignoradas ({e})")
+
+    def _mean_cost(self) -> float:
+        costs = [entry["cost"] for entry in self.combos.values() if entry.get("cost")]
+        return sum(costs) / len(costs) if costs else 1.0
+
+
+def _smooth(previous: Optional[float], value: float) -> float:
+    return value if previous is None else (1 - COST_SMOOTHING) * previous + COST_SMOOTHING * value
+
+
+_stats = None
+_stats_lock = threading.Lock()
+
+def get_decode_stats() -> DecodeStats:
+    """Estatísticas compartilhadas do processo (gravadas também na saída)"""
+    global _stats
+    with _stats_lock:
+        if _stats is None:
+            _stats = DecodeStats()
+            atexit.register(_stats.save)
+        return _stats
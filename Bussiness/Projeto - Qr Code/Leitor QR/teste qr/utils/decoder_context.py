@@ -0,0 +1,59 @@
+"""
+Objetos do OpenCV reaproveitados entre chamadas, um conjunto por thread
+
+cv2.QRCodeDetector e CLAHE eram criados a cada tentativa/chamada e cada
+conversão para cinza alocava um array novo; no vídeo isso acontece a cada
+frame. O DecoderContext da thread guarda o detector, o CLAHE e buffers de
+trabalho (passados como dst= às funções do OpenCV), realocados só quando o
+tamanho do frame muda. Os objetos do OpenCV não são thread-safe, por isso
+cada thread (vídeo, upload, pool de decodificação) tem o seu.
+"""
+
+import threading
+from typing import Dict, Tuple
+
+import cv2
+import numpy as np
+
+CLAHE_CLIP_LIMIT = 3.0
+CLAHE_TILE_GRID = (8, 8)
+
+
+class DecoderContext:
+    """
+    Detector, CLAHE e buffers de trabalho de uma thread
+
+    Os arrays devolvidos por buffer() e gray() são reescritos na próxima
+    chamada com o mesmo nome: servem para resultados intermediários, não
+    para o que a função devolve a quem chamou.
+    """
+
+    def __init__(self):
+        self.qr_detector = cv2.QRCodeDetector()
+        self.clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID)
+        self._buffers: Dict[str, np.ndarray] = {}
+        self.allocations = 0  # Buffers (re)alocados desde a criação
+
+    def buffer(self, name: str, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Buffer de trabalho `name` com o formato pedido (reaproveitado se já existe)"""
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != tuple(shape) or buf.dtype != dtype:
+            buf = self._buffers[name] = np.empty(shape, dtype=dtype)
+            self.allocations += 1
+        return buf
+
+    def gray(self, image: np.ndarray, name: str = "gray") -> np.ndarray:
+        """Imagem em tons de cinza num buffer de trabalho (a própria imagem, se já for cinza)"""
+        if len(image.shape) == 2:
+            return image
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY, dst=self.buffer(name, image.shape[:2]))
+
+
+_local = threading.local()
+
+def get_decoder_context() -> DecoderContext:
+    """Contexto da thread atual (criado no primeiro uso)"""
+    context = getattr(_local, "context", None)
+    if context is None:
+        context = _local.context = DecoderContext()
+    return context
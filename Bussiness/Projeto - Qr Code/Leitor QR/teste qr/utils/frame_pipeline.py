@@ -0,0 +1,146 @@
+"""
+Pipeline de frames do vídeo fora da thread do WebRTC
+
+VideoProcessor.recv só entrega o frame mais recente a um buffer de uma vaga
+e devolve o vídeo na hora; uma thread dedicada processa (decodifica) os
+frames e publica os resultados numa fila thread-safe, lida pela thread do
+Streamlit. Se a decodificação for mais lenta que a câmera, os frames
+intermediários são descartados (o mais novo substitui o que esperava):
+nada se acumula e a latência do vídeo não depende do custo de decodificar.
+"""
+
+import queue
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+RESULTS_MAX = 32  # Resultados não lidos guardados (os mais antigos saem primeiro)
+
+
+class PipelineResult(NamedTuple):
+    """Resultado do processamento de um frame"""
+    frame_id: int
+    value: Any
+    seconds: float      # Tempo de processamento do frame
+    finished_at: float  # time.monotonic() ao terminar
+
+
+class LatestFrameSlot:
+    """Buffer de uma vaga: put() substitui o frame que ainda não foi retirado"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item: Optional[Tuple[int, Any]] = None
+        self._next_id = 0
+        self.dropped = 0
+
+    def put(self, frame) -> int:
+        """Guarda o frame (descartando o anterior, se não foi retirado) e devolve seu id"""
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._next_id += 1
+            self._item = (self._next_id, frame)
+            self._cond.notify()
+            return self._next_id
+
+    def take(self, timeout: Optional[float] = None) -> Optional[Tuple[int, Any]]:
+        """Retira o frame mais recente, esperando até `timeout` segundos; None se não chegou nenhum"""
+        with self._cond:
+            if self._item is None:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+
+class FramePipeline:
+    """
+    Thread de processamento alimentada pelo frame mais recente
+
+    Args:
+        process: Função aplicada a cada frame (roda na thread do pipeline);
+            se devolver None, nada é publicado para esse frame
+        min_interval_ms: Intervalo mínimo entre o início de dois processamentos
+        name: Nome da thread
+    """
+
+    def __init__(self, process: Callable[[Any], Any], min_interval_ms: float = 0,
+                 name: str = "frame-pipeline"):
+        self.process = process
+        self.min_interval_ms = min_interval_ms
+        self.processed = 0
+        self.errors = 0
+        self._slot = LatestFrameSlot()
+        self._results: "queue.Queue[PipelineResult]" = queue.Queue(maxsize=RESULTS_MAX)
+        self._latest: Optional[PipelineResult] = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, frame) -> int:
+        """Entrega um frame ao pipeline sem esperar (chamado pela thread do vídeo)"""
+        return self._slot.put(frame)
+
+    @property
+    def latest(self) -> Optional[PipelineResult]:
+        """Último resultado produzido (para desenhar no vídeo), sem retirá-lo da fila"""
+        return self._latest
+
+    @property
+    def dropped(self) -> int:
+        """Frames substituídos por um mais novo antes de serem processados"""
+        return self._slot.dropped
+
+    def get_result(self, timeout: Optional[float] = None) -> Optional[PipelineResult]:
+        """Próximo resultado da fila, esperando até `timeout` segundos (None se não houver)"""
+        try:
+            return self._results.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        self._slot.put(None)  # Acorda a thread se ela está esperando frame
+        self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    # --- Funções internas ---
+
+    def _run(self):
+        last_start = 0.0
+        while not self._stop.is_set():
+            wait = last_start + self.min_interval_ms / 1000 - time.monotonic()
+            if wait > 0 and self._stop.wait(wait):
+                break
+            item = self._slot.take(timeout=0.5)
+            if item is None or self._stop.is_set():
+                continue
+            frame_id, frame = item
+
+            last_start = time.monotonic()
+            try:
+                value = self.process(frame)
+            except Exception as e:
+                self.errors += 1
+                print(f"[v0] Erro no pipeline de frames: {e}")
+                continue
+            finished_at = time.monotonic()
+            self.processed += 1
+            if value is None:
+                continue
+            self._publish(PipelineResult(frame_id, value, finished_at - last_start, finished_at))
+
+    def _publish(self, result: PipelineResult):
+        self._latest = result
+        while True:
+            try:
+                self._results.put_nowait(result)
+                return
+            except queue.Full:
+                try:
+                    self._results.get_nowait()  # Ninguém está lendo: descarta o mais antigo
+                except queue.Empty:
+                    pass
@@ -0,0 +1,180 @@
+"""
+Filtro de Bloom das chaves de acesso, compartilhado pelo processo
+
+Fica na frente do índice de chaves (utils/key_index.py) no caminho do vídeo:
+"não está no filtro" garante que a chave é nova, sem tocar no SQLite; "está
+no filtro" pode ser falso positivo (~0,1%) e é confirmado no índice. Ocupa
+~1,8 MB por milhão de chaves, uma vez por processo (e não um set por sessão),
+e é gravado em disco para não ser reconstruído a cada inicialização.
+"""
+
+import atexit
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+from typing import Iterable, Optional
+
+FILTER_SUFFIX = ".bloom"
+ERROR_RATE = 0.001
+MIN_CAPACITY = 100_000
+SAVE_EVERY = 100  # Chaves novas entre duas gravações do filtro em disco
+
+_HEADER = struct.Struct("<4sIQQQ")  # magic, hashes, bits, capacidade, chaves inseridas
+_MAGIC = b"BLM1"
+
+
+class BloomFilter:
+    """
+    Filtro de Bloom sobre um bytearray (hash duplo com BLAKE2b)
+
+    Args:
+        capacity: Número de chaves para o qual a taxa de erro é garantida
+        error_rate: Taxa de falsos positivos desejada
+    """
+
+    def __init__(self, capacity: int, error_rate: float = ERROR_RATE):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def update(self, keys: Iterable[str]):
+        for key in keys:
+            self.add(key)
+
+    @property
+    def full(self) -> bool:
+        return self.count > self.capacity
+
+    def to_bytes(self) -> bytes:
+        return _HEADER.pack(_MAGIC, self.num_hashes, self.num_bits, self.capacity, self.count) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BloomFilter":
+        magic, num_hashes, num_bits, capacity, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC or len(data) != _HEADER.size + (num_bits + 7) // 8:
+            raise ValueError("Arquivo de filtro inválido")
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.num_bits, bloom.num_hashes, bloom.count = capacity, num_bits, num_hashes, count
+        bloom.bits = bytearray(data[_HEADER.size:])
+        return bloom
+
+    # --- Funções internas ---
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+
+class KeyFilter:
+    """
+    Filtro de Bloom persistido, sincronizado com o índice autoritativo
+
+    Args:
+        index: utils.key_index.KeyIndex (fonte das chaves e da confirmação)
+        path: Arquivo do filtro (padrão: <csv>.bloom)
+    """
+
+    def __init__(self, index, path: Optional[str] = None):
+        self.index = index
+        self.path = path or index.csv_file + FILTER_SUFFIX
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._bloom = self._load() or self._build()
+
+    def might_contain(self, access_key: str) -> bool:
+        """False: a chave com certeza é nova. True: provavelmente já existe (confirmar com is_duplicate)"""
+        with self._lock:
+            return access_key in self._bloom
+
+    def is_duplicate(self, access_key: str) -> bool:
+        """Resposta exata: o índice só é consultado quando o filtro acusa a chave"""
+        return self.might_contain(access_key) and self.index.contains(access_key)
+
+    def add(self, access_key: str):
+        """Registra uma chave salva (grava o filtro a cada SAVE_EVERY chaves)"""
+        with self._lock:
+            if access_key in self._bloom:
+                return
+            self._bloom.add(access_key)
+            self._unsaved += 1
+            grow = self._bloom.full
+        if grow:
+            self.rebuild()
+        elif self._unsaved >= SAVE_EVERY:
+            self.save()
+
+    def rebuild(self):
+        """Recria o filtro a partir do índice (com folga para o dobro das chaves)"""
+        bloom = self._build()
+        with self._lock:
+            self._bloom = bloom
+
+    def save(self):
+        """Grava o filtro de forma atômica (arquivo temporário + os.replace)"""
+        with self._lock:
+            if not self._unsaved:
+                return
+            data = self._bloom.to_bytes()
+            self._unsaved = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            print(f"Erro ao gravar filtro de chaves: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    # --- Funções internas ---
+
+    def _load(self) -> Optional[BloomFilter]:
+        """Filtro do disco, se existir e cobrir todas as chaves do índice"""
+        try:
+            with open(self.path, "rb") as f:
+                bloom = BloomFilter.from_bytes(f.read())
+        except (OSError, ValueError, struct.error):
+            return None
+        # Chaves gravadas por outro processo depois do último save: reconstrói
+        if bloom.full or self.index.count() > bloom.count:
+            return None
+        return bloom
+
+    def _build(self) -> BloomFilter:
+        keys = list(self.index.keys())
+        bloom = BloomFilter(max(MIN_CAPACITY, 2 * len(keys)))
+        bloom.update(keys)
+        with self._lock:
+            self._unsaved = max(1, len(keys))
+        self._bloom = bloom
+        self.save()
+        return bloom
+
+
+_filters = {}
+_filters_lock = threading.Lock()
+
+def get_key_filter(index) -> KeyFilter:
+    """Filtro compartilhado do processo para o índice informado (gravado também na saída)"""
+    with _filters_lock:
+        key_filter = _filters.get(index.path)
+        if key_filter is None:
+            key_filter = _filters[index.path] = KeyFilter(index)
+            atexit.register(key_filter.save)
+        return key_filter
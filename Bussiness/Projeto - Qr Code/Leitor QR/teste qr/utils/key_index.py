@@ -0,0 +1,263 @@
+"""
+Índice persistente das chaves de acesso (SQLite com chave primária)
+
+O CSV continua sendo o registro oficial dos cupons; o índice só responde
+"essa chave já foi salva?" em tempo constante, sem ler o CSV inteiro.
+O tamanho e a data de modificação do CSV indexado ficam gravados junto: se o
+arquivo for apagado ou editado fora do sistema, o índice é reconstruído a partir dele.
+
+Chaves aceitas que ainda esperam no buffer de algum processo (utils/receipt_log.py)
+ficam na tabela `pending` com o dono: os outros processos as enxergam e não gravam
+a mesma chave de novo. Cada dono mantém uma trava em <índice>.<dono>.owner enquanto
+está vivo; se a trava está livre, o processo caiu e as chaves dele saem do índice.
+"""
+
+import csv
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Callable, Iterable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from utils.receipt_log import file_signature
+
+INDEX_SUFFIX = ".keys.sqlite"
+OWNER_SUFFIX = ".owner"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS keys (
+    access_key TEXT PRIMARY KEY
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS pending (
+    access_key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def read_csv_keys(csv_file: str) -> Iterable[str]:
+    """Lê apenas a coluna access_key do CSV, como texto (sem perder zeros à esquerda)"""
+    if not os.path.exists(csv_file):
+        return
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            key = (row.get('access_key') or '').strip()
+            if key:
+                yield key
+
+
+def _try_lock(lock_file) -> bool:
+    """Trava exclusiva sem esperar: False se outro processo já a tem"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+class KeyIndex:
+    """
+    Conjunto persistente de chaves de acesso ligado a um CSV
+
+    Args:
+        csv_file: CSV de cupons que o índice acompanha
+        path: Arquivo SQLite do índice (padrão: <csv_file>.keys.sqlite)
+        pending_keys: Chaves aceitas mas ainda não gravadas no CSV (buffer do
+            utils/receipt_log.py), preservadas quando o índice é reconstruído
+    """
+
+    def __init__(self, csv_file: str, path: Optional[str] = None,
+                 pending_keys: Optional[Callable[[], Iterable[str]]] = None):
+        self.csv_file = csv_file
+        self.path = path or csv_file + INDEX_SUFFIX
+        self.pending_keys = pending_keys
+        self._token = uuid.uuid4().hex  # Dono das chaves deste processo na tabela pending
+        self._lock = threading.RLock()  # add() -> on_new -> flush do log -> advance()
+        self._owner_file = None
+        if pending_keys is not None:
+            self._owner_file = open(self._owner_path(self._token), 'a+b')
+            _try_lock(self._owner_file)  # Arquivo novo: ninguém mais o conhece
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._forget_dead_owners()
+
+    def contains(self, access_key: str) -> bool:
+        """Verifica se a chave já está indexada"""
+        with self._lock:
+            self._sync()
+            return self._conn.execute(
+                "SELECT 1 FROM keys WHERE access_key = ?", (access_key,)
+            ).fetchone() is not None
+
+    def add(self, access_key: str, on_new: Optional[Callable[[], None]] = None) -> bool:
+        """
+        Indexa a chave
+
+        Args:
+            on_new: Chamada (dentro da mesma transação) quando a chave é nova,
+                para gravar o cupom no CSV; se levantar exceção, a chave não
+                é indexada e a exceção é propagada
+
+        Returns:
+            True se a chave é nova, False se já existia
+        """
+        with self._lock:
+            self._sync()
+            with self._conn:
+                cursor = self._conn.execute("INSERT OR IGNORE INTO keys VALUES (?)", (access_key,))
+                if cursor.rowcount == 0:
+                    return False
+                if on_new is not None:
+                    if self.pending_keys is not None:
+                        # Antes de on_new: se ele gravar o CSV na hora, advance() já limpa
+                        self._conn.execute("INSERT OR REPLACE INTO pending VALUES (?, ?)",
+                                           (access_key, self._token))
+                    on_new()
+                    self._set_csv_signature(self._csv_signature())
+            return True
+
+    def keys(self) -> Iterable[str]:
+        """Todas as chaves indexadas (usado para montar o filtro de Bloom)"""
+        with self._lock:
+            self._sync()
+            return [row[0] for row in self._conn.execute("SELECT access_key FROM keys")]
+
+    def advance(self, before: str, after: str):
+        """
+        O CSV passou de `before` para `after` por uma gravação nossa: as chaves
+        gravadas deixam de ser pendentes e, se o índice estava em dia com `before`,
+        continua em dia (sem reconstrução). Caso contrário outro processo também
+        escreveu, e a próxima consulta reconstrói.
+        """
+        with self._lock:
+            in_add = self._conn.in_transaction  # Chamado de dentro do add(): ele faz o commit
+            self._release_written()
+            if self._in_sync_with(before):
+                self._set_csv_signature(after)
+            if not in_add:
+                self._conn.commit()
+
+    def rebuild(self):
+        """Reconstrói o índice a partir do CSV (O(n), só quando o CSV mudou por fora)"""
+        with self._lock:
+            self._rebuild()
+
+    def count(self) -> int:
+        with self._lock:
+            self._sync()
+            return self._conn.execute("SELECT COUNT(*) FROM keys").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+            if self._owner_file is not None:
+                # Chaves ainda no buffer ficam órfãs: o próximo processo as descarta
+                self._owner_file.close()
+                self._owner_file = None
+                self._remove_owner_file(self._token)
+
+    # --- Funções internas ---
+
+    def _csv_signature(self) -> str:
+        return file_signature(self.csv_file)
+
+    def _set_csv_signature(self, signature: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('csv_signature', ?)", (signature,))
+
+    def _in_sync_with(self, signature: str) -> bool:
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'csv_signature'").fetchone()
+        return row is not None and row[0] == signature
+
+    def _owner_path(self, owner: str) -> str:
+        return f"{self.path}.{owner}{OWNER_SUFFIX}"
+
+    def _remove_owner_file(self, owner: str):
+        try:
+            os.remove(self._owner_path(owner))
+        except OSError:
+            pass
+
+    def _owner_alive(self, owner: str) -> bool:
+        """O dono segura a trava do seu arquivo .owner enquanto o processo vive"""
+        if owner == self._token:
+            return True
+        try:
+            with open(self._owner_path(owner), 'r+b') as owner_file:
+                return not _try_lock(owner_file)
+        except OSError:
+            return False  # Arquivo removido no close()
+
+    def _forget_dead_owners(self):
+        """
+        Na abertura: chaves pendentes de processos que caíram (ou fecharam sem
+        gravar o buffer) nunca chegarão ao CSV. Se houver alguma, elas saem da
+        tabela pending e o índice é reconstruído sem elas.
+        """
+        with self._lock:
+            owners = [row[0] for row in self._conn.execute("SELECT DISTINCT owner FROM pending")]
+            dead = [owner for owner in owners if not self._owner_alive(owner)]
+            if not dead:
+                return
+            with self._conn:
+                self._conn.executemany("DELETE FROM pending WHERE owner = ?",
+                                       ((owner,) for owner in dead))
+            self._rebuild()
+            for owner in dead:
+                self._remove_owner_file(owner)
+
+    def _release_written(self):
+        """Remove da tabela pending as chaves deste processo que já saíram do buffer"""
+        if self.pending_keys is None:
+            return
+        buffered = set(self.pending_keys())
+        written = [row[0] for row in self._conn.execute(
+            "SELECT access_key FROM pending WHERE owner = ?", (self._token,)
+        ) if row[0] not in buffered]
+        self._conn.executemany("DELETE FROM pending WHERE access_key = ?",
+                               ((key,) for key in written))
+
+    def _sync(self):
+        """Um os.stat por operação: reconstrói só se o CSV não é o que foi indexado"""
+        if not self._in_sync_with(self._csv_signature()):
+            self._rebuild()
+
+    def _rebuild(self):
+        """CSV + chaves pendentes de todos os processos vivos (tabela pending)"""
+        with self._conn:
+            self._release_written()  # Ex: buffer descartado com o CSV apagado
+            self._conn.execute("DELETE FROM keys")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO keys VALUES (?)",
+                ((key,) for key in read_csv_keys(self.csv_file))
+            )
+            self._conn.execute("INSERT OR IGNORE INTO keys SELECT access_key FROM pending")
+            self._set_csv_signature(self._csv_signature())
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+def get_key_index(csv_file: str, **kwargs) -> KeyIndex:
+    """Índice compartilhado do processo para o CSV informado"""
+    with _indexes_lock:
+        index = _indexes.get(csv_file)
+        if index is None:
+            index = _indexes[csv_file] = KeyIndex(csv_file, **kwargs)
+        return index
@@ -0,0 +1,147 @@
+"""
+Filtro de movimento do vídeo: só decodifica quando a cena muda
+
+Cada frame vira uma assinatura barata (miniatura 32x24 em tons de cinza) e é
+comparado com o último frame decodificado: a cena mudou se uma fração
+mínima das células da miniatura mudou mais que PIXEL_DELTA (a média da
+diferença diluiria um QR pequeno mudando de lugar; o ruído do sensor some
+na redução).
+Cena parada (câmera apontada para o mesmo cupom ou para nada) reaproveita o
+resultado anterior em vez de decodificar. Quando a cena muda mas o QR lido
+continua no mesmo lugar (a miniatura da região dele não mudou), o resultado
+também é reaproveitado. De tempos em tempos (REFRESH_S) decodifica assim
+mesmo, para acompanhar mudanças lentas de luz e foco. Logo depois de uma
+mudança sem QR lido (o frame decodificado pode ter saído tremido), os
+frames parados continuam sendo decodificados por SETTLE_S segundos.
+"""
+
+import time
+from typing import Any, NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+SIGNATURE_SIZE = (32, 24)   # (largura, altura) da miniatura do frame
+QR_PATCH_SIZE = (16, 16)    # Miniatura da região do QR
+PIXEL_DELTA = 20            # Diferença (0-255) para uma célula da miniatura contar como mudada
+CHANGED_FRACTION = 0.02     # Fração de células mudadas a partir da qual a cena mudou
+QR_MATCH_THRESHOLD = 12.0   # Diferença média máxima para o QR ainda ser o mesmo
+REFRESH_S = 2.0             # Decodifica pelo menos uma vez nesse intervalo
+SETTLE_S = 0.6              # Após uma mudança sem QR lido, continua decodificando enquanto a cena assenta
+
+Box = Tuple[int, int, int, int]
+
+
+class GateDecision(NamedTuple):
+    """decode=False: reaproveitar `result` (motivo em `reason`)"""
+    decode: bool
+    reason: str  # "first", "changed", "settling", "refresh", "static" ou "same_qr"
+    result: Any = None
+
+
+def frame_signature(frame: np.ndarray, size: Tuple[int, int] = SIGNATURE_SIZE) -> np.ndarray:
+    """Miniatura em tons de cinza (reduz primeiro, converte depois: barato em frames grandes)"""
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    if len(small.shape) == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+
+def mean_abs_diff(a: np.ndarray, b: np.ndarray) -> float:
+    return float(cv2.mean(cv2.absdiff(a, b))[0])
+
+
+def changed_fraction(a: np.ndarray, b: np.ndarray, delta: int = PIXEL_DELTA) -> float:
+    """Fração das células que mudaram mais que `delta`"""
+    return np.count_nonzero(cv2.absdiff(a, b) > delta) / a.size
+
+
+class MotionGate:
+    """
+    Decide, frame a frame, se vale a pena decodificar
+
+    Args:
+        threshold: Fração de células mudadas que conta como mudança de cena
+        qr_threshold: Diferença média máxima para considerar o mesmo QR no lugar
+        refresh_s: Intervalo máximo sem decodificar
+        settle_s: Tempo, após uma mudança de cena sem QR lido, em que frames parados ainda são decodificados
+    """
+
+    def __init__(self, threshold: float = CHANGED_FRACTION, qr_threshold: float = QR_MATCH_THRESHOLD,
+                 refresh_s: float = REFRESH_S, settle_s: float = SETTLE_S):
+        self.threshold = threshold
+        self.qr_threshold = qr_threshold
+        self.refresh_s = refresh_s
+        self.settle_s = settle_s
+        self.decoded = 0
+        self.skipped_static = 0
+        self.reused_qr = 0
+        self._signature: Optional[np.ndarray] = None
+        self._decoded_at = 0.0
+        self._changed_at = 0.0
+        self._result: Any = None
+        self._qr_box: Optional[Box] = None
+        self._qr_patch: Optional[np.ndarray] = None
+
+    def check(self, frame: np.ndarray) -> GateDecision:
+        """Compara o frame com o último decodificado"""
+        signature = frame_signature(frame)
+        now = time.monotonic()
+        if self._signature is None or signature.shape != self._signature.shape:
+            self._changed_at = now
+            return self._decide(GateDecision(True, "first"))
+        if now - self._decoded_at >= self.refresh_s:
+            return self._decide(GateDecision(True, "refresh"))
+        if changed_fraction(signature, self._signature) < self.threshold:
+            if self._qr_box is None and now - self._changed_at < self.settle_s:
+                return self._decide(GateDecision(True, "settling"))
+            return self._decide(GateDecision(False, "static", self._result))
+        if self._qr_box is not None:
+            patch = self._patch(frame, self._qr_box)
+            if patch is not None and mean_abs_diff(patch, self._qr_patch) < self.qr_threshold:
+                return self._decide(GateDecision(False, "same_qr", self._result))
+        self._changed_at = now
+        return self._decide(GateDecision(True, "changed"))
+
+    def remember(self, frame: np.ndarray, result: Any, qr_box: Optional[Box] = None):
+        """
+        Registra um frame decodificado
+
+        Args:
+            result: Resultado a reaproveitar enquanto a cena não mudar
+            qr_box: (x, y, w, h) do QR lido, para seguir o QR quando o resto da cena muda
+        """
+        self._signature = frame_signature(frame)
+        self._decoded_at = time.monotonic()
+        self._result = result
+        self._qr_box = qr_box
+        self._qr_patch = self._patch(frame, qr_box) if qr_box is not None else None
+        if self._qr_patch is None:
+            self._qr_box = None
+
+    @property
+    def skip_ratio(self) -> float:
+        """Fração dos frames verificados que não precisaram ser decodificados"""
+        skipped = self.skipped_static + self.reused_qr
+        total = skipped + self.decoded
+        return skipped / total if total else 0.0
+
+    # --- Funções internas ---
+
+    def _decide(self, decision: GateDecision) -> GateDecision:
+        if decision.decode:
+            self.decoded += 1
+        elif decision.reason == "static":
+            self.skipped_static += 1
+        else:
+            self.reused_qr += 1
+        return decision
+
+    @staticmethod
+    def _patch(frame: np.ndarray, box: Box) -> Optional[np.ndarray]:
+        x, y, w, h = box
+        x0, y0 = max(0, x), max(0, y)
+        x1, y1 = min(frame.shape[1], x + w), min(frame.shape[0], y + h)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            return None
+        return frame_signature(frame[y0:y1, x0:x1], QR_PATCH_SIZE)
@@ -0,0 +1,129 @@
+"""
+Localização do QR Code antes da decodificação
+
+Em fotos de cupons o QR ocupa uma fração pequena da imagem, mas pyzbar, o
+cv2.QRCodeDetector, as variantes de pré-processamento e as rotações
+trabalhavam sobre o quadro inteiro. Aqui o QR é localizado numa cópia
+reduzida da imagem (QRCodeDetector.detect e, se ele falhar, os três padrões
+de posição encontrados por contornos) e a região, com margem, é recortada
+da imagem original. Todas as tentativas passam a rodar só no recorte.
+"""
+
+from typing import NamedTuple, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from utils.decoder_context import get_decoder_context
+
+LOCATE_MAX_SIDE = 640    # Maior lado da cópia reduzida usada para localizar
+ROI_PADDING = 0.25       # Margem em volta do QR, em fração do lado dele (cobre as rotações de ±10°)
+MIN_PADDING_PX = 16
+MAX_ROI_FRACTION = 0.5   # Recortes maiores que isso da imagem não compensam
+
+Box = Tuple[int, int, int, int]
+
+
+class Roi(NamedTuple):
+    """Recorte da imagem com a posição (x, y) do seu canto na imagem original"""
+    image: np.ndarray
+    x: int
+    y: int
+
+    def to_image_coords(self, box: Box) -> Box:
+        """Converte (x, y, w, h) do recorte para a imagem original"""
+        x, y, w, h = box
+        return (x + self.x, y + self.y, w, h)
+
+
+def locate_qr(image: np.ndarray, max_side: int = LOCATE_MAX_SIDE) -> Optional[Box]:
+    """
+    Localiza o QR Code numa cópia reduzida da imagem
+
+    Returns:
+        (x, y, w, h) do QR na imagem original, ou None se não encontrado
+    """
+    ctx = get_decoder_context()
+    gray = ctx.gray(image, "locate_gray")
+    h, w = gray.shape[:2]
+    scale = min(1.0, max_side / max(h, w))
+    if scale < 1:
+        size = (max(1, round(w * scale)), max(1, round(h * scale)))
+        small = cv2.resize(gray, size, dst=ctx.buffer("locate_small", size[::-1]), interpolation=cv2.INTER_AREA)
+        scale_x, scale_y = size[0] / w, size[1] / h
+    else:
+        small, scale_x, scale_y = gray, 1.0, 1.0
+
+    points = _detect_points(small)
+    if points is None:
+        points = _finder_pattern_points(small)
+    if points is None:
+        return None
+
+    bx, by, bw, bh = cv2.boundingRect((points / (scale_x, scale_y)).astype(np.float32))
+    if bw < 8 or bh < 8:
+        return None
+    return (bx, by, bw, bh)
+
+
+def crop_qr_region(image: np.ndarray, max_side: int = LOCATE_MAX_SIDE) -> Optional[Roi]:
+    """
+    Recorta a região do QR Code (com margem) da imagem original
+
+    Returns:
+        Roi, ou None se o QR não foi localizado ou se o recorte seria quase a imagem toda
+    """
+    box = locate_qr(image, max_side)
+    if box is None:
+        return None
+
+    h, w = image.shape[:2]
+    bx, by, bw, bh = box
+    pad = max(MIN_PADDING_PX, int(ROI_PADDING * max(bw, bh)))
+    x0, y0 = max(0, bx - pad), max(0, by - pad)
+    x1, y1 = min(w, bx + bw + pad), min(h, by + bh + pad)
+    if (x1 - x0) * (y1 - y0) > MAX_ROI_FRACTION * w * h:
+        return None
+    return Roi(image[y0:y1, x0:x1], x0, y0)
+
+
+# --- Funções internas ---
+
+def _detect_points(gray: np.ndarray) -> Optional[np.ndarray]:
+    try:
+        found, points = get_decoder_context().qr_detector.detect(gray)
+    except cv2.error:
+        return None
+    if not found or points is None:
+        return None
+    return points.reshape(-1, 2)
+
+
+def _finder_pattern_points(gray: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Padrões de posição (quadrados concêntricos nos cantos do QR): contornos
+    quase quadrados com pelo menos dois níveis de contornos dentro deles.
+    Devolve os cantos dos padrões encontrados, se houver ao menos três.
+    """
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU,
+                              dst=get_decoder_context().buffer("locate_binary", gray.shape))
+    contours, hierarchy = cv2.findContours(binary, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+    if hierarchy is None:
+        return None
+    hierarchy = hierarchy[0]
+
+    patterns = []
+    for i, contour in enumerate(contours):
+        child = hierarchy[i][2]
+        if child < 0 or hierarchy[child][2] < 0:
+            continue
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < 6 or h < 6 or not 0.7 < w / h < 1.4:
+            continue
+        patterns.append(contour.reshape(-1, 2))
+
+    if len(patterns) < 3:
+        return None
+    # Os três maiores: letras e ruído do cupom raramente formam quadrados concêntricos grandes
+    patterns.sort(key=lambda pts: cv2.contourArea(pts.astype(np.float32)), reverse=True)
+    return np.concatenate(patterns[:3]).astype(np.float32)
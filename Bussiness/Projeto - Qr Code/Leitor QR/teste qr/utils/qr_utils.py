@@ -1,15 +1,23 @@
 import re
 import cv2
-from typing import Optional, List, Tuple
+from typing import Callable, Optional, List, Tuple
 from pyzbar.pyzbar import decode as pyzbar_decode
 import numpy as np
+import os
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.decode_strategy import DecodeStats, LazyVariants, MAX_ATTEMPTS, get_decode_stats
+from utils.decoder_context import get_decoder_context
+from utils.qr_locator import crop_qr_region
 
 # =======================
 # 🔹 Constantes
 # =======================
 ACCESS_KEY_LENGTH = 44
 SEFAZ_GO_URL_PREFIX = "https://nfeweb.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p="
+DECODE_WORKERS = min(4, os.cpu_count() or 1)  # Threads do modo paralelo de decode_qr_with_multiple_attempts
 
 
 # =======================
@@ -70,8 +78,11 @@ def find_all_access_keys(data: str) -> List[str]:
 def calculate_sharpness(image: np.ndarray) -> float:
     """Calcula nitidez da imagem (variância do Laplaciano)."""
     try:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-        return cv2.Laplacian(gray, cv2.CV_64F).var()
+        ctx = get_decoder_context()
+        gray = ctx.gray(image)
+        laplacian = cv2.Laplacian(gray, cv2.CV_64F, dst=ctx.buffer("laplacian", gray.shape, np.float64))
+        _, std = cv2.meanStdDev(laplacian)  # Como laplacian.var(), sem o array temporário do numpy
+        return float(std[0, 0] ** 2)
     except Exception as e:
         print(f"[v0] Erro em calculate_sharpness: {e}")
         return 0.0
@@ -80,8 +91,7 @@ def calculate_sharpness(image: np.ndarray) -> float:
 def calculate_brightness(image: np.ndarray) -> float:
     """Calcula brilho médio da imagem (0 a 255)."""
     try:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-        return float(np.mean(gray))
+        return float(np.mean(get_decoder_context().gray(image)))
     except Exception as e:
         print(f"[v0] Erro ao calcular brilho: {e}")
         return 128.0
@@ -96,10 +106,13 @@ def apply_auto_focus_simulation(image: np.ndarray, sharpness_threshold: float =
         if calculate_sharpness(image) >= sharpness_threshold:
             return image
 
-        blurred = cv2.GaussianBlur(image, (5, 5), 0)
-        gray = cv2.cvtColor(blurred, cv2.COLOR_BGR2GRAY) if len(blurred.shape) == 3 else blurred
-        equalized = cv2.equalizeHist(gray)
-        return cv2.cvtColor(equalized, cv2.COLOR_GRAY2BGR) if len(image.shape) == 3 else equalized
+        ctx = get_decoder_context()
+        blurred = cv2.GaussianBlur(image, (5, 5), 0, dst=ctx.buffer("blurred", image.shape))
+        gray = ctx.gray(blurred, "blurred_gray")
+        if len(image.shape) == 3:
+            equalized = cv2.equalizeHist(gray, dst=ctx.buffer("equalized", gray.shape))
+            return cv2.cvtColor(equalized, cv2.COLOR_GRAY2BGR)
+        return cv2.equalizeHist(gray)
     except Exception as e:
         print(f"[v0] Erro em auto_focus: {e}")
         return image
@@ -108,15 +121,15 @@ def apply_auto_focus_simulation(image: np.ndarray, sharpness_threshold: float =
 def preprocess_image_for_qr(image: np.ndarray) -> np.ndarray:
     """Aplica pré-processamento avançado para melhorar leitura de QR em fotos de notas."""
     try:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+        ctx = get_decoder_context()
+        gray = ctx.gray(image)
 
         # Equalização global + filtro bilateral
-        gray = cv2.equalizeHist(gray)
-        gray = cv2.bilateralFilter(gray, 9, 75, 75)
+        gray = cv2.equalizeHist(gray, dst=ctx.buffer("equalized", gray.shape))
+        gray = cv2.bilateralFilter(gray, 9, 75, 75, dst=ctx.buffer("bilateral", gray.shape))
 
         # CLAHE (contraste local)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        gray = clahe.apply(gray)
+        gray = ctx.clahe.apply(gray, dst=ctx.buffer("clahe", gray.shape))
 
         # Threshold adaptativo (binário)
         thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
@@ -130,12 +143,12 @@ def preprocess_image_for_qr(image: np.ndarray) -> np.ndarray:
 def balance_white_and_color(image: np.ndarray) -> np.ndarray:
     """Corrige coloração amarelada típica de notas fiscais."""
     try:
-        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-        l, a, b = cv2.split(lab)
-        clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-        cl = clahe.apply(l)
-        limg = cv2.merge((cl, a, b))
-        return cv2.cvtColor(limg, cv2.COLOR_LAB2BGR)
+        ctx = get_decoder_context()
+        lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB, dst=ctx.buffer("lab", image.shape))
+        l = cv2.extractChannel(lab, 0, dst=ctx.buffer("lab_l", image.shape[:2]))
+        cl = ctx.clahe.apply(l, dst=ctx.buffer("lab_l_clahe", image.shape[:2]))
+        cv2.insertChannel(cl, lab, 0)
+        return cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
     except Exception:
         return image
 
@@ -144,7 +157,16 @@ def balance_white_and_color(image: np.ndarray) -> np.ndarray:
 # 🔹 Leitura de QR Codes
 # =======================
 def decode_qr_from_image(image: np.ndarray) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
-    """Decodifica QR codes usando pyzbar."""
+    """Decodifica QR codes usando pyzbar (primeiro só na região localizada do QR, se houver)."""
+    roi = crop_qr_region(image)
+    if roi is not None:
+        qr_data_list, qr_coords_list = _pyzbar_decode(roi.image)
+        if qr_data_list:
+            return qr_data_list, [roi.to_image_coords(box) for box in qr_coords_list]
+    return _pyzbar_decode(image)
+
+
+def _pyzbar_decode(image: np.ndarray) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
     qr_data_list, qr_coords_list = [], []
     try:
         decoded = pyzbar_decode(image)
@@ -161,112 +183,203 @@ def decode_qr_from_image(image: np.ndarray) -> Tuple[List[str], List[Tuple[int,
     return qr_data_list, qr_coords_list
 
 
-def decode_qr_with_multiple_attempts(image: np.ndarray) -> Tuple[List[str], List[Tuple[int, int, int, int]], dict]:
+def _decode_attempt(rotated: np.ndarray) -> Tuple[List[str], List[Tuple[int, int, int, int]], Optional[str]]:
+    """Uma tentativa: pyzbar e, se falhar, cv2.QRCodeDetector. Retorna (dados, coordenadas, decodificador)."""
+    # 🔹 1) pyzbar
+    try:
+        decoded = pyzbar_decode(rotated)
+        if decoded:
+            qr_data_list, qr_coords_list = [], []
+            for obj in decoded:
+                try:
+                    data = obj.data.decode("utf-8")
+                except UnicodeDecodeError:
+                    data = obj.data.decode("latin-1", errors="ignore")
+                qr_data_list.append(data)
+                (x, y, w, h) = obj.rect
+                qr_coords_list.append((x, y, w, h))
+            return qr_data_list, qr_coords_list, "pyzbar"
+    except Exception as e:
+        print(f"[v1] Erro pyzbar: {e}")
+
+    # 🔹 2) Fallback: OpenCV
+    try:
+        val, points, _ = get_decoder_context().qr_detector.detectAndDecode(rotated)
+        if val:
+            if points is not None and len(points) > 0:
+                pts = points[0]
+                x, y, w, h = cv2.boundingRect(pts)
+                return [val], [(x, y, w, h)], "cv2"
+            return [val], [(0, 0, rotated.shape[1], rotated.shape[0])], "cv2"
+    except Exception as e:
+        print(f"[v1] Erro cv2: {e}")
+
+    return [], [], None
+
+
+def _rotate(variant: np.ndarray, ang: int) -> np.ndarray:
+    """Rotação leve (corrige QR torto)"""
+    if ang == 0:
+        return variant
+    (h, w) = variant.shape[:2]
+    M = cv2.getRotationMatrix2D((w // 2, h // 2), ang, 1.0)
+    return cv2.warpAffine(variant, M, (w, h))
+
+
+def decode_qr_with_multiple_attempts(image: np.ndarray, parallel: bool = False,
+                                     workers: int = DECODE_WORKERS,
+                                     decode_stats: Optional[DecodeStats] = None
+                                     ) -> Tuple[List[str], List[Tuple[int, int, int, int]], dict]:
     """
     Tenta decodificar QR codes com múltiplas abordagens mais robustas:
       - Variações de contraste e equalização
       - Threshold adaptativo e rotação
       - Fallback entre pyzbar e cv2.QRCodeDetector
+    As combinações (variante, ângulo) seguem a ordem aprendida em
+    utils/decode_strategy.py, e cada variante só é calculada se for usada.
+    Se o QR for localizado (utils/qr_locator.py), variantes e rotações são
+    feitas só no recorte em volta dele; se nenhuma tentativa ler o recorte,
+    a imagem inteira ainda é tentada uma vez.
+
+    Com parallel=True as combinações rodam num pool de `workers` threads
+    (OpenCV e zbar liberam o GIL): a primeira leitura bem-sucedida encerra a
+    busca e as tentativas que ainda não começaram são canceladas (ficam fora
+    das estatísticas, como no modo sequencial); as que já rodavam entram nas
+    estatísticas quando terminam, com o resultado que tiveram.
     Retorna (lista_dados, lista_coordenadas, métricas)
     """
     start = time.time()
-    attempts = 0
-    qr_data_list, qr_coords_list = [], []
-    method_used = None
-
-    # =============================
-    # Pré-processamentos principais
-    # =============================
+    decode_stats = decode_stats or get_decode_stats()
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
-    variants = [
-        ("original", gray),
-        ("equalized", cv2.equalizeHist(gray)),
-        ("contrast", cv2.convertScaleAbs(gray, alpha=1.5, beta=0)),
-        ("adaptive", cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                           cv2.THRESH_BINARY, 31, 8)),
-        ("blur", cv2.medianBlur(gray, 3))
-    ]
-
-    # Rotação leve (corrige QR torto)
-    rotation_angles = [0, 5, -5, 10, -10]
+    roi = crop_qr_region(gray)
+    variants = LazyVariants(roi.image if roi is not None else gray)
+    schedule = decode_stats.schedule(MAX_ATTEMPTS)
 
-    # =============================
-    # Loop de tentativas
-    # =============================
-    for name, variant in variants:
-        for ang in rotation_angles:
-            attempts += 1
-            if attempts > 12:  # limite de tentativas
-                break
-
-            # Rotacionar se necessário
-            if ang != 0:
-                (h, w) = variant.shape[:2]
-                M = cv2.getRotationMatrix2D((w // 2, h // 2), ang, 1.0)
-                rotated = cv2.warpAffine(variant, M, (w, h))
-            else:
-                rotated = variant
-
-            # 🔹 1) pyzbar
-            try:
-                decoded = pyzbar_decode(rotated)
-                if decoded:
-                    for obj in decoded:
-                        try:
-                            data = obj.data.decode("utf-8")
-                        except UnicodeDecodeError:
-                            data = obj.data.decode("latin-1", errors="ignore")
-                        qr_data_list.append(data)
-                        (x, y, w, h) = obj.rect
-                        qr_coords_list.append((x, y, w, h))
-                    method_used = f"pyzbar_{name}_rot{ang}"
-                    raise StopIteration
-            except StopIteration:
-                break
-            except Exception as e:
-                print(f"[v1] Erro pyzbar_{name}_rot{ang}: {e}")
-
-            # 🔹 2) Fallback: OpenCV
-            try:
-                detector = cv2.QRCodeDetector()
-                val, points, _ = detector.detectAndDecode(rotated)
-                if val:
-                    qr_data_list = [val]
-                    if points is not None and len(points) > 0:
-                        pts = points[0]
-                        x, y, w, h = cv2.boundingRect(pts)
-                        qr_coords_list = [(x, y, w, h)]
-                    else:
-                        qr_coords_list = [(0, 0, rotated.shape[1], rotated.shape[0])]
-                    method_used = f"cv2_{name}_rot{ang}"
-                    raise StopIteration
-            except StopIteration:
-                break
-            except Exception as e:
-                print(f"[v1] Erro cv2_{name}_rot{ang}: {e}")
+    def record_late(combo, seconds, decoded):
+        # Tentativa que ainda rodava quando outra leu o QR: só o seu resultado conhecido é registrado
+        decode_stats.record([(combo, seconds)], combo if decoded else None, {})
+
+    if parallel and workers > 1:
+        qr_data_list, qr_coords_list, method_used, winner, tried = _decode_parallel(
+            variants, schedule, workers, record_late)
+    else:
+        qr_data_list, qr_coords_list, method_used, winner, tried = _decode_sequential(variants, schedule)
 
+    extra_attempts = 0
+    if roi is not None:
         if qr_data_list:
-            break
+            qr_coords_list = [roi.to_image_coords(box) for box in qr_coords_list]
+        else:
+            # Localização errada (ou QR cortado): última tentativa na imagem inteira
+            extra_attempts = 1
+            qr_data_list, qr_coords_list, decoder = _decode_attempt(gray)
+            if qr_data_list:
+                method_used = f"{decoder}_full_image"
 
     # =============================
     # Estatísticas
     # =============================
     total_time = time.time() - start
-    print(f"[v1] ⏱️ {attempts} tentativas | Método: {method_used or 'falha'} | Tempo: {total_time:.2f}s")
+    # Cópia: no modo paralelo, tentativas já iniciadas ainda podem estar calculando variantes
+    decode_stats.record(tried, winner, dict(variants.build_times))
+    default_time = decode_stats.estimate_default_time(winner)
+    print(f"[v1] ⏱️ {len(tried) + extra_attempts} tentativas | Método: {method_used or 'falha'} | Tempo: {total_time:.2f}s")
 
     stats = {
-        "attempts": attempts,
+        "attempts": len(tried) + extra_attempts,
+        # (x, y, w, h) da região recortada em volta do QR (None: imagem inteira)
+        "roi": (roi.x, roi.y, roi.image.shape[1], roi.image.shape[0]) if roi is not None else None,
         "processing_time": total_time,
-        "method_used": method_used or "none"
+        "method_used": method_used or "none",
+        "variants_computed": variants.computed,
+        "parallel": bool(parallel and workers > 1),
+        # Estimativa em relação à ordem fixa (todas as variantes calculadas de antemão)
+        "estimated_time_saved": max(0.0, default_time - total_time) if default_time is not None else None
     }
 
     return qr_data_list, qr_coords_list, stats
 
+
+def _timed_attempt(variants: LazyVariants, combo: Tuple[str, int]):
+    name, ang = combo
+    variant = variants.get(name)
+
+    attempt_start = time.perf_counter()
+    qr_data_list, qr_coords_list, decoder = _decode_attempt(_rotate(variant, ang))
+    return qr_data_list, qr_coords_list, decoder, time.perf_counter() - attempt_start
+
+
+def _decode_sequential(variants: LazyVariants, schedule: List[Tuple[str, int]]):
+    tried = []
+    for name, ang in schedule:
+        qr_data_list, qr_coords_list, decoder, seconds = _timed_attempt(variants, (name, ang))
+        tried.append(((name, ang), seconds))
+        if qr_data_list:
+            return qr_data_list, qr_coords_list, f"{decoder}_{name}_rot{ang}", (name, ang), tried
+    return [], [], None, None, tried
+
+
+def _decode_parallel(variants: LazyVariants, schedule: List[Tuple[str, int]], workers: int,
+                     on_late: Optional[Callable[[Tuple[str, int], float, bool], None]] = None):
+    """
+    on_late(combo, segundos, decodificou) é chamado para cada tentativa que
+    ainda não tinha sido contabilizada quando a busca terminou, ao terminar
+    """
+    found = threading.Event()
+
+    def attempt(combo):
+        if found.is_set():  # Outra thread já leu o QR: nem começa
+            return None
+        return _timed_attempt(variants, combo)
+
+    def report_late(future):
+        if future.cancelled() or future.exception() is not None or future.result() is None:
+            return  # Não começou (ou falhou): fica como não tentada
+        qr_data_list, _, _, seconds = future.result()
+        on_late(futures[future], seconds, bool(qr_data_list))
+
+    tried = []
+    seen = set()
+    futures = {_decode_pool(workers).submit(attempt, combo): combo for combo in schedule}
+    try:
+        for future in as_completed(futures):
+            seen.add(future)
+            result = future.result()
+            if result is None:
+                continue
+            qr_data_list, qr_coords_list, decoder, seconds = result
+            name, ang = futures[future]
+            tried.append(((name, ang), seconds))
+            if qr_data_list:
+                found.set()
+                return qr_data_list, qr_coords_list, f"{decoder}_{name}_rot{ang}", (name, ang), tried
+        return [], [], None, None, tried
+    finally:
+        # Não espera as tentativas já em andamento (não dá para interromper código nativo)
+        for pending in futures:
+            if pending.cancel() or pending in seen or on_late is None:
+                continue
+            pending.add_done_callback(report_late)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def _decode_pool(workers: int) -> ThreadPoolExecutor:
+    """
+    Pool compartilhado por número de workers: as threads sobrevivem entre as
+    chamadas e, com elas, o DecoderContext de cada uma (detector e buffers)
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = _pools[workers] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="qr-decode")
+        return pool
+
 def try_opencv_qr(gray_image: np.ndarray) -> List[str]:
     """Fallback simples usando apenas o detector nativo do OpenCV."""
     try:
-        detector = cv2.QRCodeDetector()
-        data, points, _ = detector.detectAndDecode(gray_image)
+        data, points, _ = get_decoder_context().qr_detector.detectAndDecode(gray_image)
         if data:
             return [data]
     except Exception as e:
@@ -0,0 +1,224 @@
+"""
+Gravação append-only dos cupons em CSV, com commit em grupo
+
+Em vez de ler o histórico inteiro e reescrever o arquivo a cada leitura,
+as linhas novas ficam num buffer e são acrescentadas ao final do CSV em
+lotes: a cada FLUSH_EVERY registros ou FLUSH_INTERVAL_MS milissegundos,
+com um único fsync por lote. Cada lote é gravado sob trava exclusiva do
+arquivo (<csv>.lock), então vários processos podem escrever no mesmo CSV.
+A compactação (remover duplicatas e linhas corrompidas) reescreve o arquivo
+num temporário e troca de forma atômica com os.replace.
+"""
+
+import atexit
+import csv
+import io
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+FLUSH_EVERY = 32
+FLUSH_INTERVAL_MS = 200
+LOCK_SUFFIX = ".lock"
+
+
+def file_signature(path: str) -> str:
+    """Tamanho e data de modificação do arquivo ('missing' se não existe)"""
+    try:
+        info = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{info.st_size}:{info.st_mtime_ns}"
+
+
+@contextmanager
+def locked(path: str):
+    """Trava exclusiva entre processos para o arquivo (via <path>.lock)"""
+    with open(path + LOCK_SUFFIX, 'a+b') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ReceiptLog:
+    """
+    Escritor append-only de um CSV de cupons
+
+    Args:
+        path: Arquivo CSV
+        columns: Cabeçalho usado se o arquivo ainda não existe (se existe, vale o do arquivo)
+        flush_every: Tamanho do lote que dispara a gravação imediata
+        flush_interval_ms: Tempo máximo que um registro espera no buffer
+        on_flush: Chamada após cada gravação com (assinatura_antes, assinatura_depois)
+            do arquivo, para quem acompanha o CSV (ex: utils/key_index.py)
+    """
+
+    def __init__(self, path: str, columns: List[str], flush_every: int = FLUSH_EVERY,
+                 flush_interval_ms: int = FLUSH_INTERVAL_MS,
+                 on_flush: Optional[Callable[[str, str], None]] = None):
+        self.path = path
+        self.columns = list(columns)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval_ms / 1000
+        self.on_flush = on_flush
+        self._buffer: List[Dict] = []
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+
+    def append(self, row: Dict):
+        """Enfileira uma linha; a gravação acontece no próximo lote"""
+        with self._lock:
+            self._buffer.append(dict(row))
+            if len(self._buffer) >= self.flush_every or self.flush_interval <= 0:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def pending(self) -> List[Dict]:
+        """Linhas ainda no buffer (não gravadas)"""
+        with self._lock:
+            return list(self._buffer)
+
+    def discard(self) -> int:
+        """Descarta o buffer sem gravar (ex: o CSV foi apagado para limpar o histórico)"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            count, self._buffer = len(self._buffer), []
+            return count
+
+    def flush(self) -> int:
+        """
+        Grava o buffer no final do arquivo (um write e um fsync)
+
+        Returns:
+            Número de linhas gravadas
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._buffer:
+                return 0
+
+            rows = self._buffer
+            with locked(self.path):
+                before = file_signature(self.path)
+                header = self._read_header()
+                text = io.StringIO()
+                writer = csv.DictWriter(text, fieldnames=header or self.columns, extrasaction='ignore')
+                if header is None:
+                    writer.writeheader()
+                elif not self._ends_with_newline():
+                    text.write('\n')  # Última linha cortada (queda durante uma gravação)
+                writer.writerows(rows)
+
+                with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                    f.write(text.getvalue())
+                    f.flush()
+                    os.fsync(f.fileno())
+                after = file_signature(self.path)
+            self._buffer = []
+
+        # Fora da trava: o índice pode estar chamando append() em outra thread
+        self._notify(before, after)
+        return len(rows)
+
+    def compact(self, unique: Optional[str] = None) -> int:
+        """
+        Reescreve o arquivo de forma atômica, descartando linhas corrompidas
+        e, se `unique` for informado, repetições dessa coluna (mantém a primeira)
+
+        Returns:
+            Número de linhas mantidas
+        """
+        self.flush()
+        with self._lock, locked(self.path):
+            if not os.path.exists(self.path):
+                return 0
+            before = file_signature(self.path)
+            with open(self.path, newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                header = reader.fieldnames or self.columns
+                rows, seen = [], set()
+                for row in reader:
+                    if None in row or any(value is None for value in row.values()):
+                        continue  # Colunas a mais ou a menos
+                    if unique:
+                        if row.get(unique) in seen:
+                            continue
+                        seen.add(row.get(unique))
+                    rows.append(row)
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+                    writer = csv.DictWriter(f, fieldnames=header)
+                    writer.writeheader()
+                    writer.writerows(rows)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(temp_path, self.path)
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            after = file_signature(self.path)
+
+        self._notify(before, after)
+        return len(rows)
+
+    def close(self):
+        self.flush()
+
+    # --- Funções internas ---
+
+    def _notify(self, before: str, after: str):
+        if self.on_flush is not None:
+            self.on_flush(before, after)
+
+    def _read_header(self) -> Optional[List[str]]:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return None
+        with open(self.path, newline='', encoding='utf-8') as f:
+            return next(csv.reader(f), None)
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) in (b'\n', b'\r')
+
+
+_logs = {}
+_logs_lock = threading.Lock()
+
+def get_receipt_log(path: str, columns: List[str], **kwargs) -> ReceiptLog:
+    """Escritor compartilhado do processo para o CSV (gravado também na saída do processo)"""
+    with _logs_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = _logs[path] = ReceiptLog(path, columns, **kwargs)
+            atexit.register(log.close)
+        return log
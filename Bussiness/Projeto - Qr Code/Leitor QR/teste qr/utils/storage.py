@@ -10,6 +10,10 @@ from typing import Optional
 import pandas as pd
 import socket
 
+from utils.key_filter import get_key_filter
+from utils.key_index import get_key_index
+from utils.receipt_log import get_receipt_log
+
 # Constantes
 CSV_FILE = "fiscal_receipts.csv"
 CSV_COLUMNS = [
@@ -25,9 +29,25 @@ def get_device_id() -> str:
     except:
         return "unknown"
 
+def _key_index():
+    return get_key_index(
+        CSV_FILE, pending_keys=lambda: [row["access_key"] for row in _receipt_log().pending()]
+    )
+
+def _receipt_log():
+    return get_receipt_log(
+        CSV_FILE, CSV_COLUMNS, on_flush=lambda before, after: _key_index().advance(before, after)
+    )
+
+def key_filter():
+    """Filtro de Bloom das chaves, carregado uma vez por processo (utils/key_filter.py)"""
+    return get_key_filter(_key_index())
+
 def initialize_csv():
     """Inicializa o arquivo CSV se não existir"""
     if not os.path.exists(CSV_FILE):
+        # CSV apagado (histórico limpo): linhas ainda no buffer eram do arquivo antigo
+        _receipt_log().discard()
         with open(CSV_FILE, 'w', newline='', encoding='utf-8') as f:
             writer = csv.DictWriter(f, fieldnames=CSV_COLUMNS)
             writer.writeheader()
@@ -36,6 +56,8 @@ def is_duplicate(access_key: str) -> bool:
     """
     Verifica se a chave de acesso já existe no CSV
     
+    Consulta o índice persistente de chaves (utils/key_index.py), sem ler o CSV.
+    
     Args:
         access_key: Chave de acesso a verificar
         
@@ -45,10 +67,7 @@ def is_duplicate(access_key: str) -> bool:
     initialize_csv()
     
     try:
-        df = pd.read_csv(CSV_FILE)
-        if 'access_key' not in df.columns:
-            return False
-        return access_key in df['access_key'].values
+        return _key_index().contains(access_key)
     except Exception as e:
         print(f"Erro ao verificar duplicata: {e}")
         return False
@@ -56,22 +75,35 @@ def is_duplicate(access_key: str) -> bool:
 def save_receipt(access_key: str, raw_data: str, source: str = "camera") -> bool:
     initialize_csv()
     try:
-        if is_duplicate(access_key):
-            return False
-
-        df = pd.read_csv(CSV_FILE)
-        new_row = pd.DataFrame([{
+        new_row = {
             "access_key": access_key,
             "timestamp": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
             "source": source
-        }])
-        df = pd.concat([df, new_row], ignore_index=True)
-        df.to_csv(CSV_FILE, index=False, encoding='utf-8')
-        return True
+        }
+        # A verificação de duplicata e o enfileiramento acontecem na mesma transação do índice;
+        # a linha vai para o CSV no próximo lote do utils/receipt_log.py
+        saved = _key_index().add(access_key, on_new=lambda: _receipt_log().append(new_row))
+        if saved:
+            key_filter().add(access_key)
+        return saved
     except Exception as e:
         print(f"Erro ao salvar cupom: {e}")
         return False
 
+def flush_receipts() -> int:
+    """Grava imediatamente os cupons ainda no buffer"""
+    return _receipt_log().flush()
+
+def compact_receipts() -> int:
+    """
+    Reescreve o CSV de forma atômica, sem chaves repetidas nem linhas corrompidas
+    
+    Returns:
+        Número de cupons mantidos
+    """
+    initialize_csv()
+    return _receipt_log().compact(unique="access_key")
+
 def get_all_receipts() -> pd.DataFrame:
     """
     Retorna todos os cupons salvos como DataFrame
@@ -82,7 +114,8 @@ def get_all_receipts() -> pd.DataFrame:
     initialize_csv()
     
     try:
-        df = pd.read_csv(CSV_FILE)
+        flush_receipts()
+        df = pd.read_csv(CSV_FILE, dtype={'access_key': str})
         return df
     
     except Exception as e:
@@ -7,6 +7,11 @@ from PIL import Image
 import cv2
 from pyzbar.pyzbar import decode
 import numpy as np
+import sys
+
+# Escritor append-only com commit em grupo (compartilhado com o Leitor QR)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Leitor QR', 'teste qr'))
+from utils.receipt_log import get_receipt_log
 
 # NOVAS IMPORTAÇÕES PARA STREAMING DE VÍDEO
 from streamlit_webrtc import webrtc_streamer, VideoProcessorBase, VideoFrame
@@ -20,6 +25,10 @@ st.set_page_config(
 # VARIÁVEIS GLOBAIS E INICIALIZAÇÃO DO ESTADO DE SESSÃO
 # -------------------------------------------------------------------------
 CSV_FILE = "chaves_acesso.csv"
+COLUNAS_CSV = ['chave_acesso', 'data_leitura', 'status_duplicidade']
+
+# Leituras vão para um buffer e são gravadas no fim do CSV em lotes (sem reescrever o arquivo)
+registro_leituras = get_receipt_log(CSV_FILE, COLUNAS_CSV)
 
 # Inicializa o estado da sessão para a chave lida, se não existir
 if 'ultima_chave_lida' not in st.session_state:
@@ -34,7 +43,7 @@ if 'status_ultima_chave' not in st.session_state:
 def inicializar_csv():
     """Cria o arquivo CSV se ele não existir."""
     if not os.path.exists(CSV_FILE):
-        df = pd.DataFrame(columns=['chave_acesso', 'data_leitura', 'status_duplicidade'])
+        df = pd.DataFrame(columns=COLUNAS_CSV)
         df.to_csv(CSV_FILE, index=False)
 
 def extrair_chave_acesso(texto_qr):
@@ -46,7 +55,9 @@ def extrair_chave_acesso(texto_qr):
     return None
 
 def verificar_duplicidade(chave):
-    """Verifica se a chave de acesso já está presente no arquivo CSV."""
+    """Verifica se a chave de acesso já está presente no arquivo CSV (ou no buffer ainda não gravado)."""
+    if any(linha['chave_acesso'] == chave for linha in registro_leituras.pending()):
+        return True
     if os.path.exists(CSV_FILE):
         df = pd.read_csv(CSV_FILE)
         return chave in df['chave_acesso'].values
@@ -68,20 +79,12 @@ def salvar_chave(chave):
     duplicada = verificar_duplicidade(chave)
     status = "Duplicada" if duplicada else "Nova"
     
-    nova_linha = pd.DataFrame({
-        'chave_acesso': [chave],
-        'data_leitura': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
-        'status_duplicidade': [status]
+    registro_leituras.append({
+        'chave_acesso': chave,
+        'data_leitura': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'status_duplicidade': status
     })
     
-    if os.path.exists(CSV_FILE):
-        df = pd.read_csv(CSV_FILE)
-        df = pd.concat([df, nova_linha], ignore_index=True)
-    else:
-        df = nova_linha
-    
-    df.to_csv(CSV_FILE, index=False)
-    
     # 2. Atualiza o estado da sessão para que o Streamlit faça o re-run
     # e exiba o resultado na próxima execução.
     st.session_state['ultima_chave_lida'] = chave
@@ -235,15 +238,12 @@ with tab1:
                 duplicada = verificar_duplicidade(chave_encontrada)
                 status_upload = "Duplicada" if duplicada else "Nova"
                 
-                nova_linha = pd.DataFrame({
-                    'chave_acesso': [chave_encontrada],
-                    'data_leitura': [datetime.now().strftime("%Y-%m-%d %H:%M:%S")],
-                    'status_duplicidade': [status_upload]
+                registro_leituras.append({
+                    'chave_acesso': chave_encontrada,
+                    'data_leitura': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    'status_duplicidade': status_upload
                 })
-                
-                df_csv = pd.read_csv(CSV_FILE)
-                df_csv = pd.concat([df_csv, nova_linha], ignore_index=True)
-                df_csv.to_csv(CSV_FILE, index=False)
+                registro_leituras.flush()  # Gravado antes do st.rerun() recarregar o histórico
                 
                 if duplicada:
                     st.warning("⚠️ Esta chave já foi registrada anteriormente!")
@@ -264,6 +264,7 @@ with tab1:
 with tab2:
     st.markdown("#### Histórico de chaves de acesso lidas")
     
+    registro_leituras.flush()
     if os.path.exists(CSV_FILE):
         df = pd.read_csv(CSV_FILE)
         
@@ -312,6 +313,7 @@ with tab2:
           
             if st.button(" Limpar todo o histórico", type="secondary", key="btn_limpar_historico"):
                 if st.checkbox("Confirmar exclusão de todos os dados", key="chk_confirmar_limpeza"):
+                    registro_leituras.discard()
                     os.remove(CSV_FILE)
                     inicializar_csv()
                     # Reseta o estado da sessão
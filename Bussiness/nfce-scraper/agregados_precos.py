@@ -0,0 +1,130 @@
+# agregados_precos.py
+
+import pandas as pd
+
+# --- Agregados Incrementais ---
+# Resumos mensais por produto e por loja, atualizados na mesma transação em que
+# cada nota é salva (BancoNfce.salvar_nota). As análises (analise_precos.py)
+# leem só estas tabelas, que crescem com produtos x meses, não com o histórico.
+
+SEM_DATA = 'sem data'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS agg_produto_mes (
+    produto_id INTEGER NOT NULL,
+    mes TEXT NOT NULL,
+    compras INTEGER NOT NULL,
+    soma_quantidade REAL NOT NULL,
+    soma_total REAL NOT NULL,
+    preco_min REAL,
+    preco_max REAL,
+    PRIMARY KEY (produto_id, mes)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg_loja_mes (
+    cnpj TEXT NOT NULL,
+    mes TEXT NOT NULL,
+    notas INTEGER NOT NULL,
+    gasto_total REAL NOT NULL,
+    PRIMARY KEY (cnpj, mes)
+) WITHOUT ROWID;
+"""
+
+UPSERT_PRODUTO = """
+INSERT INTO agg_produto_mes VALUES (?, ?, 1, ?, ?, ?, ?)
+ON CONFLICT(produto_id, mes) DO UPDATE SET
+    compras = compras + 1,
+    soma_quantidade = soma_quantidade + excluded.soma_quantidade,
+    soma_total = soma_total + excluded.soma_total,
+    preco_min = MIN(COALESCE(preco_min, excluded.preco_min), COALESCE(excluded.preco_min, preco_min)),
+    preco_max = MAX(COALESCE(preco_max, excluded.preco_max), COALESCE(excluded.preco_max, preco_max))
+"""
+
+UPSERT_LOJA = """
+INSERT INTO agg_loja_mes VALUES (?, ?, 1, ?)
+ON CONFLICT(cnpj, mes) DO UPDATE SET
+    notas = notas + 1,
+    gasto_total = gasto_total + excluded.gasto_total
+"""
+
+
+def cnpj_da_chave(hash_qr):
+    """O CNPJ do emitente está nas posições 7-20 da Chave de Acesso (cUF + AAMM + CNPJ + ...)."""
+    return hash_qr[6:20] if hash_qr and len(hash_qr) == 44 and hash_qr.isdigit() else None
+
+def mes_da_venda(data_venda):
+    return data_venda[:7] if data_venda else SEM_DATA
+
+
+class AgregadosPrecos:
+    """
+    Mantém agg_produto_mes e agg_loja_mes no SQLite das notas.
+
+    Como o IndiceProdutos, não controla transações: BancoNfce chama
+    registrar() dentro da transação da nota.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._conn.executescript(ESQUEMA)
+
+    def registrar(self, nota, itens):
+        """
+        Soma uma nota aos agregados.
+
+        Args:
+            nota: Linha da tabela notas (hash_qr, data_venda, valor_total, ...).
+            itens: Dicts com produto_id, quantidade, preco_unitario e total_item.
+        """
+        mes = mes_da_venda(nota.get('data_venda'))
+        self._conn.executemany(UPSERT_PRODUTO, [
+            (item['produto_id'], mes, item.get('quantidade') or 0.0, item.get('total_item') or 0.0,
+             item.get('preco_unitario'), item.get('preco_unitario'))
+            for item in itens if item.get('produto_id') is not None
+        ])
+
+        cnpj = cnpj_da_chave(nota.get('hash_qr'))
+        if cnpj:
+            self._conn.execute(UPSERT_LOJA, (cnpj, mes, nota.get('valor_total') or 0.0))
+
+    def vazio(self):
+        return self._conn.execute("SELECT 1 FROM agg_produto_mes LIMIT 1").fetchone() is None
+
+    def recalcular(self):
+        """Reconstrói os agregados a partir de notas/itens (groupby vetorizado em pandas)."""
+        itens = pd.read_sql_query("""
+            SELECT i.produto_id, n.data_venda, i.quantidade, i.preco_unitario, i.total_item
+            FROM itens i JOIN notas n ON n.hash_qr = i.hash_qr
+            WHERE i.produto_id IS NOT NULL
+        """, self._conn)
+        notas = pd.read_sql_query("SELECT hash_qr, data_venda, valor_total FROM notas", self._conn)
+
+        itens['mes'] = itens['data_venda'].fillna('').str[:7].replace('', SEM_DATA)
+        por_produto = (
+            itens.fillna({'quantidade': 0.0, 'total_item': 0.0})
+            .groupby(['produto_id', 'mes'], as_index=False)
+            .agg(compras=('produto_id', 'size'), soma_quantidade=('quantidade', 'sum'),
+                 soma_total=('total_item', 'sum'), preco_min=('preco_unitario', 'min'),
+                 preco_max=('preco_unitario', 'max'))
+        )
+
+        notas['cnpj'] = notas['hash_qr'].map(cnpj_da_chave)
+        notas['mes'] = notas['data_venda'].fillna('').str[:7].replace('', SEM_DATA)
+        por_loja = (
+            notas.dropna(subset=['cnpj']).fillna({'valor_total': 0.0})
+            .groupby(['cnpj', 'mes'], as_index=False)
+            .agg(notas=('hash_qr', 'size'), gasto_total=('valor_total', 'sum'))
+        )
+
+        self._conn.execute("DELETE FROM agg_produto_mes")
+        self._conn.execute("DELETE FROM agg_loja_mes")
+        self._conn.executemany("INSERT INTO agg_produto_mes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               _linhas(por_produto))
+        self._conn.executemany("INSERT INTO agg_loja_mes VALUES (?, ?, ?, ?)", _linhas(por_loja))
+
+
+def _linhas(df):
+    """Linhas do DataFrame com tipos nativos do Python (sqlite3 não aceita numpy.int64) e NaN -> None."""
+    return [
+        tuple(None if pd.isna(valor) else valor.item() if hasattr(valor, 'item') else valor for valor in linha)
+        for linha in df.itertuples(index=False, name=None)
+    ]
@@ -0,0 +1,154 @@
+# analise_precos.py
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from banco_nfce import obter_banco
+from agregados_precos import SEM_DATA
+
+# --- Análises de Preço ---
+# Tudo aqui lê os agregados mensais (agregados_precos.py), mantidos a cada nota
+# salva; nenhuma consulta varre o histórico completo de itens.
+
+BASE_INDICE = 100.0
+
+
+def formatar_cnpj(cnpj):
+    if not cnpj or len(cnpj) != 14:
+        return cnpj
+    return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+
+def historico_produto(consulta, banco=None):
+    """
+    Preço médio mensal de cada produto que casa com a consulta.
+
+    Cada produto_id tem a sua série: variações de escrita já caem no mesmo
+    produto (indice_produtos), mas tamanhos e marcas diferentes ("arroz" 1 kg
+    e 5 kg) não são misturados numa média que não descreve produto nenhum.
+
+    Returns:
+        DataFrame com produto_id, produto, mes, compras, quantidade, preco_medio,
+        preco_min, preco_max e variacao_pct (em relação ao mês anterior com
+        compra do mesmo produto), ordenado por produto e mês.
+    """
+    banco = banco or obter_banco()
+    produtos = {produto_id: nome for produto_id, nome, _ in banco.buscar_produtos(consulta)}
+    colunas = ['produto_id', 'produto', 'mes', 'compras', 'quantidade', 'preco_medio', 'preco_min', 'preco_max',
+               'variacao_pct']
+    if not produtos:
+        return pd.DataFrame(columns=colunas)
+
+    por_mes = banco.ler_sql(
+        f"SELECT * FROM agg_produto_mes WHERE produto_id IN ({', '.join('?' * len(produtos))}) AND mes != ?",
+        [*produtos, SEM_DATA]
+    ).rename(columns={'soma_quantidade': 'quantidade'})
+    por_mes['produto'] = por_mes['produto_id'].map(produtos)
+    # Ordem da busca (o nome mais curto, mais próximo da consulta, primeiro)
+    por_mes['ordem'] = por_mes['produto_id'].map({produto_id: i for i, produto_id in enumerate(produtos)})
+    por_mes = por_mes.sort_values(['ordem', 'mes'])
+    # Preço médio ponderado pela quantidade (produtos a granel vêm em KG fracionado)
+    por_mes['preco_medio'] = por_mes['soma_total'] / por_mes['quantidade'].replace(0, np.nan)
+    por_mes['variacao_pct'] = por_mes.groupby('produto_id')['preco_medio'].pct_change() * 100
+    return por_mes[colunas].reset_index(drop=True)
+
+def gasto_por_loja(mes_inicio=None, mes_fim=None, banco=None):
+    """
+    Total gasto por loja (CNPJ do emitente) no período (AAAA-MM, inclusivo).
+
+    Returns:
+        DataFrame com cnpj, notas, gasto_total e ticket_medio, do maior gasto para o menor.
+    """
+    banco = banco or obter_banco()
+    condicoes, parametros = ["mes != ?"], [SEM_DATA]
+    if mes_inicio:
+        condicoes.append("mes >= ?")
+        parametros.append(mes_inicio)
+    if mes_fim:
+        condicoes.append("mes <= ?")
+        parametros.append(mes_fim)
+
+    agregados = banco.ler_sql(f"SELECT * FROM agg_loja_mes WHERE {' AND '.join(condicoes)}", parametros)
+    por_loja = (
+        agregados.groupby('cnpj', as_index=False)
+        .agg(notas=('notas', 'sum'), gasto_total=('gasto_total', 'sum'))
+        .sort_values('gasto_total', ascending=False)
+    )
+    por_loja['ticket_medio'] = por_loja['gasto_total'] / por_loja['notas']
+    return por_loja.reset_index(drop=True)
+
+def indice_precos(banco=None, min_produtos=1):
+    """
+    Índice de preços mensal encadeado (Jevons): a cada mês, média geométrica da
+    razão preço_medio(mês) / preco_medio(mês anterior) dos produtos comprados
+    nos dois meses. O primeiro mês vale BASE_INDICE.
+
+    Args:
+        min_produtos: Meses com menos produtos comparáveis repetem o índice anterior.
+
+    Returns:
+        DataFrame com mes, produtos_comparados, indice e variacao_pct.
+    """
+    banco = banco or obter_banco()
+    agregados = banco.ler_sql(
+        "SELECT produto_id, mes, soma_total, soma_quantidade FROM agg_produto_mes "
+        "WHERE mes != ? AND soma_quantidade > 0",
+        [SEM_DATA]
+    )
+    if agregados.empty:
+        return pd.DataFrame(columns=['mes', 'produtos_comparados', 'indice', 'variacao_pct'])
+
+    agregados['preco_medio'] = agregados['soma_total'] / agregados['soma_quantidade']
+    precos = agregados.pivot(index='produto_id', columns='mes', values='preco_medio').sort_index(axis=1)
+
+    log_relativos = np.log(precos / precos.shift(axis=1))
+    comparados = log_relativos.notna().sum(axis=0)
+    variacao_log = log_relativos.mean(axis=0).where(comparados >= min_produtos, 0.0).fillna(0.0)
+
+    resultado = pd.DataFrame({
+        'mes': precos.columns,
+        'produtos_comparados': comparados.values,
+        'indice': BASE_INDICE * np.exp(variacao_log.cumsum().values),
+    })
+    resultado['variacao_pct'] = resultado['indice'].pct_change() * 100
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análises de preço sobre as notas auditadas.")
+    comandos = parser.add_subparsers(dest='comando', required=True)
+
+    produto = comandos.add_parser('produto', help="Histórico mensal de preço de um produto")
+    produto.add_argument('consulta', help="Descrição do produto (ex: 'arroz tipo 1 5kg')")
+
+    lojas = comandos.add_parser('lojas', help="Gasto por loja (CNPJ)")
+    lojas.add_argument('--de', dest='mes_inicio', help="Mês inicial (AAAA-MM)")
+    lojas.add_argument('--ate', dest='mes_fim', help="Mês final (AAAA-MM)")
+
+    indice = comandos.add_parser('indice', help="Índice de preços mensal (base 100)")
+    indice.add_argument('--min-produtos', type=int, default=1)
+
+    comandos.add_parser('recalcular', help="Reconstrói os agregados a partir das notas salvas")
+    args = parser.parse_args(argv)
+
+    pd.set_option('display.float_format', '{:,.2f}'.format)
+    if args.comando == 'produto':
+        encontrados = obter_banco().buscar_produtos(args.consulta)
+        print(f"--- PRODUTOS ENCONTRADOS: {', '.join(nome for _, nome, _ in encontrados) or 'nenhum'} ---")
+        resultado = historico_produto(args.consulta)
+    elif args.comando == 'lojas':
+        resultado = gasto_por_loja(args.mes_inicio, args.mes_fim)
+        resultado['cnpj'] = resultado['cnpj'].map(formatar_cnpj)
+    elif args.comando == 'indice':
+        resultado = indice_precos(min_produtos=args.min_produtos)
+    else:
+        obter_banco().recalcular_agregados()
+        print("Agregados recalculados.")
+        return
+
+    print(resultado.to_string(index=False) if not resultado.empty else "Sem dados para a consulta.")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,22 +2,46 @@
 
 import streamlit as st
 import os
+import time
+import asyncio
 
 # Importações dos módulos do projeto (Você deve garantir que esses arquivos estejam disponíveis)
 try:
     # A IDEIA É QUE VOCÊ SUBSTITUA ESTES ARQUIVOS PELOS SEUS VERSÃO NFC-e SCRAPING
     from leitor_qr import extrair_url_qr_code, extrair_hash_da_url
-    from scraper_nfce import raspar_dados_nfce
-    from salvador_csv import salvar_dados_em_csv, PASTA_DADOS
+    from scraper_nfce import raspar_dados_nfce_com_cache
+    from salvador_csv import salvar_dados_em_csv, exportar_csv, PASTA_DADOS
+    from lote_nfce import executar_lote, ler_urls
+    from fila_jobs import obter_fila, CONCLUIDO, FALHA
+    from registro_sefaz import resolver_url, ChaveInvalida
 except ImportError as e:
     st.error(f"Erro ao carregar módulos: {e}. Verifique se os arquivos leitor_qr.py, scraper_nfce.py e salvador_csv.py estão no diretório correto.")
     # Define valores padrão para evitar que o Streamlit quebre completamente se houver erro
     def extrair_url_qr_code(*args): return None
     def extrair_hash_da_url(*args): return 'erro_hash'
-    def raspar_dados_nfce(*args): return None, None
-    def salvar_dados_em_csv(*args): pass
+    def raspar_dados_nfce_com_cache(*args): return None, None, False
+    def salvar_dados_em_csv(*args): return False
+    def exportar_csv(*args, **kwargs): return None, None
+    async def executar_lote(*args, **kwargs): return []
+    def ler_urls(*args): return []
+    def obter_fila(): return None
+    def resolver_url(texto): return texto
+    class ChaveInvalida(ValueError): pass
+    CONCLUIDO, FALHA = 'concluido', 'falha'
     PASTA_DADOS = 'data'
 
+# Intervalo (s) entre as atualizações automáticas do status dos jobs da fila
+INTERVALO_STATUS_JOB = 1.0
+
+
+def atualizar_periodicamente(funcao):
+    """
+    st.fragment com run_every: só a função é reexecutada, sem travar o script.
+    Versões do Streamlit sem fragmentos dependem do botão de atualizar.
+    """
+    fragmento = getattr(st, 'fragment', None)
+    return fragmento(run_every=INTERVALO_STATUS_JOB)(funcao) if fragmento else funcao
+
 
 # --- Configuração e Estilo do Fiscalizador ---
 st.set_page_config(
@@ -81,7 +105,12 @@ def processar_nfce(url_nfce):
         return
 
     # --- Passo 1: Extrair Hash de Controle ---
-    # CORREÇÃO do NameError: Usa o parâmetro de entrada 'url_nfce'
+    # Chave de Acesso digitada vira a URL de consulta da SEFAZ da UF (registro_sefaz)
+    try:
+        url_nfce = resolver_url(url_nfce)
+    except ChaveInvalida as e:
+        st.markdown(f'<div class="status-error">❌ ERRO: {e}. Confira os 44 dígitos digitados.</div>', unsafe_allow_html=True)
+        return
     hash_qr = extrair_hash_da_url(url_nfce)
     
     if not hash_qr:
@@ -91,39 +120,128 @@ def processar_nfce(url_nfce):
     st.info(f"🔎 FISCALIZANDO NOTA: Chave de Controle **{hash_qr}** sendo processada...") 
     
     # 2. Scraping dos Dados (O Braço Forte)
+    fila = obter_fila()
+    if fila is not None and fila.workers_ativos():
+        # O worker_nfce.py (outro processo) raspa; a tela só acompanha o job
+        job_id = fila.enfileirar(url_nfce, hash_qr)
+        acompanhar_job(job_id)
+        st.info(f"📨 JOB #{job_id} ENVIADO AO WORKER. Acompanhe o resultado em **Auditorias na Fila** abaixo.")
+        return
+
+    # Sem worker rodando: raspa aqui mesmo (comportamento original)
     with st.spinner('🌐 EXECUTANDO O BRAÇO FORTE (Selenium Headless)... Renderizando a página da SEFAZ para coleta cirúrgica...'):
-        # Substitua a chamada abaixo pela sua função real de scraping
-        dados_nota, lista_itens = raspar_dados_nfce(url_nfce)
+        # Notas já auditadas voltam do cache (a NFC-e não muda depois de emitida)
+        dados_nota, lista_itens, veio_do_cache = raspar_dados_nfce_com_cache(url_nfce, hash_qr)
         
     # 3. Verificação e Salvamento
     if dados_nota and lista_itens:
-        
-        # Resumo do Fiscalizador:
-        total = dados_nota.get('valor_total', 0.0)
-        
-        st.markdown(f"""
-        <div class="status-success">
-            ✅ AUDITORIA CONCLUÍDA: **{len(lista_itens)} ITENS** IDENTIFICADOS.<br>
-            💸 VALOR TOTAL DA TRANSAÇÃO: R$ **{total:.2f}**.<br>
-            <br>
-            **MISSÃO CUMPRIDA:** Dados prontos para análise!
-        </div>
-        """, unsafe_allow_html=True)
-        
-        with st.spinner('💾 SALVANDO PLANILHAS: Persistindo dados em formato CSV, como o Fiscalizador gosta...'):
+        with st.spinner('💾 SALVANDO: Persistindo a nota no banco local do Fiscalizador...'):
             # Substitua a chamada abaixo pela sua função real de salvamento
-            salvar_dados_em_csv(dados_nota, lista_itens, hash_qr) # Usa o hash_qr já calculado
-        
-        st.success(f"Planilhas **itens_nfce.csv** e **notas_nfce.csv** atualizadas em /{PASTA_DADOS}/")
-        
+            nota_nova = salvar_dados_em_csv(dados_nota, lista_itens, hash_qr) # Usa o hash_qr já calculado
+        exibir_sucesso(len(lista_itens), dados_nota.get('valor_total', 0.0), veio_do_cache, nota_nova)
     else:
+        exibir_falha()
+
+def acompanhar_job(job_id, atual=True):
+    """Guarda o job na sessão e retorna na hora; o status é desenhado por painel_jobs nas próximas execuções."""
+    if atual:
+        st.session_state['job_atual'] = job_id
+    if job_id not in st.session_state.setdefault('jobs', []):
+        st.session_state['jobs'].append(job_id)
+
+@atualizar_periodicamente
+def painel_jobs():
+    """Status do último job enviado e tabela dos jobs da sessão."""
+    fila = obter_fila()
+    jobs = [fila.obter(job_id) for job_id in st.session_state.get('jobs', [])]
+    jobs = {job['id']: job for job in jobs if job}
+
+    job = jobs.get(st.session_state.get('job_atual'))
+    if job and job['status'] == CONCLUIDO:
+        resultado = job['resultado']
+        exibir_sucesso(resultado['itens'], resultado['valor_total'] or 0.0,
+                       resultado['veio_do_cache'], resultado['nota_nova'])
+    elif job and job['status'] == FALHA:
+        exibir_falha(job['erro'])
+    elif job and job['disponivel_em'] and job['disponivel_em'] > time.time():
+        st.warning(f"⏳ JOB #{job['id']}: tentativa {job['tentativas']} falhou ({job['erro']}). "
+                   f"Nova tentativa em {job['disponivel_em'] - time.time():.0f}s.")
+    elif job:
+        st.info(f"🌐 JOB #{job['id']}: {job['status'].upper()}... o worker está coletando a nota na SEFAZ.")
+
+    st.dataframe(
+        [{'Job': j['id'], 'Chave': j['hash_qr'], 'Status': j['status'], 'Tentativas': j['tentativas'],
+          'Itens': (j['resultado'] or {}).get('itens'), 'Valor Total': (j['resultado'] or {}).get('valor_total'),
+          'Erro': j['erro']} for j in jobs.values()],
+        hide_index=True
+    )
+
+def enfileirar_lote(fila, urls):
+    """Um job por nota do lote; linhas sem chave válida são recusadas aqui, sem passar pelo worker."""
+    lote = {'jobs': [], 'recusadas': []}
+    for url in urls:
+        try:
+            url_resolvida = resolver_url(url)
+        except ChaveInvalida as e:
+            lote['recusadas'].append({'Linha': url, 'Erro': str(e)})
+            continue
+        hash_qr = extrair_hash_da_url(url_resolvida)
+        if not hash_qr:
+            lote['recusadas'].append({'Linha': url, 'Erro': "Chave de acesso não encontrada na URL"})
+            continue
+        job_id = fila.enfileirar(url_resolvida, hash_qr)  # Nota repetida volta o mesmo job
+        if job_id not in lote['jobs']:
+            lote['jobs'].append(job_id)
+            acompanhar_job(job_id, atual=False)
+    st.session_state['lote'] = lote
+
+@atualizar_periodicamente
+def painel_lote():
+    """Progresso do lote enviado à fila: o worker_nfce.py raspa, a tela só lê o status dos jobs."""
+    lote = st.session_state['lote']
+    fila = obter_fila()
+    jobs = [job for job in (fila.obter(job_id) for job_id in lote['jobs']) if job]
+    sucesso = sum(1 for job in jobs if job['status'] == CONCLUIDO)
+    terminadas = sucesso + sum(1 for job in jobs if job['status'] == FALHA) + len(lote['recusadas'])
+    total = len(lote['jobs']) + len(lote['recusadas'])
+
+    st.progress(terminadas / total if total else 1.0, text=f"{terminadas}/{total} notas processadas")
+    if terminadas == total:
         st.markdown(f"""
-        <div class="status-error">
-            ❌ FALHA NA AUDITORIA: Não foi possível extrair dados válidos.
-            <br>
-            **ORDEM:** Verifique a URL, a qualidade da imagem ou o log de erros do Selenium.
+        <div class="status-success">
+            ✅ LOTE CONCLUÍDO: **{sucesso}/{total} NOTAS** AUDITADAS.
         </div>
         """, unsafe_allow_html=True)
+    if lote['recusadas']:
+        st.dataframe(lote['recusadas'], hide_index=True)
+
+def exibir_sucesso(quantidade_itens, total, veio_do_cache, nota_nova):
+    if veio_do_cache:
+        st.info("⚡ NOTA JÁ AUDITADA: resultado recuperado do cache local, sem nova consulta à SEFAZ.")
+
+    # Resumo do Fiscalizador:
+    st.markdown(f"""
+    <div class="status-success">
+        ✅ AUDITORIA CONCLUÍDA: **{quantidade_itens} ITENS** IDENTIFICADOS.<br>
+        💸 VALOR TOTAL DA TRANSAÇÃO: R$ **{total:.2f}**.<br>
+        <br>
+        **MISSÃO CUMPRIDA:** Dados prontos para análise!
+    </div>
+    """, unsafe_allow_html=True)
+
+    if nota_nova:
+        st.success(f"Nota registrada em /{PASTA_DADOS}/nfce.sqlite. Use **4. Exportar Planilhas** para gerar os CSVs.")
+    else:
+        st.info("Nota já registrada anteriormente: nenhum item foi duplicado.")
+
+def exibir_falha(detalhe=None):
+    st.markdown(f"""
+    <div class="status-error">
+        ❌ FALHA NA AUDITORIA: Não foi possível extrair dados válidos.{f" ({detalhe})" if detalhe else ""}
+        <br>
+        **ORDEM:** Verifique a URL, a qualidade da imagem ou o log de erros do Selenium.
+    </div>
+    """, unsafe_allow_html=True)
 
 # --- Interface Streamlit (Minimalista e Focada) ---
 
@@ -173,9 +291,82 @@ url_manual = st.text_input(
 
 if url_manual:
     url_processar = url_manual
-    # Se não começar com http, ele presume que é uma chave, mas envia a chave para o processamento.
-    # O SCRAPER DEVE SABER COMO MONTAR A URL COMPLETA COM BASE NO CÓDIGO!
+    # Se não começar com http, é uma Chave de Acesso: a URL é montada pela UF
+    # (dois primeiros dígitos) conforme o registro_sefaz.
         
     if st.button("🚀 INICIAR AUDITORIA (Via Código Manual)", key='btn_manual'):
         # Chamada para a função processar_nfce
-        processar_nfce(url_processar)
\ No newline at end of file
+        processar_nfce(url_processar)
+
+st.markdown("---")
+
+# --- Opção 3: Auditoria em Lote (Lista de URLs) ---
+st.header("3. Auditoria em Lote")
+
+arquivo_lote = st.file_uploader(
+    "PILHA DE NOTAS: Envie um arquivo .txt ou .csv com uma URL de NFC-e por linha",
+    type=["txt", "csv"],
+    key='upload_lote'
+)
+
+if arquivo_lote is not None:
+    urls_lote = ler_urls(arquivo_lote.read().decode('utf-8', errors='ignore').splitlines())
+    st.info(f"📄 {len(urls_lote)} URLs únicas encontradas no arquivo.")
+
+    if urls_lote and st.button("🚀 INICIAR AUDITORIA EM LOTE", key='btn_lote'):
+        fila = obter_fila()
+        if fila is not None and fila.workers_ativos():
+            # Mesmo caminho da nota avulsa: o worker raspa, a tela acompanha os jobs
+            enfileirar_lote(fila, urls_lote)
+        else:
+            # Sem worker rodando: raspa aqui mesmo, e a tela fica ocupada até o fim do lote
+            st.warning("⚠️ Nenhum worker_nfce.py ativo: o lote será raspado nesta sessão.")
+            st.session_state.pop('lote', None)  # O painel do lote anterior some
+            barra = st.progress(0.0, text="Raspando notas em paralelo...")
+            log_lote = st.empty()
+            concluidas = []
+
+            def atualizar_progresso(resultado):
+                # Chamado à medida que cada nota termina (e já foi salva)
+                concluidas.append(resultado)
+                barra.progress(len(concluidas) / len(urls_lote), text=f"{len(concluidas)}/{len(urls_lote)} notas processadas")
+                status = f"✅ {resultado['itens']} itens" if resultado['sucesso'] else f"❌ {resultado['erro']}"
+                log_lote.markdown(f"`{resultado['hash_qr'] or resultado['url'][:60]}` {status}")
+
+            resultados = asyncio.run(executar_lote(urls_lote, ao_concluir=atualizar_progresso))
+            sucesso = sum(1 for r in resultados if r['sucesso'])
+
+            st.markdown(f"""
+            <div class="status-success">
+                ✅ LOTE CONCLUÍDO: **{sucesso}/{len(resultados)} NOTAS** AUDITADAS.
+            </div>
+            """, unsafe_allow_html=True)
+            st.dataframe(
+                [{'Chave': r['hash_qr'], 'Itens': r['itens'], 'Valor Total': r['valor_total'], 'Tentativas': r['tentativas'], 'Erro': r['erro']} for r in resultados],
+                hide_index=True
+            )
+
+    if st.session_state.get('lote') and obter_fila() is not None:
+        painel_lote()
+
+# --- Acompanhamento dos Jobs enviados nesta sessão ---
+if st.session_state.get('jobs') and obter_fila() is not None:
+    st.markdown("---")
+    st.header("Auditorias na Fila")
+    st.button("🔄 Atualizar status", key='btn_atualizar_jobs')
+    painel_jobs()
+
+st.markdown("---")
+
+# --- Opção 4: Exportação dos CSVs ---
+st.header("4. Exportar Planilhas")
+
+if st.button("📤 GERAR itens_nfce.csv E notas_nfce.csv", key='btn_exportar'):
+    with st.spinner('💾 Gerando as planilhas a partir do banco local...'):
+        arquivo_itens, arquivo_notas = exportar_csv()
+    if arquivo_itens:
+        st.success(f"Planilhas **itens_nfce.csv** e **notas_nfce.csv** atualizadas em /{PASTA_DADOS}/")
+        with open(arquivo_itens, 'rb') as f:
+            st.download_button("⬇️ Baixar itens_nfce.csv", f.read(), file_name='itens_nfce.csv', mime='text/csv')
+        with open(arquivo_notas, 'rb') as f:
+            st.download_button("⬇️ Baixar notas_nfce.csv", f.read(), file_name='notas_nfce.csv', mime='text/csv')
@@ -0,0 +1,288 @@
+# banco_nfce.py
+
+import os
+import sqlite3
+import threading
+
+import pandas as pd
+
+from indice_produtos import IndiceProdutos
+from agregados_precos import AgregadosPrecos
+
+# --- Banco Local das Notas ---
+# Substitui os CSVs anexados a cada nota: uma nota só entra uma vez (hash_qr),
+# notas e itens são gravados na mesma transação e as consultas usam índices.
+# Os CSVs continuam disponíveis via exportação (salvador_csv.exportar_csv).
+# O histórico dos CSVs antigos (mesma pasta do banco) é importado na criação do banco.
+
+ARQUIVO_BANCO = os.path.join('data', 'nfce.sqlite')
+CSV_NOTAS_LEGADO = 'notas_nfce.csv'
+CSV_ITENS_LEGADO = 'itens_nfce.csv'
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS notas (
+    hash_qr TEXT PRIMARY KEY,
+    data_venda TEXT,
+    hora_venda TEXT,
+    forma_pagamento TEXT,
+    valor_total REAL,
+    data_extracao TEXT
+);
+CREATE TABLE IF NOT EXISTS itens (
+    hash_qr TEXT NOT NULL REFERENCES notas(hash_qr) ON DELETE CASCADE,
+    sequencia INTEGER NOT NULL,
+    produto TEXT,
+    quantidade REAL,
+    unidade TEXT,
+    preco_unitario REAL,
+    total_item REAL,
+    produto_id INTEGER REFERENCES produtos(id),
+    PRIMARY KEY (hash_qr, sequencia)
+);
+CREATE INDEX IF NOT EXISTS idx_notas_data_venda ON notas(data_venda);
+CREATE INDEX IF NOT EXISTS idx_itens_produto ON itens(produto);
+"""
+
+CAMPOS_NOTA = ['hash_qr', 'data_venda', 'hora_venda', 'forma_pagamento', 'valor_total', 'data_extracao']
+CAMPOS_ITEM = ['hash_qr', 'sequencia', 'produto', 'quantidade', 'unidade', 'preco_unitario', 'total_item', 'produto_id']
+
+
+class BancoNfce:
+    """
+    Armazenamento SQLite (modo WAL) das notas e itens auditados.
+
+    Os registros chegam já no formato das colunas do CSV (ver salvador_csv).
+    """
+
+    def __init__(self, caminho=ARQUIVO_BANCO):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # Seguro em WAL; evita fsync a cada commit
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(ESQUEMA)
+        self.indice = IndiceProdutos(self._conn)
+        self.agregados = AgregadosPrecos(self._conn)
+        self._migrar()
+        self._conn.commit()
+
+    def salvar_nota(self, nota, itens):
+        """
+        Grava a nota e todos os seus itens em uma única transação.
+
+        Returns:
+            True se a nota foi inserida, False se o hash_qr já estava no banco
+            (nada é gravado nesse caso).
+        """
+        with self._lock:
+            try:
+                with self._conn:
+                    cursor = self._conn.execute(
+                        f"INSERT OR IGNORE INTO notas ({', '.join(CAMPOS_NOTA)}) VALUES ({', '.join('?' * len(CAMPOS_NOTA))})",
+                        [nota.get(campo) for campo in CAMPOS_NOTA]
+                    )
+                    if cursor.rowcount == 0:
+                        return False
+
+                    # O índice de produtos é atualizado na mesma transação da nota
+                    linhas_itens = [
+                        [nota['hash_qr'], sequencia, *[item.get(campo) for campo in CAMPOS_ITEM[2:-1]],
+                         self.indice.indexar(item.get('produto'))]
+                        for sequencia, item in enumerate(itens, start=1)
+                    ]
+                    self._conn.executemany(
+                        f"INSERT INTO itens ({', '.join(CAMPOS_ITEM)}) VALUES ({', '.join('?' * len(CAMPOS_ITEM))})",
+                        linhas_itens
+                    )
+                    self.agregados.registrar(nota, [dict(zip(CAMPOS_ITEM, linha)) for linha in linhas_itens])
+                    return True
+            except Exception:
+                self.indice.esquecer()
+                raise
+
+    def importar_csv(self, arquivo_notas, arquivo_itens):
+        """
+        Importa os CSVs gravados antes do banco (salvar_anexando, separador ';').
+
+        Itens sem linha de nota geram a nota a partir de valor_total_nota; notas
+        anexadas mais de uma vez entram uma só vez, com o primeiro bloco de itens.
+
+        Returns:
+            Número de notas inseridas.
+        """
+        df_notas = _ler_csv_legado(arquivo_notas)
+        df_itens = _ler_csv_legado(arquivo_itens)
+        if 'hash_qr' not in df_notas:
+            df_notas = df_notas.assign(hash_qr=None)
+        if 'hash_qr' not in df_itens:
+            df_itens = df_itens.assign(hash_qr=None)
+
+        notas = {}
+        for registro in df_notas.dropna(subset=['hash_qr']).to_dict('records'):
+            notas.setdefault(registro['hash_qr'], registro)
+        repeticoes = df_notas['hash_qr'].value_counts()
+
+        itens_por_nota = {}
+        for hash_qr, grupo in df_itens.dropna(subset=['hash_qr']).groupby('hash_qr', sort=False):
+            registros = grupo.to_dict('records')
+            # salvar_anexando gravava os itens de novo a cada envio repetido da nota
+            vezes = int(repeticoes.get(hash_qr, 1))
+            if vezes > 1 and len(registros) % vezes == 0:
+                registros = registros[:len(registros) // vezes]
+            itens_por_nota[hash_qr] = registros
+            if hash_qr not in notas:
+                primeiro = registros[0]
+                notas[hash_qr] = dict(primeiro, valor_total=primeiro.get('valor_total_nota'))
+
+        importadas = 0
+        for hash_qr, registro in notas.items():
+            nota = {campo: registro.get(campo) for campo in CAMPOS_NOTA}
+            itens = [{campo: item.get(campo) for campo in CAMPOS_ITEM[2:-1]} for item in itens_por_nota.get(hash_qr, [])]
+            importadas += self.salvar_nota(nota, itens)
+        return importadas
+
+    def __contains__(self, hash_qr):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM notas WHERE hash_qr = ?", (hash_qr,)).fetchone() is not None
+
+    def contar_notas(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM notas").fetchone()[0]
+
+    def ler_notas(self, data_inicio=None, data_fim=None):
+        """DataFrame das notas, opcionalmente filtrado por data de venda (AAAA-MM-DD, inclusivo)."""
+        condicoes, parametros = self._filtro_datas('n', data_inicio, data_fim)
+        consulta = f"SELECT n.* FROM notas n {condicoes} ORDER BY n.data_venda, n.hora_venda"
+        with self._lock:
+            return pd.read_sql_query(consulta, self._conn, params=parametros)
+
+    def ler_itens(self, produto=None, data_inicio=None, data_fim=None):
+        """
+        DataFrame dos itens com os dados da nota (data, hora, pagamento e total).
+
+        Args:
+            produto: Filtra por descrição exata do produto (usa o índice).
+        """
+        condicoes, parametros = self._filtro_datas('n', data_inicio, data_fim)
+        if produto is not None:
+            condicoes += (" AND " if condicoes else "WHERE ") + "i.produto = ?"
+            parametros.append(produto)
+        consulta = f"""
+            SELECT n.data_venda, n.hora_venda, n.forma_pagamento,
+                   i.produto, i.quantidade, i.unidade, i.preco_unitario, i.total_item,
+                   n.valor_total AS valor_total_nota, i.hash_qr
+            FROM itens i JOIN notas n ON n.hash_qr = i.hash_qr
+            {condicoes}
+            ORDER BY n.data_venda, n.hora_venda, i.hash_qr, i.sequencia
+        """
+        with self._lock:
+            return pd.read_sql_query(consulta, self._conn, params=parametros)
+
+    def buscar_produtos(self, consulta, limite=20):
+        """Produtos do índice que casam com a consulta: [(produto_id, nome_normalizado, pontuacao), ...]."""
+        with self._lock:
+            return self.indice.buscar(consulta, limite)
+
+    def historico_precos(self, consulta=None, produto_ids=None):
+        """
+        Todas as compras de um produto (e suas variações de escrita), por data.
+
+        Args:
+            consulta: Texto livre (ex: "arroz tipo 1 5kg"), resolvido pelo índice de produtos.
+            produto_ids: Ids já conhecidos (dispensa a busca).
+        """
+        if produto_ids is None:
+            produto_ids = [produto_id for produto_id, _, _ in self.buscar_produtos(consulta or '')]
+        if not produto_ids:
+            return pd.DataFrame(columns=['data_venda', 'hora_venda', 'produto_id', 'produto_normalizado',
+                                         'produto', 'quantidade', 'preco_unitario', 'total_item', 'hash_qr'])
+        consulta_sql = f"""
+            SELECT n.data_venda, n.hora_venda, i.produto_id, p.nome_normalizado AS produto_normalizado,
+                   i.produto, i.quantidade, i.preco_unitario, i.total_item, i.hash_qr
+            FROM itens i
+            JOIN notas n ON n.hash_qr = i.hash_qr
+            JOIN produtos p ON p.id = i.produto_id
+            WHERE i.produto_id IN ({', '.join('?' * len(produto_ids))})
+            ORDER BY n.data_venda, n.hora_venda
+        """
+        with self._lock:
+            return pd.read_sql_query(consulta_sql, self._conn, params=list(produto_ids))
+
+    def ler_sql(self, consulta, parametros=()):
+        """Executa uma consulta somente-leitura e retorna um DataFrame (usado por analise_precos)."""
+        with self._lock:
+            return pd.read_sql_query(consulta, self._conn, params=list(parametros))
+
+    def recalcular_agregados(self):
+        """Reconstrói do zero os agregados de preços (ex: após editar o banco manualmente)."""
+        with self._lock, self._conn:
+            self.agregados.recalcular()
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Funções internas ---
+
+    def _migrar(self):
+        """Bancos criados antes do índice de produtos: cria a coluna e indexa os itens existentes."""
+        colunas = [linha[1] for linha in self._conn.execute("PRAGMA table_info(itens)")]
+        if 'produto_id' not in colunas:
+            self._conn.execute("ALTER TABLE itens ADD COLUMN produto_id INTEGER REFERENCES produtos(id)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_itens_produto_id ON itens(produto_id)")
+
+        pendentes = self._conn.execute(
+            "SELECT rowid, produto FROM itens WHERE produto_id IS NULL AND produto IS NOT NULL"
+        ).fetchall()
+        self._conn.executemany(
+            "UPDATE itens SET produto_id = ? WHERE rowid = ?",
+            [(self.indice.indexar(produto), rowid) for rowid, produto in pendentes]
+        )
+
+        if pendentes or (self.agregados.vazio() and self._conn.execute("SELECT 1 FROM itens LIMIT 1").fetchone()):
+            self.agregados.recalcular()
+
+        # Banco novo ao lado de CSVs antigos: a primeira exportação os substituiria
+        pasta = os.path.dirname(self.caminho)
+        arquivo_notas = os.path.join(pasta, CSV_NOTAS_LEGADO)
+        arquivo_itens = os.path.join(pasta, CSV_ITENS_LEGADO)
+        vazio = self._conn.execute("SELECT 1 FROM notas LIMIT 1").fetchone() is None
+        if vazio and any(os.path.isfile(arquivo) and os.path.getsize(arquivo) > 0 for arquivo in (arquivo_notas, arquivo_itens)):
+            self._conn.commit()
+            importadas = self.importar_csv(arquivo_notas, arquivo_itens)
+            print(f"{importadas} notas importadas dos CSVs antigos ({arquivo_notas}, {arquivo_itens}).")
+
+    @staticmethod
+    def _filtro_datas(alias, data_inicio, data_fim):
+        condicoes, parametros = [], []
+        if data_inicio:
+            condicoes.append(f"{alias}.data_venda >= ?")
+            parametros.append(data_inicio)
+        if data_fim:
+            condicoes.append(f"{alias}.data_venda <= ?")
+            parametros.append(data_fim)
+        return ("WHERE " + " AND ".join(condicoes)) if condicoes else "", parametros
+
+
+def _ler_csv_legado(arquivo):
+    """DataFrame do CSV antigo (vazio se não existir), com NaN trocado por None."""
+    if not os.path.isfile(arquivo) or os.path.getsize(arquivo) == 0:
+        return pd.DataFrame()
+    df = pd.read_csv(arquivo, sep=';', encoding='utf-8', dtype={'hash_qr': str})
+    return df.astype(object).where(df.notna(), None)
+
+
+_banco = None
+_banco_lock = threading.Lock()
+
+def obter_banco():
+    """Banco compartilhado do processo."""
+    global _banco
+    with _banco_lock:
+        if _banco is None:
+            _banco = BancoNfce()
+        return _banco
@@ -0,0 +1,158 @@
+# cache_nfce.py
+
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from salvador_csv import PASTA_DADOS
+
+# --- Cache de Raspagens ---
+# Uma NFC-e não muda depois de emitida: raspada uma vez, o resultado vale para sempre.
+# Camadas: LRU em memória (microssegundos) -> SQLite em disco (milissegundos) -> SEFAZ.
+
+ARQUIVO_CACHE = os.path.join(PASTA_DADOS, 'cache_nfce.sqlite')
+TAMANHO_LRU = 256
+
+
+class CacheNfce:
+    """
+    Cache persistente das raspagens, chaveado pela Chave de Acesso (44 dígitos).
+
+    Guarda dados_nota, lista_itens e o HTML bruto (comprimido) da página.
+    """
+
+    def __init__(self, caminho=ARQUIVO_CACHE, tamanho_lru=TAMANHO_LRU):
+        self.caminho = caminho
+        self.tamanho_lru = tamanho_lru
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._locks_chave = {}  # chave -> [lock, threads usando o lock]
+
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_nfce (
+                chave_acesso TEXT PRIMARY KEY,
+                dados_nota TEXT NOT NULL,
+                lista_itens TEXT NOT NULL,
+                html BLOB,
+                criado_em TEXT NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def obter(self, chave_acesso):
+        """Retorna (dados_nota, lista_itens) do cache, ou None se a nota nunca foi raspada."""
+        with self._lock:
+            if chave_acesso in self._lru:
+                self._lru.move_to_end(chave_acesso)
+                return self._copiar(self._lru[chave_acesso])
+
+            linha = self._conn.execute(
+                "SELECT dados_nota, lista_itens FROM cache_nfce WHERE chave_acesso = ?", (chave_acesso,)
+            ).fetchone()
+            if linha is None:
+                return None
+
+            registro = (json.loads(linha[0]), json.loads(linha[1]))
+            self._lembrar(chave_acesso, registro)
+            return self._copiar(registro)
+
+    def obter_html(self, chave_acesso):
+        """Retorna o HTML bruto salvo da nota (ou None)."""
+        with self._lock:
+            linha = self._conn.execute(
+                "SELECT html FROM cache_nfce WHERE chave_acesso = ?", (chave_acesso,)
+            ).fetchone()
+        if linha is None or linha[0] is None:
+            return None
+        return zlib.decompress(linha[0]).decode('utf-8')
+
+    def guardar(self, chave_acesso, dados_nota, lista_itens, pagina_html=None):
+        """Persiste uma raspagem bem-sucedida."""
+        html_comprimido = zlib.compress(pagina_html.encode('utf-8')) if pagina_html else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_nfce VALUES (?, ?, ?, ?, ?)",
+                (chave_acesso, json.dumps(dados_nota, ensure_ascii=False),
+                 json.dumps(lista_itens, ensure_ascii=False), html_comprimido,
+                 datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+            )
+            self._conn.commit()
+            self._lembrar(chave_acesso, (dict(dados_nota), [dict(item) for item in lista_itens]))
+
+    def __contains__(self, chave_acesso):
+        return self.obter(chave_acesso) is not None
+
+    def obter_ou_raspar(self, chave_acesso, funcao_raspagem):
+        """
+        Retorna (dados_nota, lista_itens, veio_do_cache).
+
+        'funcao_raspagem' é chamada sem argumentos e deve retornar
+        (dados_nota, lista_itens, html). Envios simultâneos da mesma chave
+        esperam a primeira raspagem em vez de consultar a SEFAZ de novo.
+        """
+        registro = self.obter(chave_acesso)
+        if registro is not None:
+            return registro[0], registro[1], True
+
+        with self._lock:
+            entrada = self._locks_chave.setdefault(chave_acesso, [threading.Lock(), 0])
+            entrada[1] += 1
+        lock_chave = entrada[0]
+
+        try:
+            with lock_chave:
+                # Outra thread pode ter raspado enquanto esperávamos
+                registro = self.obter(chave_acesso)
+                if registro is not None:
+                    return registro[0], registro[1], True
+
+                dados_nota, lista_itens, pagina_html = funcao_raspagem()
+                if dados_nota and lista_itens:
+                    self.guardar(chave_acesso, dados_nota, lista_itens, pagina_html)
+                    dados_nota, lista_itens = self._copiar((dados_nota, lista_itens))
+                return dados_nota, lista_itens, False
+        finally:
+            with self._lock:
+                # Só remove o lock quando ninguém mais espera por ele; senão uma
+                # thread nova criaria outro lock e rasparia junto com as que esperam
+                entrada[1] -= 1
+                if entrada[1] == 0:
+                    del self._locks_chave[chave_acesso]
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Funções internas ---
+
+    def _lembrar(self, chave_acesso, registro):
+        self._lru[chave_acesso] = registro
+        self._lru.move_to_end(chave_acesso)
+        while len(self._lru) > self.tamanho_lru:
+            self._lru.popitem(last=False)
+
+    @staticmethod
+    def _copiar(registro):
+        # O chamador (ex: salvar_dados_em_csv) altera os dicts; o cache não pode ser afetado
+        dados_nota, lista_itens = registro
+        return dict(dados_nota), [dict(item) for item in lista_itens]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def obter_cache():
+    """Cache compartilhado do processo."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CacheNfce()
+        return _cache
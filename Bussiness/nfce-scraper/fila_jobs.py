@@ -0,0 +1,231 @@
+# fila_jobs.py
+
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# --- Fila de Raspagens ---
+# O app só enfileira a URL e acompanha o status; quem abre navegadores e fala
+# com a SEFAZ é o worker_nfce.py, em outro processo. A fila é um SQLite (WAL)
+# compartilhado pelos dois processos.
+
+ARQUIVO_FILA = os.path.join('data', 'fila_jobs.sqlite')
+
+PENDENTE = 'pendente'
+PROCESSANDO = 'processando'
+CONCLUIDO = 'concluido'
+FALHA = 'falha'
+
+MAX_TENTATIVAS = 3
+TIMEOUT_PROCESSANDO = 300   # Segundos até um job 'processando' ser considerado abandonado
+WORKER_ATIVO_SEGUNDOS = 15  # Heartbeat mais antigo que isso = worker parado
+BACKOFF_BASE = 10           # Espera (s) antes da 2ª tentativa; dobra a cada falha
+BACKOFF_MAX = 300
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    url TEXT NOT NULL,
+    hash_qr TEXT,
+    status TEXT NOT NULL,
+    tentativas INTEGER NOT NULL DEFAULT 0,
+    resultado TEXT,
+    erro TEXT,
+    worker TEXT,
+    criado_em REAL NOT NULL,
+    disponivel_em REAL,
+    iniciado_em REAL,
+    concluido_em REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_hash_qr ON jobs(hash_qr);
+CREATE TABLE IF NOT EXISTS workers (
+    nome TEXT PRIMARY KEY,
+    visto_em REAL NOT NULL
+);
+"""
+
+
+class FilaJobs:
+    """
+    Fila persistente de jobs de raspagem, segura entre processos.
+
+    Cada job passa por pendente -> processando -> concluido/falha. Um job
+    'processando' cujo worker morreu volta para 'pendente' após TIMEOUT_PROCESSANDO.
+    Um job que falhou só volta a ser reservado depois do backoff (disponivel_em).
+    """
+
+    def __init__(self, caminho=ARQUIVO_FILA, max_tentativas=MAX_TENTATIVAS,
+                 timeout_processando=TIMEOUT_PROCESSANDO, backoff_base=BACKOFF_BASE):
+        self.caminho = caminho
+        self.max_tentativas = max_tentativas
+        self.timeout_processando = timeout_processando
+        self.backoff_base = backoff_base
+        self._lock = threading.Lock()
+
+        if os.path.dirname(caminho):
+            os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        # isolation_level=None: as transações são abertas explicitamente (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(caminho, timeout=10, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(ESQUEMA)
+        self._migrar()
+
+    def enfileirar(self, url, hash_qr=None):
+        """
+        Cria um job e retorna seu id. Se a mesma nota já estiver na fila
+        (pendente ou processando), retorna o id do job existente.
+        """
+        with self._transacao():
+            if hash_qr:
+                existente = self._conn.execute(
+                    "SELECT id FROM jobs WHERE hash_qr = ? AND status IN (?, ?) ORDER BY id LIMIT 1",
+                    (hash_qr, PENDENTE, PROCESSANDO)
+                ).fetchone()
+                if existente:
+                    return existente['id']
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (url, hash_qr, status, criado_em) VALUES (?, ?, ?, ?)",
+                (url, hash_qr, PENDENTE, time.time())
+            )
+            return cursor.lastrowid
+
+    def reservar(self, worker):
+        """
+        Marca o job pendente mais antigo como 'processando' e o retorna (dict), ou
+        None se não houver job pendente fora do backoff.
+        """
+        with self._transacao():
+            self._recuperar_abandonados()
+            linha = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? AND (disponivel_em IS NULL OR disponivel_em <= ?) "
+                "ORDER BY id LIMIT 1", (PENDENTE, time.time())
+            ).fetchone()
+            if linha is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, iniciado_em = ?, tentativas = tentativas + 1 WHERE id = ?",
+                (PROCESSANDO, worker, time.time(), linha['id'])
+            )
+            job = dict(linha)
+            job.update(status=PROCESSANDO, worker=worker, tentativas=linha['tentativas'] + 1)
+            return job
+
+    def concluir(self, job_id, resultado):
+        """Registra o resultado (dict serializável em JSON) de um job bem-sucedido."""
+        with self._transacao():
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, resultado = ?, erro = NULL, concluido_em = ? WHERE id = ?",
+                (CONCLUIDO, json.dumps(resultado, ensure_ascii=False), time.time(), job_id)
+            )
+
+    def falhar(self, job_id, erro):
+        """
+        Devolve o job para a fila (reservável só após o backoff exponencial) ou,
+        esgotadas as tentativas, o marca como 'falha'.
+        """
+        with self._transacao():
+            linha = self._conn.execute("SELECT tentativas FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if linha is None:
+                return
+            agora = time.time()
+            if linha['tentativas'] >= self.max_tentativas:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, erro = ?, worker = NULL, concluido_em = ? WHERE id = ?",
+                    (FALHA, str(erro), agora, job_id)
+                )
+                return
+            # Jitter de até 25% para jobs que falharam juntos não voltarem juntos
+            espera = min(BACKOFF_MAX, self.backoff_base * (2 ** (linha['tentativas'] - 1))) * (1 + random.random() * 0.25)
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, erro = ?, worker = NULL, disponivel_em = ? WHERE id = ?",
+                (PENDENTE, str(erro), agora + espera, job_id)
+            )
+
+    def obter(self, job_id):
+        """Retorna o job como dict (resultado já decodificado), ou None."""
+        with self._lock:
+            linha = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if linha is None:
+            return None
+        job = dict(linha)
+        job['resultado'] = json.loads(job['resultado']) if job['resultado'] else None
+        return job
+
+    def contar(self, status=PENDENTE):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (status,)).fetchone()[0]
+
+    def registrar_worker(self, nome):
+        """Heartbeat do worker (o app usa para saber se há alguém consumindo a fila)."""
+        with self._transacao():
+            self._conn.execute(
+                "INSERT INTO workers (nome, visto_em) VALUES (?, ?) "
+                "ON CONFLICT(nome) DO UPDATE SET visto_em = excluded.visto_em",
+                (nome, time.time())
+            )
+
+    def remover_worker(self, nome):
+        with self._transacao():
+            self._conn.execute("DELETE FROM workers WHERE nome = ?", (nome,))
+
+    def workers_ativos(self):
+        limite = time.time() - WORKER_ATIVO_SEGUNDOS
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM workers WHERE visto_em >= ?", (limite,)).fetchone()[0]
+
+    def fechar(self):
+        with self._lock:
+            self._conn.close()
+
+    # --- Funções internas ---
+
+    @contextmanager
+    def _transacao(self):
+        """BEGIN IMMEDIATE ... COMMIT/ROLLBACK: trava a escrita entre processos durante o bloco."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _migrar(self):
+        """Filas criadas antes do backoff: adiciona a coluna disponivel_em."""
+        colunas = [linha[1] for linha in self._conn.execute("PRAGMA table_info(jobs)")]
+        if 'disponivel_em' not in colunas:
+            try:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN disponivel_em REAL")
+            except sqlite3.OperationalError:
+                pass  # Outro processo (app ou worker) migrou ao mesmo tempo
+
+    def _recuperar_abandonados(self):
+        agora = time.time()
+        erro = f"Worker não respondeu em {self.timeout_processando}s"
+        # Um job que derruba o worker em toda tentativa não pode voltar para a fila para sempre
+        self._conn.execute(
+            "UPDATE jobs SET status = CASE WHEN tentativas >= ? THEN ? ELSE ? END, "
+            "concluido_em = CASE WHEN tentativas >= ? THEN ? END, worker = NULL, erro = ? "
+            "WHERE status = ? AND iniciado_em < ?",
+            (self.max_tentativas, FALHA, PENDENTE, self.max_tentativas, agora, erro,
+             PROCESSANDO, agora - self.timeout_processando)
+        )
+
+
+_fila = None
+_fila_lock = threading.Lock()
+
+def obter_fila():
+    """Fila compartilhada do processo."""
+    global _fila
+    with _fila_lock:
+        if _fila is None:
+            _fila = FilaJobs()
+        return _fila
@@ -0,0 +1,152 @@
+# indice_produtos.py
+
+import re
+import unicodedata
+
+# --- Índice de Produtos ---
+# Cada loja escreve o mesmo produto de um jeito ("ARROZ TP1 5KG", "Arroz Tipo 1 5 kg").
+# A descrição é normalizada e ganha um produto_id; tokens e trigramas do nome
+# normalizado formam um índice invertido, mantido a cada item salvo no banco.
+# Assim "histórico de preço do produto X" é uma consulta indexada, não uma
+# varredura com comparação aproximada de strings.
+
+UNIDADES = {
+    'KG': 'KG', 'KGS': 'KG', 'KILO': 'KG', 'QUILO': 'KG',
+    'G': 'G', 'GR': 'G', 'GRS': 'G', 'GRAMAS': 'G',
+    'L': 'L', 'LT': 'L', 'LTS': 'L', 'LITRO': 'L', 'LITROS': 'L',
+    'ML': 'ML',
+    'UN': 'UN', 'UND': 'UN', 'UNID': 'UN', 'UNIDADE': 'UN',
+}
+ABREVIACOES = {
+    'TP': 'TIPO', 'INT': 'INTEGRAL', 'DESN': 'DESNATADO', 'SEMIDESN': 'SEMIDESNATADO',
+    'TRAD': 'TRADICIONAL', 'REFRIG': 'REFRIGERANTE', 'PCT': 'PACOTE', 'CX': 'CAIXA',
+}
+SIMILARIDADE_MINIMA = 0.35  # Jaccard de trigramas para a busca aproximada
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS produtos (
+    id INTEGER PRIMARY KEY,
+    nome_normalizado TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS produto_tokens (
+    token TEXT NOT NULL,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id),
+    PRIMARY KEY (token, produto_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS produto_trigramas (
+    trigrama TEXT NOT NULL,
+    produto_id INTEGER NOT NULL REFERENCES produtos(id),
+    PRIMARY KEY (trigrama, produto_id)
+) WITHOUT ROWID;
+"""
+
+
+def normalizar_descricao(descricao):
+    """
+    'Arroz Tp1 5kg.' -> 'ARROZ TIPO 1 5 KG'
+
+    Remove acentos e pontuação, separa números de unidades, padroniza
+    unidades de medida e expande abreviações comuns.
+    """
+    texto = unicodedata.normalize('NFKD', descricao or '')
+    texto = ''.join(c for c in texto if not unicodedata.combining(c)).upper()
+    texto = re.sub(r'(\d),(\d)', r'\1.\2', texto)          # 1,5L -> 1.5L
+    texto = re.sub(r'[^A-Z0-9.]+', ' ', texto)
+    texto = re.sub(r'(?<!\d)\.|\.(?!\d)', ' ', texto)      # Mantém só o ponto decimal
+    texto = re.sub(r'(\d)([A-Z])', r'\1 \2', texto)
+    texto = re.sub(r'([A-Z])(\d)', r'\1 \2', texto)
+
+    palavras = []
+    for palavra in texto.split():
+        palavra = ABREVIACOES.get(palavra, palavra)
+        if palavras and re.fullmatch(r'\d+(\.\d+)?', palavras[-1]):
+            palavra = UNIDADES.get(palavra, palavra)
+        palavras.append(palavra)
+    return ' '.join(palavras)
+
+def tokens(nome_normalizado):
+    return set(nome_normalizado.split())
+
+def trigramas(nome_normalizado):
+    """Trigramas de cada palavra, com bordas (' AR', 'ARR', 'RRO', ..., 'OZ ')."""
+    resultado = set()
+    for palavra in nome_normalizado.split():
+        palavra = f" {palavra} "
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+
+class IndiceProdutos:
+    """
+    Índice invertido dos produtos, gravado no mesmo SQLite das notas.
+
+    Não controla transações nem travas: quem chama (BancoNfce) já está
+    dentro da transação da nota.
+    """
+
+    def __init__(self, conn):
+        self._conn = conn
+        self._conn.executescript(ESQUEMA)
+        self._ids = {}  # nome_normalizado -> produto_id (evita SELECT a cada item repetido)
+
+    def indexar(self, descricao):
+        """Retorna o produto_id da descrição, criando o produto e suas entradas no índice se for novo."""
+        nome = normalizar_descricao(descricao)
+        if not nome:
+            return None
+        if nome in self._ids:
+            return self._ids[nome]
+
+        linha = self._conn.execute("SELECT id FROM produtos WHERE nome_normalizado = ?", (nome,)).fetchone()
+        if linha is not None:
+            self._ids[nome] = linha[0]
+            return linha[0]
+
+        produto_id = self._conn.execute("INSERT INTO produtos (nome_normalizado) VALUES (?)", (nome,)).lastrowid
+        self._conn.executemany("INSERT INTO produto_tokens VALUES (?, ?)",
+                               [(token, produto_id) for token in tokens(nome)])
+        self._conn.executemany("INSERT INTO produto_trigramas VALUES (?, ?)",
+                               [(trigrama, produto_id) for trigrama in trigramas(nome)])
+        # Produto novo não entra no cache aqui: se a nota for desfeita, o id deixa de existir
+        return produto_id
+
+    def esquecer(self):
+        """Limpa o cache de ids (chamado após um ROLLBACK)."""
+        self._ids.clear()
+
+    def buscar(self, consulta, limite=20):
+        """
+        Produtos que casam com a consulta: [(produto_id, nome_normalizado, pontuacao), ...].
+
+        Primeiro exige todos os tokens da consulta (pontuação 1.0); se nada casar,
+        cai para a similaridade de trigramas (tolera erros de digitação/abreviações).
+        """
+        nome = normalizar_descricao(consulta)
+        if not nome:
+            return []
+
+        termos = sorted(tokens(nome))
+        exatos = self._conn.execute(f"""
+            SELECT p.id, p.nome_normalizado FROM produto_tokens t JOIN produtos p ON p.id = t.produto_id
+            WHERE t.token IN ({', '.join('?' * len(termos))})
+            GROUP BY p.id HAVING COUNT(*) = ?
+            ORDER BY LENGTH(p.nome_normalizado) LIMIT ?
+        """, [*termos, len(termos), limite]).fetchall()
+        if exatos:
+            return [(produto_id, nome_produto, 1.0) for produto_id, nome_produto in exatos]
+
+        grams = sorted(trigramas(nome))
+        candidatos = self._conn.execute(f"""
+            SELECT p.id, p.nome_normalizado, COUNT(*) AS comuns
+            FROM produto_trigramas g JOIN produtos p ON p.id = g.produto_id
+            WHERE g.trigrama IN ({', '.join('?' * len(grams))})
+            GROUP BY p.id
+        """, grams).fetchall()
+
+        resultado = []
+        for produto_id, nome_produto, comuns in candidatos:
+            similaridade = comuns / (len(grams) + len(trigramas(nome_produto)) - comuns)
+            if similaridade >= SIMILARIDADE_MINIMA:
+                resultado.append((produto_id, nome_produto, round(similaridade, 3)))
+        resultado.sort(key=lambda r: -r[2])
+        return resultado[:limite]
@@ -5,6 +5,13 @@ from io import BytesIO
 from PIL import Image
 from pyzbar.pyzbar import decode as pyzbar_decode
 import numpy as np
+import cv2
+from registro_sefaz import extrair_chave
+
+# --- Decodificação em Múltiplas Escalas ---
+# Fotos de celular têm 12+ MP; o QR Code da NFC-e costuma ser legível bem abaixo disso.
+LADO_MAX_RAPIDO = 1024   # Maior lado da imagem reduzida usada na primeira tentativa
+MARGEM_RECORTE = 0.15    # Folga (fração do lado do QR) ao recortar a região candidata
 
 # --- Funções de Extração da URL (Núcleo do Fiscalizador) ---
 
@@ -54,7 +61,8 @@ def extrair_hash_da_url(url_completa: str) -> str | None:
     """
     chave_acesso, _ = extrair_chaves_da_url(url_completa)
     # A Chave de Acesso é o nosso hash_qr único de controle
-    return chave_acesso
+    # Chave pura, QR Code v3 (sem token) ou outros formatos de URL: ver registro_sefaz
+    return chave_acesso or extrair_chave(url_completa)
 
 # --- Função de Decodificação de Imagem (Para o Upload do Streamlit) ---
 
@@ -62,6 +70,11 @@ def extrair_url_qr_code(image_bytes: bytes) -> str | None:
     """
     Decodifica o QR Code contido na imagem binária.
     
+    Tenta, nesta ordem, parando no primeiro sucesso:
+      1. A imagem reduzida (maior lado = LADO_MAX_RAPIDO), em tons de cinza;
+      2. Recorte em resolução total da região onde o OpenCV localizou o QR;
+      3. A imagem inteira em resolução total (comportamento original).
+    
     Args:
         image_bytes: O conteúdo binário da imagem (passado pelo st.file_uploader.read()).
         
@@ -69,26 +82,56 @@ def extrair_url_qr_code(image_bytes: bytes) -> str | None:
         A URL do QR Code decodificado, ou None se não for encontrado.
     """
     try:
-        # Abre a imagem a partir dos bytes
-        image = Image.open(BytesIO(image_bytes)).convert('RGB')
-        
-        # Converte para array numpy
-        img_np = np.array(image)
-        
-        # Decodifica o QR Code
-        decoded_objects = pyzbar_decode(img_np)
-        
-        if decoded_objects:
-            # Assume que o primeiro QR Code encontrado é o da NFC-e
-            qr_data = decoded_objects[0].data.decode('utf-8')
-            return qr_data
-        
-        return None
+        # Converte direto para tons de cinza (1 byte/pixel, em vez de RGB)
+        cinza = np.asarray(Image.open(BytesIO(image_bytes)).convert('L'))
+
+        escala = LADO_MAX_RAPIDO / max(cinza.shape)
+        if escala < 1:
+            reduzida = cv2.resize(cinza, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+            qr_data = _decodificar(reduzida)
+            if qr_data:
+                return qr_data
+
+            regiao = localizar_regiao_qr(reduzida, escala, cinza.shape)
+            if regiao is not None:
+                topo, base, esquerda, direita = regiao
+                qr_data = _decodificar(cinza[topo:base, esquerda:direita])
+                if qr_data:
+                    return qr_data
+
+        return _decodificar(cinza)
         
     except Exception:
         # print(f"Erro ao decodificar QR Code da imagem: {e}")
         return None
 
+def localizar_regiao_qr(imagem_reduzida, escala, forma_original):
+    """
+    Localiza o QR na imagem reduzida (OpenCV) e devolve o retângulo correspondente
+    na imagem original, com margem: (topo, base, esquerda, direita), ou None.
+    """
+    encontrado, pontos = cv2.QRCodeDetector().detect(imagem_reduzida)
+    if not encontrado or pontos is None:
+        return None
+
+    pontos = pontos.reshape(-1, 2) / escala
+    (x_min, y_min), (x_max, y_max) = pontos.min(axis=0), pontos.max(axis=0)
+    margem = MARGEM_RECORTE * max(x_max - x_min, y_max - y_min)
+
+    altura, largura = forma_original[:2]
+    topo, base = max(int(y_min - margem), 0), min(int(y_max + margem) + 1, altura)
+    esquerda, direita = max(int(x_min - margem), 0), min(int(x_max + margem) + 1, largura)
+    if base <= topo or direita <= esquerda:
+        return None
+    return topo, base, esquerda, direita
+
+def _decodificar(img_np) -> str | None:
+    decoded_objects = pyzbar_decode(img_np)
+    if decoded_objects:
+        # Assume que o primeiro QR Code encontrado é o da NFC-e
+        return decoded_objects[0].data.decode('utf-8')
+    return None
+
 
 if __name__ == '__main__':
     # --- Demonstração de Teste ---
@@ -0,0 +1,191 @@
+# lote_nfce.py
+
+import sys
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import urlparse
+
+from leitor_qr import extrair_hash_da_url
+from scraper_nfce import raspar_dados_nfce_com_cache
+from salvador_csv import salvar_dados_em_csv
+from cache_nfce import obter_cache
+from metricas_scraper import obter_metricas
+from registro_sefaz import resolver_url, ChaveInvalida
+
+# --- Configuração do Modo Lote ---
+MAX_CONCORRENTES = 8        # Raspagens simultâneas no total
+MAX_POR_HOST = 2            # Raspagens simultâneas por servidor da SEFAZ
+INTERVALO_MIN_POR_HOST = 0.5  # Segundos entre o início de duas requisições ao mesmo host
+TENTATIVAS = 3
+BACKOFF_BASE = 1.0          # Espera antes da 2ª tentativa; dobra a cada nova falha
+
+
+class LimitadorHost:
+    """Limita concorrência e taxa de requisições para um único host."""
+
+    def __init__(self, max_concorrentes, intervalo_min):
+        self.semaforo = asyncio.Semaphore(max_concorrentes)
+        self.intervalo_min = intervalo_min
+        self._lock = asyncio.Lock()
+        self._proximo_inicio = 0.0
+
+    async def aguardar_vez(self):
+        """Espaça o início das requisições em pelo menos 'intervalo_min' segundos."""
+        async with self._lock:
+            agora = time.monotonic()
+            espera = self._proximo_inicio - agora
+            self._proximo_inicio = max(agora, self._proximo_inicio) + self.intervalo_min
+        if espera > 0:
+            await asyncio.sleep(espera)
+
+
+def ler_urls(linhas):
+    """Normaliza uma lista de linhas (arquivo .txt/.csv) em URLs, ignorando vazias, comentários e repetidas."""
+    urls, vistas = [], set()
+    for linha in linhas:
+        url = linha.strip().split(';')[0].split(',')[0].strip()
+        if not url or url.startswith('#') or url in vistas:
+            continue
+        vistas.add(url)
+        urls.append(url)
+    return urls
+
+
+async def _raspar_com_retry(url, hash_qr, limitador, global_sem, tentativas, backoff_base):
+    """Raspa uma URL respeitando os limites, com backoff exponencial + jitter entre tentativas."""
+    for tentativa in range(1, tentativas + 1):
+        async with limitador.semaforo:
+            # A espera pela vez do host não ocupa vaga global: outros hosts seguem raspando
+            await limitador.aguardar_vez()
+            async with global_sem:
+                # O scraper é síncrono (requests/Selenium): roda em thread para não travar o loop
+                dados_nota, lista_itens, _ = await asyncio.to_thread(raspar_dados_nfce_com_cache, url, hash_qr)
+
+        if dados_nota and lista_itens:
+            return dados_nota, lista_itens, tentativa
+
+        if tentativa < tentativas:
+            espera = backoff_base * (2 ** (tentativa - 1)) * (1 + random.random() * 0.25)
+            print(f"DEBUG: Tentativa {tentativa} falhou para {url[:60]}... nova tentativa em {espera:.1f}s")
+            await asyncio.sleep(espera)
+
+    return None, None, tentativas
+
+
+async def executar_lote(urls, ao_concluir=None, salvar=True,
+                        max_concorrentes=MAX_CONCORRENTES, max_por_host=MAX_POR_HOST,
+                        intervalo_min=INTERVALO_MIN_POR_HOST, tentativas=TENTATIVAS,
+                        backoff_base=BACKOFF_BASE):
+    """
+    Raspa várias NFC-e em paralelo. Cada nota é salva assim que termina (não ao fim do lote).
+
+    Args:
+        urls: Lista de URLs de NFC-e.
+        ao_concluir: Callback opcional chamado com o dict de resultado de cada nota.
+        salvar: Se True, persiste cada nota no banco local via salvar_dados_em_csv.
+
+    Returns:
+        Lista de dicts de resultado (url, hash_qr, sucesso, itens, valor_total, tentativas, erro).
+    """
+    global_sem = asyncio.Semaphore(max_concorrentes)
+    limitadores = {}
+
+    async def processar(url):
+        try:
+            url = resolver_url(url)  # Linhas com a chave pura viram a URL da UF
+        except ChaveInvalida as e:
+            return {'url': url, 'hash_qr': None, 'sucesso': False, 'itens': 0,
+                    'valor_total': None, 'tentativas': 0, 'erro': str(e)}
+        resultado = {'url': url, 'hash_qr': extrair_hash_da_url(url), 'sucesso': False,
+                     'itens': 0, 'valor_total': None, 'tentativas': 0, 'erro': None}
+        if not resultado['hash_qr']:
+            resultado['erro'] = "Chave de acesso não encontrada na URL"
+            return resultado
+
+        host = urlparse(url).netloc
+        if host not in limitadores:
+            limitadores[host] = LimitadorHost(max_por_host, intervalo_min)
+
+        # Notas já em cache não consomem a cota de requisições do host
+        registro = await asyncio.to_thread(obter_cache().obter, resultado['hash_qr'])  # Leitura no SQLite
+        try:
+            if registro is not None:
+                obter_metricas().incrementar('cache_hit')
+                dados_nota, lista_itens = registro
+            else:
+                dados_nota, lista_itens, resultado['tentativas'] = await _raspar_com_retry(
+                    url, resultado['hash_qr'], limitadores[host], global_sem, tentativas, backoff_base
+                )
+        except Exception as e:
+            resultado['erro'] = str(e)
+            return resultado
+
+        if not dados_nota:
+            resultado['erro'] = "Falha na raspagem após todas as tentativas"
+            return resultado
+
+        if salvar:
+            # Transação no SQLite fora do loop; notas repetidas no lote não são duplicadas no banco
+            await asyncio.to_thread(salvar_dados_em_csv, dados_nota, lista_itens, resultado['hash_qr'])
+        resultado.update(sucesso=True, itens=len(lista_itens), valor_total=dados_nota.get('valor_total'))
+        return resultado
+
+    resultados = []
+    for tarefa in asyncio.as_completed([processar(url) for url in urls]):
+        resultado = await tarefa
+        resultados.append(resultado)
+        if ao_concluir:
+            ao_concluir(resultado)
+    return resultados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Auditoria em lote de NFC-e (uma URL por linha).")
+    parser.add_argument('arquivo', help="Arquivo .txt/.csv com as URLs ('-' para ler da entrada padrão)")
+    parser.add_argument('--total', type=int, default=MAX_CONCORRENTES, help="Raspagens simultâneas no total")
+    parser.add_argument('--por-host', type=int, default=MAX_POR_HOST, help="Raspagens simultâneas por host")
+    parser.add_argument('--intervalo', type=float, default=INTERVALO_MIN_POR_HOST, help="Segundos entre requisições ao mesmo host")
+    parser.add_argument('--tentativas', type=int, default=TENTATIVAS)
+    parser.add_argument('--metricas-porta', type=int, help="Expõe /metrics (Prometheus) nesta porta durante o lote")
+    args = parser.parse_args(argv)
+
+    metricas = obter_metricas()
+    if args.metricas_porta:
+        metricas.iniciar_servidor_prometheus(args.metricas_porta)
+
+    if args.arquivo == '-':
+        urls = ler_urls(sys.stdin)
+    else:
+        with open(args.arquivo, encoding='utf-8') as f:
+            urls = ler_urls(f)
+
+    print(f"--- AUDITORIA EM LOTE: {len(urls)} NFC-e ---")
+    inicio = time.perf_counter()
+
+    def exibir(resultado):
+        status = f"OK {resultado['itens']} itens" if resultado['sucesso'] else f"FALHA ({resultado['erro']})"
+        print(f"[{resultado['hash_qr'] or 'sem chave'}] {status}")
+
+    resultados = asyncio.run(executar_lote(
+        urls, ao_concluir=exibir, max_concorrentes=args.total, max_por_host=args.por_host,
+        intervalo_min=args.intervalo, tentativas=args.tentativas
+    ))
+
+    sucesso = sum(1 for r in resultados if r['sucesso'])
+    print(f"\n=== LOTE CONCLUÍDO: {sucesso}/{len(resultados)} notas em {time.perf_counter() - inicio:.1f}s ===")
+
+    resumo = metricas.resumo()
+    if resumo['raspagens']:
+        print(f"Raspagens na SEFAZ: {resumo['raspagens']} | latência média {resumo['latencia_media_s']:.2f}s")
+        for nome, fase in sorted(resumo['fases'].items(), key=lambda item: -item[1]['media_s'] * item[1]['contagem']):
+            print(f"  {nome:<18} n={fase['contagem']:<5} média {fase['media_s']:.3f}s  máx {fase['max_s']:.3f}s")
+    if resumo['eventos']:
+        print("Eventos: " + ', '.join(f"{evento}={n}" for evento, n in sorted(resumo['eventos'].items())))
+    if metricas.arquivo:
+        print(f"Detalhes por nota em {metricas.arquivo} (resumo: python metricas_scraper.py)")
+
+
+if __name__ == '__main__':
+    main()
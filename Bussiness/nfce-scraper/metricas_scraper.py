@@ -0,0 +1,264 @@
+# metricas_scraper.py
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# --- Instrumentação do Scraper ---
+# Cada raspagem vira uma linha JSON em data/metricas_scraper.jsonl com o tempo de
+# cada fase (inicio_driver, navegacao, espera_elemento, extracao, http_download...)
+# e os eventos ocorridos (timeout_espera, falha_parse_http, fallback_selenium...).
+# Em memória ficam contadores, totais por fase e um histograma da latência total,
+# expostos opcionalmente no formato texto do Prometheus.
+
+ARQUIVO_METRICAS = os.path.join('data', 'metricas_scraper.jsonl')
+LIMITES_HISTOGRAMA = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)  # Segundos
+PREFIXO_PROMETHEUS = 'nfce_scraper'
+
+# Raspagem em andamento no contexto atual (thread ou tarefa asyncio)
+_raspagem_atual = contextvars.ContextVar('raspagem_atual', default=None)
+
+
+class MetricasScraper:
+    """
+    Coletor de métricas do scraper, seguro entre threads.
+
+    Args:
+        arquivo: JSON lines de saída (None desativa a gravação).
+        limites: Limites superiores (s) dos buckets do histograma de latência.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_METRICAS, limites=LIMITES_HISTOGRAMA):
+        self.arquivo = arquivo
+        self.limites = tuple(limites)
+        self._lock = threading.Lock()
+        self.contadores = Counter()
+        self.fases = {}  # nome -> [contagem, soma, minimo, maximo]
+        self.buckets = [0] * (len(self.limites) + 1)  # Último = +Inf
+        self.latencia_soma = 0.0
+        self.raspagens = 0
+
+    @contextmanager
+    def raspagem(self, url_nfce, modo=None):
+        """
+        Delimita uma raspagem completa. Fases e eventos registrados dentro do bloco
+        (mesmo em funções internas) são anexados a ela. Defina registro['sucesso'].
+        """
+        if _raspagem_atual.get() is not None:
+            # Raspagem aninhada (ex: wrapper chamando outro wrapper): conta só a externa
+            yield _raspagem_atual.get()
+            return
+
+        registro = {'url': url_nfce, 'modo': modo, 'sucesso': False, 'fases': {}, 'eventos': []}
+        token = _raspagem_atual.set(registro)
+        inicio = time.perf_counter()
+        try:
+            yield registro
+        finally:
+            _raspagem_atual.reset(token)
+            self._finalizar(registro, time.perf_counter() - inicio)
+
+    @contextmanager
+    def fase(self, nome):
+        """Cronometra uma fase (soma no total do processo e na raspagem em andamento)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_fase(nome, time.perf_counter() - inicio)
+
+    def registrar_fase(self, nome, segundos):
+        with self._lock:
+            estatistica = self.fases.setdefault(nome, [0, 0.0, segundos, segundos])
+            estatistica[0] += 1
+            estatistica[1] += segundos
+            estatistica[2] = min(estatistica[2], segundos)
+            estatistica[3] = max(estatistica[3], segundos)
+        registro = _raspagem_atual.get()
+        if registro is not None:
+            registro['fases'][nome] = registro['fases'].get(nome, 0.0) + segundos
+
+    def incrementar(self, evento, quantidade=1):
+        """Conta um evento (timeout_espera, falha_parse_http, cache_hit...)."""
+        with self._lock:
+            self.contadores[evento] += quantidade
+        registro = _raspagem_atual.get()
+        if registro is not None:
+            registro['eventos'].append(evento)
+
+    def resumo(self):
+        """Snapshot das métricas em memória (dict serializável)."""
+        with self._lock:
+            return {
+                'raspagens': self.raspagens,
+                'latencia_media_s': self.latencia_soma / self.raspagens if self.raspagens else None,
+                'eventos': dict(self.contadores),
+                'fases': {
+                    nome: {'contagem': c, 'media_s': s / c, 'min_s': mn, 'max_s': mx}
+                    for nome, (c, s, mn, mx) in self.fases.items()
+                },
+                'histograma': dict(zip([*map(str, self.limites), '+Inf'], self.buckets)),
+            }
+
+    def texto_prometheus(self):
+        """Métricas no formato de exposição texto do Prometheus."""
+        p = PREFIXO_PROMETHEUS
+        with self._lock:
+            linhas = [f"# TYPE {p}_eventos_total counter"]
+            linhas += [f'{p}_eventos_total{{evento="{evento}"}} {n}' for evento, n in sorted(self.contadores.items())]
+
+            linhas.append(f"# TYPE {p}_fase_segundos summary")
+            for nome, (contagem, soma, _, _) in sorted(self.fases.items()):
+                linhas.append(f'{p}_fase_segundos_sum{{fase="{nome}"}} {soma:.6f}')
+                linhas.append(f'{p}_fase_segundos_count{{fase="{nome}"}} {contagem}')
+
+            linhas.append(f"# TYPE {p}_latencia_segundos histogram")
+            acumulado = 0
+            for limite, quantidade in zip([*map(str, self.limites), '+Inf'], self.buckets):
+                acumulado += quantidade
+                linhas.append(f'{p}_latencia_segundos_bucket{{le="{limite}"}} {acumulado}')
+            linhas.append(f"{p}_latencia_segundos_sum {self.latencia_soma:.6f}")
+            linhas.append(f"{p}_latencia_segundos_count {self.raspagens}")
+        return '\n'.join(linhas) + '\n'
+
+    def iniciar_servidor_prometheus(self, porta=9108, host='127.0.0.1'):
+        """Serve /metrics em uma thread daemon. Retorna o servidor (use .shutdown() para parar)."""
+        metricas = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip('/') != '/metrics':
+                    self.send_error(404)
+                    return
+                corpo = metricas.texto_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass
+
+        servidor = ThreadingHTTPServer((host, porta), _Handler)
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        print(f"Métricas Prometheus em http://{host}:{servidor.server_address[1]}/metrics")
+        return servidor
+
+    # --- Funções internas ---
+
+    def _finalizar(self, registro, total):
+        with self._lock:
+            self.raspagens += 1
+            self.latencia_soma += total
+            self.buckets[self._indice_bucket(total)] += 1
+
+        if not self.arquivo:
+            return
+        linha = {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'url': registro['url'],
+            'modo': registro['modo'],
+            'sucesso': bool(registro['sucesso']),
+            'total_s': round(total, 4),
+            'fases': {nome: round(segundos, 4) for nome, segundos in registro['fases'].items()},
+            'eventos': registro['eventos'],
+        }
+        try:
+            if os.path.dirname(self.arquivo):
+                os.makedirs(os.path.dirname(self.arquivo), exist_ok=True)
+            with self._lock, open(self.arquivo, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(linha, ensure_ascii=False) + '\n')
+        except OSError as e:
+            print(f"DEBUG: Não foi possível gravar métricas em {self.arquivo}: {e}")
+
+    def _indice_bucket(self, segundos):
+        for indice, limite in enumerate(self.limites):
+            if segundos <= limite:
+                return indice
+        return len(self.limites)
+
+
+def resumir_jsonl(linhas):
+    """
+    Agrega linhas JSON (de um ou mais processos/lotes) em um resumo:
+    totais, taxa de sucesso, eventos e p50/p95 de cada fase e da latência total.
+    """
+    totais, eventos, fases = [], Counter(), {}
+    sucessos = 0
+    for linha in linhas:
+        if not linha.strip():
+            continue
+        registro = json.loads(linha)
+        totais.append(registro['total_s'])
+        sucessos += bool(registro['sucesso'])
+        eventos.update(registro['eventos'])
+        for nome, segundos in registro['fases'].items():
+            fases.setdefault(nome, []).append(segundos)
+
+    return {
+        'raspagens': len(totais),
+        'sucessos': sucessos,
+        'eventos': dict(eventos),
+        'total': _percentis(totais),
+        'fases': {nome: _percentis(valores) for nome, valores in sorted(fases.items())},
+    }
+
+def _percentis(valores):
+    if not valores:
+        return {'contagem': 0}
+    if len(valores) == 1:
+        return {'contagem': 1, 'p50_s': valores[0], 'p95_s': valores[0], 'max_s': valores[0]}
+    cortes = statistics.quantiles(valores, n=20, method='inclusive')  # 5%, 10%, ..., 95%
+    return {'contagem': len(valores), 'p50_s': statistics.median(valores), 'p95_s': cortes[-1], 'max_s': max(valores)}
+
+def imprimir_resumo(resumo):
+    print(f"Raspagens: {resumo['raspagens']} | Sucesso: {resumo['sucessos']}")
+    if resumo['total'].get('contagem'):
+        t = resumo['total']
+        print(f"Latência total: p50 {t['p50_s']:.2f}s | p95 {t['p95_s']:.2f}s | máx {t['max_s']:.2f}s")
+    for nome, t in resumo['fases'].items():
+        print(f"  {nome:<18} n={t['contagem']:<5} p50 {t['p50_s']:.3f}s  p95 {t['p95_s']:.3f}s")
+    if resumo['eventos']:
+        print("Eventos: " + ', '.join(f"{evento}={n}" for evento, n in sorted(resumo['eventos'].items())))
+
+
+_metricas = None
+_metricas_lock = threading.Lock()
+
+def obter_metricas():
+    """Coletor compartilhado do processo."""
+    global _metricas
+    with _metricas_lock:
+        if _metricas is None:
+            _metricas = MetricasScraper()
+        return _metricas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumo das métricas de raspagem (JSON lines).")
+    parser.add_argument('arquivos', nargs='*', default=[ARQUIVO_METRICAS],
+                        help="Arquivos .jsonl ('-' para a entrada padrão)")
+    args = parser.parse_args(argv)
+
+    linhas = []
+    for arquivo in args.arquivos:
+        if arquivo == '-':
+            linhas.extend(sys.stdin)
+        else:
+            with open(arquivo, encoding='utf-8') as f:
+                linhas.extend(f)
+    imprimir_resumo(resumir_jsonl(linhas))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+# pool_drivers.py
+
+import queue
+import threading
+from contextlib import contextmanager
+
+# --- Pool de Navegadores Persistentes ---
+# Abrir o Chrome custa segundos; raspar uma nota já carregada custa milissegundos.
+# O pool mantém até 'tamanho' navegadores vivos e os empresta a cada raspagem.
+
+class PoolDrivers:
+    """
+    Pool de WebDrivers reutilizáveis.
+
+    Args:
+        fabrica: Função sem argumentos que cria um novo WebDriver.
+        tamanho: Número máximo de navegadores vivos ao mesmo tempo.
+        max_paginas: Após esse número de usos o navegador é descartado e recriado
+            (evita vazamento de memória do Chrome em processos longos).
+    """
+
+    def __init__(self, fabrica, tamanho=2, max_paginas=50):
+        self.fabrica = fabrica
+        self.tamanho = tamanho
+        self.max_paginas = max_paginas
+
+        self._livres = queue.LifoQueue()  # LIFO: o navegador mais "quente" sai primeiro
+        self._vagas = threading.BoundedSemaphore(tamanho)
+        self._usos = {}
+        self._vivos = 0  # Navegadores vivos ou em criação (a vaga é reservada antes de criar)
+        self._lock = threading.Lock()
+        self._fechado = False
+
+    def aquecer(self, quantidade=None):
+        """Cria navegadores antecipadamente para que a primeira raspagem não pague a inicialização."""
+        quantidade = self.tamanho if quantidade is None else min(quantidade, self.tamanho)
+        while True:
+            with self._lock:
+                # Conta os vivos (livres, emprestados e em criação): o pool nunca passa de 'tamanho'
+                if self._fechado or self._vivos >= quantidade:
+                    return
+                self._vivos += 1
+            driver = self._criar()
+            with self._lock:
+                if not self._fechado:
+                    self._livres.put(driver)
+                    continue
+            # encerrar() rodou enquanto o navegador abria
+            self._descartar(driver)
+
+    @contextmanager
+    def driver(self, timeout=None):
+        """
+        Empresta um navegador durante o bloco 'with'.
+
+        Ao voltar, o navegador é resetado; se não responder mais (crash) ou já
+        tiver atingido max_paginas, é descartado em vez de voltar ao pool.
+        """
+        if self._fechado:
+            raise RuntimeError("Pool de drivers já foi encerrado.")
+        if not self._vagas.acquire(timeout=timeout):
+            raise TimeoutError("Nenhum navegador livre no pool dentro do tempo limite.")
+
+        driver = None
+        try:
+            driver = self._obter_livre()
+            yield driver
+        finally:
+            if driver is not None:
+                self._devolver(driver)
+            self._vagas.release()
+
+    def encerrar(self):
+        """Fecha todos os navegadores ociosos. Navegadores emprestados são fechados ao voltar."""
+        with self._lock:
+            self._fechado = True
+        while True:
+            try:
+                driver = self._livres.get_nowait()
+            except queue.Empty:
+                break
+            self._descartar(driver)
+
+    # --- Funções internas ---
+
+    def _criar(self):
+        """Abre um navegador numa vaga já reservada em _vivos (devolvida se a fábrica falhar)."""
+        try:
+            driver = self.fabrica()
+        except Exception:
+            with self._lock:
+                self._vivos -= 1
+            raise
+        with self._lock:
+            self._usos[id(driver)] = 0
+        return driver
+
+    def _obter_livre(self):
+        while True:
+            with self._lock:
+                try:
+                    return self._livres.get_nowait()
+                except queue.Empty:
+                    pass
+                if self._vivos < self.tamanho:
+                    self._vivos += 1
+                    break
+            # Todas as vagas vivas, nenhuma livre: o aquecimento está abrindo um navegador
+            try:
+                return self._livres.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return self._criar()
+
+    def _devolver(self, driver):
+        with self._lock:
+            self._usos[id(driver)] = self._usos.get(id(driver), 0) + 1
+            esgotado = self._usos[id(driver)] >= self.max_paginas
+
+        if self._fechado or esgotado or not self._resetar(driver):
+            self._descartar(driver)
+            return
+        self._livres.put(driver)
+
+    def _resetar(self, driver):
+        """Limpa cookies/armazenamento e volta para about:blank. Retorna False se o navegador caiu."""
+        try:
+            # Páginas de erro não têm localStorage; isso não indica navegador quebrado
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        except Exception:
+            pass
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+            return True
+        except Exception as e:
+            print(f"DEBUG: Navegador descartado do pool (falha ao resetar: {e})")
+            return False
+
+    def _descartar(self, driver):
+        with self._lock:
+            if self._usos.pop(id(driver), None) is not None:
+                self._vivos -= 1
+        try:
+            driver.quit()
+        except Exception:
+            pass
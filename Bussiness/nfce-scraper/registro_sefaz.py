@@ -0,0 +1,113 @@
+# registro_sefaz.py
+
+import re
+from typing import Callable, NamedTuple
+
+from scraper_http import extrair_dados_html, extrair_dados_html_svrs
+
+# --- Registro de Estados (SEFAZ) ---
+# Os dois primeiros dígitos da Chave de Acesso são o código IBGE da UF (cUF).
+# Cada UF registrada diz onde consultar a nota e qual parser entende a página,
+# então uma chave "pura" (sem URL) já pode ser raspada e notas de outros estados
+# não caem no caminho lento do Selenium, que só conhece o layout de GO.
+
+REGEX_CHAVE = re.compile(r'(?<!\d)(\d{44})(?!\d)')
+VERSAO_QR = 3  # QR Code v3 (consulta on-line): ?p=CHAVE|3|AMBIENTE
+AMBIENTE_PRODUCAO = 1
+
+
+class ChaveInvalida(ValueError):
+    """Chave de Acesso digitada com dígito verificador errado (nunca chega ao scraper)."""
+
+
+class EstadoSefaz(NamedTuple):
+    """
+    Como consultar as NFC-e de uma UF.
+
+    Args:
+        codigo: cUF (dois dígitos, ex: '52' para GO).
+        url_consulta: Endereço de consulta pública do QR Code.
+        extrator: Função(pagina_html) -> (dados_nota, lista_itens) do layout da UF.
+        usa_selenium: Se o layout é o que o Selenium sabe extrair (fallback do modo 'auto').
+    """
+    codigo: str
+    sigla: str
+    url_consulta: str
+    extrator: Callable
+    usa_selenium: bool = False
+
+    def montar_url(self, chave: str) -> str:
+        return f"{self.url_consulta}?p={chave}|{VERSAO_QR}|{AMBIENTE_PRODUCAO}"
+
+
+REGISTRO = {}  # cUF -> EstadoSefaz
+
+def registrar_estado(codigo: str, sigla: str, url_consulta: str, extrator: Callable,
+                     usa_selenium: bool = False) -> EstadoSefaz:
+    """Registra (ou substitui) a UF. Novos estados entram aqui, sem mexer no scraper."""
+    estado = EstadoSefaz(codigo, sigla, url_consulta, extrator, usa_selenium)
+    REGISTRO[codigo] = estado
+    return estado
+
+registrar_estado('52', 'GO', 'http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe',
+                 extrair_dados_html, usa_selenium=True)
+registrar_estado('43', 'RS', 'https://www.sefaz.rs.gov.br/NFCE/NFCE-COM.aspx', extrair_dados_html_svrs)
+registrar_estado('53', 'DF', 'http://www.fazenda.df.gov.br/nfce/qrcode', extrair_dados_html_svrs)
+
+
+def extrair_chave(texto: str) -> str | None:
+    """
+    Chave de Acesso de 44 dígitos contida no texto: a própria chave (com ou sem
+    espaços), o payload '?p=' de qualquer versão do QR Code ou o parâmetro 'chNFe='.
+    """
+    if not texto:
+        return None
+    texto = texto.strip()
+    if '?p=' in texto:
+        texto = texto.split('?p=')[-1].split('|')[0]
+    elif 'chNFe=' in texto:
+        texto = texto.split('chNFe=')[-1].split('&')[0]
+    elif '://' not in texto:
+        texto = re.sub(r'[\s.\-/]', '', texto)  # Chave digitada em blocos
+    encontrado = REGEX_CHAVE.search(texto)
+    return encontrado.group(1) if encontrado else None
+
+def chave_valida(chave: str) -> bool:
+    """Confere o dígito verificador (módulo 11, pesos 2 a 9) da Chave de Acesso."""
+    if not chave or len(chave) != 44 or not chave.isdigit():
+        return False
+    soma = sum(int(digito) * (2 + i % 8) for i, digito in enumerate(reversed(chave[:43])))
+    resto = soma % 11
+    return int(chave[43]) == (0 if resto < 2 else 11 - resto)
+
+def obter_estado(chave: str) -> EstadoSefaz | None:
+    """UF registrada da chave (busca direta no dict pelo cUF), ou None."""
+    return REGISTRO.get(chave[:2]) if chave else None
+
+def resolver(texto: str) -> tuple[str | None, str | None, EstadoSefaz | None]:
+    """
+    Interpreta a entrada do usuário (URL do QR Code ou chave pura).
+
+    Returns:
+        (chave, url, estado). Para uma chave pura de UF registrada a URL é
+        montada; URLs são mantidas como vieram. estado é None se a UF não está
+        registrada (ou se não há chave, como nas páginas salvas usadas nos testes).
+
+    Raises:
+        ChaveInvalida: Chave pura com dígito verificador errado (erro de digitação).
+    """
+    texto = (texto or '').strip()
+    chave = extrair_chave(texto)
+    estado = obter_estado(chave)
+    if '://' in texto:
+        return chave, texto, estado
+    if chave and not chave_valida(chave):
+        raise ChaveInvalida(f"Chave de acesso inválida (dígito verificador): {chave}")
+    if estado is not None:
+        return chave, estado.montar_url(chave), estado
+    return chave, None, estado
+
+def resolver_url(texto: str) -> str:
+    """URL a raspar para a entrada (a própria entrada se não for possível montar uma). Levanta ChaveInvalida."""
+    _, url, _ = resolver(texto)
+    return url or (texto or '').strip()
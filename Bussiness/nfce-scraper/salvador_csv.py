@@ -1,13 +1,15 @@
-import pandas as pd
 import os
+from datetime import datetime
+
+from banco_nfce import obter_banco
 
 COLUNAS_ITENS = [
-    'data_venda', 'hora_venda', 'forma_pagamento', 
-    'produto', 'quantidade', 'preco_unitario', 'total_item', 
+    'data_venda', 'hora_venda', 'forma_pagamento',
+    'produto', 'quantidade', 'preco_unitario', 'total_item',
     'valor_total_nota', 'hash_qr'
 ]
 COLUNAS_NOTAS = [
-    'data_venda', 'hora_venda', 'forma_pagamento', 
+    'data_venda', 'hora_venda', 'forma_pagamento',
     'valor_total', 'hash_qr'
 ]
 
@@ -19,38 +21,100 @@ def garantir_diretorio():
     """Cria a pasta 'data' se ela não existir."""
     os.makedirs(PASTA_DADOS, exist_ok=True)
 
+def separar_data_hora(data_hora_nfce):
+    """Converte 'DD/MM/AAAA HH:MM:SS' (datEmi da SEFAZ) em ('AAAA-MM-DD', 'HH:MM:SS')."""
+    partes = (data_hora_nfce or '').split()
+    for texto, formato in ((' '.join(partes[:2]), '%d/%m/%Y %H:%M:%S'),
+                           (' '.join(partes[:2]), '%d/%m/%Y %H:%M'),
+                           (' '.join(partes[:1]), '%d/%m/%Y')):
+        try:
+            momento = datetime.strptime(texto, formato)
+            return momento.strftime('%Y-%m-%d'), momento.strftime('%H:%M:%S')
+        except ValueError:
+            continue
+    return None, None
+
+def montar_registros(dados_nota, lista_itens, hash_qr):
+    """Converte a saída do scraper nas linhas das tabelas notas/itens (colunas do CSV)."""
+    data_venda, hora_venda = separar_data_hora(dados_nota.get('data_hora_nfce'))
+    nota = {
+        'hash_qr': hash_qr,
+        'data_venda': data_venda,
+        'hora_venda': hora_venda,
+        'forma_pagamento': dados_nota.get('forma_pagamento'),
+        'valor_total': dados_nota.get('valor_total'),
+        'data_extracao': dados_nota.get('data_extracao'),
+    }
+    itens = [
+        {
+            'produto': item.get('descricao_produto', item.get('produto')),
+            'quantidade': item.get('quantidade'),
+            'unidade': item.get('unidade'),
+            'preco_unitario': item.get('preco_unitario'),
+            'total_item': item.get('total_item'),
+        }
+        for item in lista_itens
+    ]
+    return nota, itens
+
 def salvar_dados_em_csv(dados_nota, lista_itens, hash_qr):
     """
-    Salva os dados de uma única NFC-e nos arquivos CSV de notas e itens.
-    
+    Salva os dados de uma única NFC-e no banco local (data/nfce.sqlite).
+
+    O nome foi mantido por compatibilidade: os CSVs de notas e itens agora são
+    gerados sob demanda por exportar_csv().
+
     Args:
         dados_nota (dict): Dicionário com dados gerais da nota.
         lista_itens (list): Lista de dicionários com dados dos produtos.
         hash_qr (str): Hash único da nota.
+
+    Returns:
+        True se a nota foi gravada, False se já existia (ou se não havia dados).
     """
-    garantir_diretorio()
-    
-    if dados_nota:
-        dados_nota['hash_qr'] = hash_qr
-        
-    if lista_itens:
-        for item in lista_itens:
-            item['hash_qr'] = hash_qr
-            
-        df_itens = pd.DataFrame(lista_itens, columns=COLUNAS_ITENS)
-        salvar_anexando(df_itens, ARQUIVO_ITENS)
-
-    if dados_nota:
-        df_notas = pd.DataFrame([dados_nota], columns=COLUNAS_NOTAS)
-        salvar_anexando(df_notas, ARQUIVO_NOTAS)
-
-def salvar_anexando(df, nome_arquivo):
-    """Anexa um DataFrame a um arquivo CSV existente ou cria um novo."""
+    if not dados_nota or not lista_itens:
+        return False
+
+    dados_nota['hash_qr'] = hash_qr
+    for item in lista_itens:
+        item['hash_qr'] = hash_qr
+
+    nota, itens = montar_registros(dados_nota, lista_itens, hash_qr)
     try:
-        incluir_header = not os.path.exists(nome_arquivo)
-        
-        df.to_csv(nome_arquivo, mode='a', header=incluir_header, index=False, sep=';', encoding='utf-8')
-        print(f"Dados salvos com sucesso em: {nome_arquivo}")
-        
+        inserida = obter_banco().salvar_nota(nota, itens)
     except Exception as e:
-        print(f"Erro ao salvar dados no CSV {nome_arquivo}: {e}")
\ No newline at end of file
+        print(f"Erro ao salvar a nota {hash_qr} no banco: {e}")
+        return False
+
+    if inserida:
+        print(f"Nota {hash_qr} salva com {len(itens)} itens.")
+    else:
+        print(f"Nota {hash_qr} já estava salva; nada foi duplicado.")
+    return inserida
+
+def exportar_csv(arquivo_itens=ARQUIVO_ITENS, arquivo_notas=ARQUIVO_NOTAS, **filtros):
+    """
+    Regenera os CSVs de itens e notas a partir do banco.
+
+    Args:
+        **filtros: data_inicio/data_fim (AAAA-MM-DD) repassados às consultas.
+
+    Returns:
+        (caminho_itens, caminho_notas)
+    """
+    garantir_diretorio()
+    banco = obter_banco()
+
+    df_itens = banco.ler_itens(**filtros).reindex(columns=COLUNAS_ITENS)
+    df_notas = banco.ler_notas(**filtros).reindex(columns=COLUNAS_NOTAS)
+
+    salvar_substituindo(df_itens, arquivo_itens)
+    salvar_substituindo(df_notas, arquivo_notas)
+    return arquivo_itens, arquivo_notas
+
+def salvar_substituindo(df, nome_arquivo):
+    """Grava o DataFrame em um arquivo temporário e o troca pelo CSV de forma atômica."""
+    temporario = nome_arquivo + '.tmp'
+    df.to_csv(temporario, index=False, sep=';', encoding='utf-8')
+    os.replace(temporario, nome_arquivo)
+    print(f"Dados exportados com sucesso em: {nome_arquivo}")
@@ -0,0 +1,199 @@
+# scraper_http.py
+
+import re
+import threading
+from datetime import datetime
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from lxml import etree, html as lxml_html
+from metricas_scraper import obter_metricas
+
+# --- Configuração do Cliente HTTP ---
+# A página DANFE da SEFAZ é HTML renderizado no servidor: um GET simples traz
+# os mesmos elementos que o Selenium espera (txtValorTotal, datEmi, tabProdutos).
+
+TIMEOUT_HTTP = (5, 15)  # (conexão, leitura) em segundos
+CONEXOES_POR_HOST = 10
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+_local = threading.local()
+
+def obter_sessao() -> requests.Session:
+    """
+    Retorna a sessão HTTP da thread atual (keep-alive + pool de conexões).
+    Uma sessão por thread evita compartilhar estado do requests entre threads.
+    """
+    sessao = getattr(_local, 'sessao', None)
+    if sessao is None:
+        sessao = requests.Session()
+        retry = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=('GET',))
+        adaptador = HTTPAdapter(pool_connections=CONEXOES_POR_HOST, pool_maxsize=CONEXOES_POR_HOST, max_retries=retry)
+        sessao.mount('http://', adaptador)
+        sessao.mount('https://', adaptador)
+        sessao.headers.update({'User-Agent': USER_AGENT})
+        _local.sessao = sessao
+    return sessao
+
+def baixar_pagina(url_nfce: str) -> str:
+    """Baixa o HTML da NFC-e. Levanta requests.RequestException em erro de rede/HTTP."""
+    resposta = obter_sessao().get(url_nfce, timeout=TIMEOUT_HTTP)
+    resposta.raise_for_status()
+    if 'charset' not in resposta.headers.get('Content-Type', '').lower():
+        # Sem charset no cabeçalho o requests assume ISO-8859-1 e estraga os
+        # rótulos acentuados ("Emissão:") de que alguns parsers dependem
+        try:
+            return resposta.content.decode('utf-8')
+        except UnicodeDecodeError:
+            pass
+    return resposta.text
+
+# --- Funções de Limpeza de Dados ---
+
+def limpar_valor(texto):
+    """Extrai e limpa valores numéricos de R$ X.XX."""
+    if not texto:
+        return 0.0
+    # Remove qualquer coisa que não seja dígito, vírgula ou ponto
+    valor_limpo = re.sub(r'[^\d,\.]', '', texto)
+    # Substitui vírgula por ponto para conversão float (padrão brasileiro -> americano)
+    valor_limpo = valor_limpo.replace('.', '').replace(',', '.')
+    try:
+        return float(valor_limpo)
+    except ValueError:
+        return 0.0
+
+# --- Parse do HTML (mesmos seletores do Selenium) ---
+
+def _texto(elemento) -> str:
+    return ' '.join(elemento.text_content().split())
+
+def extrair_itens_html(documento) -> list:
+    """Extrai os itens de 'tabProdutos' de um documento (ou fragmento) lxml já parseado."""
+    tabelas = documento.xpath('//*[@id="tabProdutos"]')
+    if not tabelas:
+        return []
+
+    lista_itens = []
+    # Ignora a linha de cabeçalho, como no Selenium
+    for linha in tabelas[0].xpath('.//tr')[1:]:
+        colunas = linha.xpath('./td')
+        if len(colunas) < 5:
+            continue  # Pula linhas inválidas
+        lista_itens.append({
+            'descricao_produto': _texto(colunas[0]),
+            'quantidade': limpar_valor(_texto(colunas[1])),
+            'unidade': _texto(colunas[2]),
+            'preco_unitario': limpar_valor(_texto(colunas[3])),
+            'total_item': limpar_valor(_texto(colunas[4]))
+        })
+    return lista_itens
+
+def extrair_dados_html(pagina_html: str) -> tuple[dict, list] | tuple[None, None]:
+    """
+    Faz o parse do HTML da DANFE NFC-e.
+
+    Returns:
+        (dados_nota, lista_itens), ou (None, None) se a página não tiver a
+        estrutura esperada (ex: página de erro, captcha ou layout de outro estado).
+    """
+    if not pagina_html:
+        return None, None
+
+    try:
+        documento = lxml_html.fromstring(pagina_html)
+    except (etree.ParserError, ValueError):
+        return None, None
+
+    valor_total = documento.xpath('//*[contains(concat(" ", normalize-space(@class), " "), " txtValorTotal ")]')
+    data_emissao = documento.xpath('//*[@id="datEmi"]')
+    if not valor_total or not data_emissao:
+        return None, None
+
+    lista_itens = extrair_itens_html(documento)
+    if not lista_itens:
+        return None, None
+
+    dados_nota = {
+        'valor_total': limpar_valor(_texto(valor_total[0])),
+        'data_hora_nfce': _texto(data_emissao[0]),
+        'data_extracao': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    return dados_nota, lista_itens
+
+# --- Parse do layout padrão do portal NFC-e (SVRS e estados que o reutilizam) ---
+# Itens em 'tabResult' com os campos em spans (txtTit, Rqtd, RUN, RvlUnit, valor),
+# total em '.txtMax' e a data de emissão dentro do texto de '#infos'.
+
+_REGEX_EMISSAO = re.compile(r'Emiss[ãa]o:\s*(\d{2}/\d{2}/\d{4}\s+\d{2}:\d{2}(?::\d{2})?)')
+
+def _campo(linha, classe) -> str:
+    encontrados = linha.xpath(f'.//*[contains(concat(" ", normalize-space(@class), " "), " {classe} ")]')
+    return _texto(encontrados[0]) if encontrados else ''
+
+def _depois_dos_dois_pontos(texto: str) -> str:
+    return texto.split(':', 1)[-1].strip()
+
+def extrair_dados_html_svrs(pagina_html: str) -> tuple[dict, list] | tuple[None, None]:
+    """Como extrair_dados_html, para o layout padrão do portal NFC-e ('tabResult')."""
+    if not pagina_html:
+        return None, None
+
+    try:
+        documento = lxml_html.fromstring(pagina_html)
+    except (etree.ParserError, ValueError):
+        return None, None
+
+    lista_itens = []
+    for linha in documento.xpath('//*[@id="tabResult"]//tr[starts-with(@id, "Item")]'):
+        lista_itens.append({
+            'descricao_produto': _campo(linha, 'txtTit'),
+            'quantidade': limpar_valor(_depois_dos_dois_pontos(_campo(linha, 'Rqtd'))),
+            'unidade': _depois_dos_dois_pontos(_campo(linha, 'RUN')),
+            'preco_unitario': limpar_valor(_depois_dos_dois_pontos(_campo(linha, 'RvlUnit'))),
+            'total_item': limpar_valor(_campo(linha, 'valor'))
+        })
+
+    valor_total = documento.xpath('//*[contains(concat(" ", normalize-space(@class), " "), " txtMax ")]')
+    infos = documento.xpath('//*[@id="infos"]')
+    emissao = _REGEX_EMISSAO.search(_texto(infos[0])) if infos else None
+    if not lista_itens or not valor_total or not emissao:
+        return None, None
+
+    dados_nota = {
+        'valor_total': limpar_valor(_texto(valor_total[0])),
+        'data_hora_nfce': ' '.join(emissao.group(1).split()),
+        'data_extracao': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    return dados_nota, lista_itens
+
+def raspar_dados_nfce_http(url_nfce: str) -> tuple[dict, list] | tuple[None, None]:
+    """Raspa a NFC-e via HTTP puro (sem navegador). Retorna (None, None) em qualquer falha."""
+    dados_nota, lista_itens, _ = raspar_nfce_http(url_nfce)
+    return dados_nota, lista_itens
+
+def raspar_nfce_http(url_nfce: str, extrator=extrair_dados_html) -> tuple[dict, list, str] | tuple[None, None, None]:
+    """
+    Igual a raspar_dados_nfce_http, mas também retorna o HTML baixado.
+
+    Args:
+        extrator: Parser do layout da SEFAZ do estado (ver registro_sefaz).
+    """
+    metricas = obter_metricas()
+    try:
+        with metricas.fase('http_download'):
+            pagina_html = baixar_pagina(url_nfce)
+    except requests.RequestException as e:
+        print(f"DEBUG: Falha HTTP ao baixar a NFC-e: {e}")
+        metricas.incrementar('falha_http')
+        return None, None, None
+
+    with metricas.fase('http_parse'):
+        dados_nota, lista_itens = extrator(pagina_html)
+    if dados_nota is None:
+        print(f"DEBUG: HTML da NFC-e não tem a estrutura esperada pelo parser '{extrator.__name__}'.")
+        metricas.incrementar('falha_parse_http')
+        return None, None, None
+
+    print(f"SUCESSO (HTTP): {len(lista_itens)} itens extraídos sem navegador.")
+    return dados_nota, lista_itens, pagina_html
@@ -1,7 +1,9 @@
 # scraper_nfce.py
 
 import time
-import re
+import atexit
+import threading
+from functools import lru_cache
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -10,12 +12,83 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime
+from pool_drivers import PoolDrivers
+from lxml import html as lxml_html
+from scraper_http import limpar_valor, extrair_itens_html, extrair_dados_html, raspar_nfce_http
+from registro_sefaz import resolver, ChaveInvalida
+from cache_nfce import obter_cache
+from metricas_scraper import obter_metricas
+
+# --- Modo de Raspagem ---
+# 'auto': tenta HTTP puro e só abre o navegador se o parse do HTML falhar
+# 'http': apenas HTTP | 'selenium': apenas navegador (comportamento original)
+MODO_RASPAGEM = 'auto'
+
+# Extrai tudo o que a raspagem precisa em um único round trip do WebDriver (ver extrair_com_driver)
+SCRIPT_EXTRACAO = """
+const total = document.querySelector('.txtValorTotal');
+const emissao = document.getElementById('datEmi');
+const tabela = document.getElementById('tabProdutos');
+return {
+    valor_total: total ? total.innerText : '',
+    data_hora: emissao ? emissao.innerText.trim() : '',
+    tabela: tabela ? tabela.outerHTML : null
+};
+"""
+
+# --- Perfis do Navegador ---
+# 'padrao': carrega a página completa (comportamento original)
+# 'leve': page load 'eager' (não espera imagens/CSS), bloqueia imagens, fontes e
+#         folhas de estilo, sem extensões/GPU e com polling mais curto na espera.
+#         Só o DOM importa para a raspagem.
+PERFIL_NAVEGADOR = 'leve'
+
+PERFIS_NAVEGADOR = {
+    'padrao': {
+        'page_load_strategy': 'normal',
+        'bloquear_recursos': False,
+        'argumentos_extras': [],
+        'intervalo_espera': 0.5,  # Padrão do WebDriverWait
+    },
+    'leve': {
+        'page_load_strategy': 'eager',
+        'bloquear_recursos': True,
+        'argumentos_extras': ["--disable-extensions", "--disable-gpu", "--blink-settings=imagesEnabled=false"],
+        'intervalo_espera': 0.1,
+    },
+}
+
+# Bloqueados via CDP (Network.setBlockedURLs); imagens também pelas preferências do Chrome
+RECURSOS_BLOQUEADOS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.css",
+]
+
+# --- Configuração do Pool de Navegadores ---
+TAMANHO_POOL = 2             # Navegadores headless mantidos vivos
+MAX_PAGINAS_POR_DRIVER = 50  # Reciclagem periódica do Chrome
+
+_pool = None
+_pool_lock = threading.Lock()
 
 # --- Configuração do Selenium ---
 
-def iniciar_driver():
+@lru_cache(maxsize=1)
+def resolver_caminho_driver():
+    """Resolve (baixa, se preciso) o binário do ChromeDriver uma única vez por processo."""
+    return ChromeDriverManager().install()
+
+def obter_perfil(perfil: str = None) -> dict:
+    """Retorna as opções do perfil (padrão: PERFIL_NAVEGADOR)."""
+    perfil = perfil or PERFIL_NAVEGADOR
+    if perfil not in PERFIS_NAVEGADOR:
+        raise ValueError(f"Perfil de navegador desconhecido: '{perfil}'. Use um de {list(PERFIS_NAVEGADOR)}.")
+    return PERFIS_NAVEGADOR[perfil]
+
+def iniciar_driver(perfil: str = None):
     """Configura e inicia o WebDriver com opções headless."""
-    print("Iniciando WebDriver em modo Headless...")
+    config = obter_perfil(perfil)
+    print(f"Iniciando WebDriver em modo Headless (perfil '{perfil or PERFIL_NAVEGADOR}')...")
     
     # 1. Configurações Headless para rodar sem interface gráfica
     chrome_options = Options()
@@ -27,104 +100,187 @@ def iniciar_driver():
     chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36")
     chrome_options.add_experimental_option("excludeSwitches", ["enable-logging"]) # Evita logs excessivos
 
-    # 2. Instala/Usa o driver correto
-    service = Service(ChromeDriverManager().install())
-    driver = webdriver.Chrome(service=service, options=chrome_options)
+    # 2. Opções do perfil (ver PERFIS_NAVEGADOR)
+    chrome_options.page_load_strategy = config['page_load_strategy']
+    for argumento in config['argumentos_extras']:
+        chrome_options.add_argument(argumento)
+    if config['bloquear_recursos']:
+        # 2 = bloquear
+        chrome_options.add_experimental_option("prefs", {
+            "profile.managed_default_content_settings.images": 2,
+            "profile.managed_default_content_settings.fonts": 2,
+        })
+
+    # 3. Usa o driver resolvido na inicialização do processo
+    service = Service(resolver_caminho_driver())
+    with obter_metricas().fase('inicio_driver'):
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+
+    if config['bloquear_recursos']:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": RECURSOS_BLOQUEADOS})
+        except Exception as e:
+            print(f"DEBUG: Bloqueio de recursos via CDP indisponível: {e}")
     
     return driver
 
-# --- Funções de Limpeza de Dados ---
-
-def limpar_valor(texto):
-    """Extrai e limpa valores numéricos de R$ X.XX."""
-    if not texto:
-        return 0.0
-    # Remove qualquer coisa que não seja dígito, vírgula ou ponto
-    valor_limpo = re.sub(r'[^\d,\.]', '', texto)
-    # Substitui vírgula por ponto para conversão float (padrão brasileiro -> americano)
-    valor_limpo = valor_limpo.replace('.', '').replace(',', '.')
-    try:
-        return float(valor_limpo)
-    except ValueError:
-        return 0.0
+def obter_pool():
+    """Retorna o pool de navegadores do processo, criando-o (e aquecendo-o) na primeira chamada."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            resolver_caminho_driver()
+            _pool = PoolDrivers(iniciar_driver, tamanho=TAMANHO_POOL, max_paginas=MAX_PAGINAS_POR_DRIVER)
+            _pool.aquecer(1)
+            atexit.register(_pool.encerrar)
+        return _pool
 
 # --- Função Principal de Raspagem de Dados ---
 
-def raspar_dados_nfce(url_nfce: str) -> tuple[dict, list]:
+def raspar_dados_nfce(url_nfce: str, modo: str = None) -> tuple[dict, list]:
     """
-    Navega até a URL da NFC-e e raspa dados do cabeçalho e da lista de itens.
+    Raspa dados do cabeçalho e da lista de itens da NFC-e.
     
     Args:
         url_nfce: URL completa da NFC-e (do QR Code).
+        modo: 'auto', 'http' ou 'selenium' (padrão: MODO_RASPAGEM).
         
     Returns:
         Um tuple contendo: (dados_nota_dict, lista_itens).
     """
-    driver = None
+    dados_nota, lista_itens, _ = raspar_nfce(url_nfce, modo)
+    return dados_nota, lista_itens
+
+def raspar_dados_nfce_com_cache(url_nfce: str, hash_qr: str, modo: str = None) -> tuple[dict, list, bool]:
+    """
+    Consulta o cache pela Chave de Acesso antes de raspar; a SEFAZ só é acessada
+    na primeira vez que a nota aparece. Retorna (dados_nota, lista_itens, veio_do_cache).
+    """
+    dados_nota, lista_itens, veio_do_cache = obter_cache().obter_ou_raspar(hash_qr, lambda: raspar_nfce(url_nfce, modo))
+    obter_metricas().incrementar('cache_hit' if veio_do_cache else 'cache_miss')
+    return dados_nota, lista_itens, veio_do_cache
+
+def raspar_nfce(url_nfce: str, modo: str = None) -> tuple[dict, list, str]:
+    """
+    Igual a raspar_dados_nfce, mas também retorna o HTML bruto da página (para o cache).
+
+    Aceita também a Chave de Acesso pura: a UF (registro_sefaz) define a URL e o
+    parser. Notas de UF não registrada falham na hora, sem abrir o navegador.
+    """
+    modo = modo or MODO_RASPAGEM
+    metricas = obter_metricas()
+    try:
+        chave, url_resolvida, estado = resolver(url_nfce)
+    except ChaveInvalida as e:
+        print(f"DEBUG: {e}; nota ignorada.")
+        metricas.incrementar('chave_invalida')
+        return None, None, None
+    url_nfce = url_resolvida or url_nfce
+
+    with metricas.raspagem(url_nfce, modo) as registro:
+        if chave and estado is None:
+            print(f"DEBUG: UF {chave[:2]} não registrada em registro_sefaz; nota ignorada.")
+            metricas.incrementar('estado_nao_suportado')
+            return None, None, None
+
+        # Só o layout de GO é conhecido pelo Selenium; as demais UFs usam apenas HTTP
+        usa_selenium = estado is None or estado.usa_selenium
+        if modo in ('auto', 'http') or not usa_selenium:
+            extrator = estado.extrator if estado else extrair_dados_html
+            dados_nota, lista_itens, pagina_html = raspar_nfce_http(url_nfce, extrator)
+            if dados_nota or modo == 'http' or not usa_selenium:
+                registro['sucesso'] = dados_nota is not None
+                return dados_nota, lista_itens, pagina_html
+            print("DEBUG: Parse HTTP falhou, usando o navegador (Selenium)...")
+            metricas.incrementar('fallback_selenium')
+
+        dados_nota, lista_itens, pagina_html = raspar_nfce_selenium(url_nfce)
+        registro['sucesso'] = dados_nota is not None
+        return dados_nota, lista_itens, pagina_html
+
+def raspar_dados_nfce_selenium(url_nfce: str) -> tuple[dict, list]:
+    """
+    Navega até a URL da NFC-e com o Selenium e raspa os dados.
+    O navegador é emprestado do pool do processo (não é aberto/fechado a cada nota).
+    """
+    dados_nota, lista_itens, _ = raspar_nfce_selenium(url_nfce)
+    return dados_nota, lista_itens
+
+def raspar_nfce_selenium(url_nfce: str) -> tuple[dict, list, str]:
+    """Raspagem via Selenium retornando também o HTML renderizado."""
+    metricas = obter_metricas()
+    try:
+        with metricas.raspagem(url_nfce, 'selenium') as registro:
+            inicio = time.perf_counter()
+            with obter_pool().driver() as driver:
+                # Espera por um navegador livre (inclui a abertura do Chrome se o pool estiver frio)
+                metricas.registrar_fase('obter_driver', time.perf_counter() - inicio)
+                dados_nota, lista_itens = raspar_com_driver(driver, url_nfce)
+                with metricas.fase('page_source'):
+                    pagina_html = driver.page_source if dados_nota else None
+                registro['sucesso'] = dados_nota is not None
+                return dados_nota, lista_itens, pagina_html
+    except Exception as e:
+        print(f"ERRO DE SCRAPING GERAL (pool de navegadores): {e}")
+        metricas.incrementar('falha_pool')
+        return None, None, None
+
+def extrair_com_driver(driver) -> tuple[dict, list]:
+    """
+    Extrai cabeçalho e itens da página já carregada com um único execute_script.
+    A tabela 'tabProdutos' volta como outerHTML e as linhas são lidas localmente
+    com lxml (antes: um RPC do WebDriver para cada linha e para cada célula).
+    """
+    extraido = driver.execute_script(SCRIPT_EXTRACAO)
+    if not extraido['tabela']:
+        raise ValueError("Tabela de itens 'tabProdutos' não encontrada na página.")
+
+    dados_nota = {
+        'valor_total': limpar_valor(extraido['valor_total']),
+        'data_hora_nfce': extraido['data_hora']  # Formatação será feita no salvador_csv
+    }
+    lista_itens = extrair_itens_html(lxml_html.fromstring(extraido['tabela']))
+    return dados_nota, lista_itens
+
+def raspar_com_driver(driver, url_nfce: str, perfil: str = None) -> tuple[dict, list]:
+    """Raspa a NFC-e usando um WebDriver já aberto (não o fecha ao final)."""
     dados_nota = {}
     lista_itens = []
     
     # Define um tempo máximo de espera
     MAX_WAIT = 15 
 
+    metricas = obter_metricas()
+
     try:
-        driver = iniciar_driver()
         print(f"DEBUG: Navegando para: {url_nfce}")
-        driver.get(url_nfce)
+        with metricas.fase('navegacao'):
+            driver.get(url_nfce)
         
         # 1. Espera Condicional: Espera até que o elemento do Valor Total esteja visível
         # Se este seletor estiver errado, a raspagem falhará aqui.
         try:
-            WebDriverWait(driver, MAX_WAIT).until(
-                EC.visibility_of_element_located((By.CLASS_NAME, "txtValorTotal")) 
-            )
+            with metricas.fase('espera_elemento'):
+                WebDriverWait(driver, MAX_WAIT, poll_frequency=obter_perfil(perfil)['intervalo_espera']).until(
+                    EC.visibility_of_element_located((By.CLASS_NAME, "txtValorTotal")) 
+                )
             print("DEBUG: Página da NFC-e carregada com sucesso.")
         except Exception:
             print("ERRO CRÍTICO: Não foi possível carregar o elemento chave (txtValorTotal) dentro do tempo.")
+            metricas.incrementar('timeout_espera')
             # Salva screenshot para debug
             driver.save_screenshot("erro_carregamento.png")
             return None, None
             
-        # 2. Extração dos Dados do Cabeçalho (NOTA)
+        # 2. Extração do Cabeçalho (NOTA) e da Lista de Itens
         
-        # ATENÇÃO: VERIFIQUE E ADAPTE ESTES SELETORES PARA O SITE DA SEFAZ DO SEU ESTADO
+        # ATENÇÃO: VERIFIQUE E ADAPTE OS SELETORES DE SCRIPT_EXTRACAO PARA O SITE DA SEFAZ DO SEU ESTADO
         
-        # Exemplo de extração de Valor Total e Data/Hora:
-        valor_total_text = driver.find_element(By.CLASS_NAME, "txtValorTotal").text
-        data_hora_text = driver.find_element(By.ID, "datEmi").text
-        
-        dados_nota['valor_total'] = limpar_valor(valor_total_text)
-        dados_nota['data_hora_nfce'] = data_hora_text # Formatação será feita no salvador_csv
-        
-        # 3. Extração da Lista de Itens
-        
-        # ATENÇÃO: O SELETOR DA TABELA DE ITENS É CRUCIAL AQUI
-        
-        # Este seletor assume que a tabela de itens tem o ID 'tabProdutos'
-        tabela_itens = driver.find_element(By.ID, "tabProdutos") 
-        
-        # Encontra todas as linhas da tabela (exceto o cabeçalho)
-        linhas_itens = tabela_itens.find_elements(By.TAG_NAME, "tr")[1:] 
+        with metricas.fase('extracao'):
+            dados_nota, lista_itens = extrair_com_driver(driver)
 
-        print(f"DEBUG: Encontradas {len(linhas_itens)} linhas de itens.")
-        
-        for linha in linhas_itens:
-            # Seletores comuns para as colunas de um item:
-            colunas = linha.find_elements(By.TAG_NAME, "td")
-            
-            if len(colunas) < 4:
-                continue # Pula linhas inválidas
-            
-            # ATENÇÃO: OS ÍNDICES DE COLUNA DEVEM SER VERIFICADOS NO SEU SITE
-            
-            item = {
-                'descricao_produto': colunas[0].text.strip(),
-                'quantidade': limpar_valor(colunas[1].text),
-                'unidade': colunas[2].text.strip(),
-                'preco_unitario': limpar_valor(colunas[3].text),
-                'total_item': limpar_valor(colunas[4].text)
-            }
-            lista_itens.append(item)
+        print(f"DEBUG: Encontradas {len(lista_itens)} linhas de itens.")
             
         print(f"SUCESSO: Raspagem concluída. {len(lista_itens)} itens extraídos.")
 
@@ -135,16 +291,14 @@ def raspar_dados_nfce(url_nfce: str) -> tuple[dict, list]:
 
     except Exception as e:
         print(f"ERRO DE SCRAPING GERAL: {e}")
+        metricas.incrementar('falha_extracao')
         # Salva screenshot para debug
-        if driver:
-             driver.save_screenshot("erro_scraper_final.png")
-             print("Screenshot 'erro_scraper_final.png' salvo.")
+        try:
+            driver.save_screenshot("erro_scraper_final.png")
+            print("Screenshot 'erro_scraper_final.png' salvo.")
+        except Exception:
+            pass  # Navegador caiu; o pool o descarta na devolução
         return None, None
-        
-    finally:
-        # Garante que o navegador seja fechado
-        if driver:
-            driver.quit()
 
 # --- Exemplo de Teste ---
 if __name__ == '__main__':
@@ -0,0 +1,123 @@
+"""
+Benchmark: extração da tabela 'tabProdutos' célula a célula (um RPC do WebDriver
+por <td>) x extração em uma única chamada (execute_script + parse local com lxml).
+
+Gera uma NFC-e de exemplo com N itens, serve localmente e mede as duas abordagens
+no mesmo navegador headless. Requer Chrome instalado.
+
+Uso (a partir de Bussiness/nfce-scraper):
+    python scripts/benchmark_extracao_tabela.py --itens 60 --repeticoes 10
+"""
+
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+import threading
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from selenium.webdriver.common.by import By
+from scraper_http import limpar_valor
+from scraper_nfce import iniciar_driver, extrair_com_driver
+
+LINHA_ITEM = """
+      <tr id="Item + {n}">
+        <td><span class="txtTit">PRODUTO DE TESTE {n}</span></td>
+        <td><span class="Rqtd">{qtd},0000</span></td>
+        <td><span class="RUN">UN</span></td>
+        <td><span class="RvlUnit">{unit},90</span></td>
+        <td class="txtTit noWrap"><span class="valor">{total},90</span></td>
+      </tr>"""
+
+PAGINA = """<!DOCTYPE html>
+<html lang="pt-br"><head><meta charset="utf-8"><title>NFC-e</title></head>
+<body>
+  <table id="tabProdutos">
+    <tr><th>Descrição</th><th>Qtde.</th><th>UN</th><th>Vl. Unit.</th><th>Vl. Total</th></tr>{linhas}
+  </table>
+  <span class="totalNumb txtMax txtValorTotal">1.234,56</span>
+  <span id="datEmi">05/03/2025 18:42:10</span>
+</body></html>
+"""
+
+
+class _HandlerSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def gerar_pagina(pasta, quantidade_itens):
+    linhas = ''.join(LINHA_ITEM.format(n=n, qtd=1 + n % 3, unit=n, total=n * (1 + n % 3))
+                     for n in range(1, quantidade_itens + 1))
+    caminho = Path(pasta) / 'nfce_benchmark.html'
+    caminho.write_text(PAGINA.format(linhas=linhas), encoding='utf-8')
+    return caminho.name
+
+
+def extrair_por_celula(driver):
+    """Extração original: find_elements + .text em cada célula (um RPC por chamada)."""
+    dados_nota = {
+        'valor_total': limpar_valor(driver.find_element(By.CLASS_NAME, "txtValorTotal").text),
+        'data_hora_nfce': driver.find_element(By.ID, "datEmi").text.strip()
+    }
+    lista_itens = []
+    for linha in driver.find_element(By.ID, "tabProdutos").find_elements(By.TAG_NAME, "tr")[1:]:
+        colunas = linha.find_elements(By.TAG_NAME, "td")
+        if len(colunas) < 5:
+            continue
+        lista_itens.append({
+            'descricao_produto': colunas[0].text.strip(),
+            'quantidade': limpar_valor(colunas[1].text),
+            'unidade': colunas[2].text.strip(),
+            'preco_unitario': limpar_valor(colunas[3].text),
+            'total_item': limpar_valor(colunas[4].text)
+        })
+    return dados_nota, lista_itens
+
+
+def medir(funcao, repeticoes):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara extração célula a célula x chamada única.")
+    parser.add_argument('--itens', type=int, default=60)
+    parser.add_argument('--repeticoes', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as pasta:
+        nome = gerar_pagina(pasta, args.itens)
+        servidor = HTTPServer(("127.0.0.1", 0), partial(_HandlerSilencioso, directory=pasta))
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{servidor.server_address[1]}/{nome}"
+
+        driver = iniciar_driver()
+        try:
+            driver.get(url)
+            t_celula, (_, itens_celula) = medir(lambda: extrair_por_celula(driver), args.repeticoes)
+            t_unica, (_, itens_unica) = medir(lambda: extrair_com_driver(driver), args.repeticoes)
+        finally:
+            driver.quit()
+            servidor.shutdown()
+            servidor.server_close()
+
+    assert itens_celula == itens_unica, "As duas abordagens devem extrair os mesmos itens"
+
+    print(f"\n=== {args.itens} itens, mediana de {args.repeticoes} execuções ===")
+    print(f"Célula a célula : {t_celula * 1000:8.1f} ms  (~{4 + args.itens * 6} RPCs)")
+    print(f"Chamada única   : {t_unica * 1000:8.1f} ms  (1 RPC + parse local)")
+    print(f"Ganho           : {t_celula / t_unica:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
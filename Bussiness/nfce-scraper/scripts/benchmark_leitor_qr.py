@@ -0,0 +1,86 @@
+"""
+Benchmark: leitura do QR Code em resolução total (RGB + pyzbar na imagem inteira)
+x leitura em múltiplas escalas de leitor_qr.extrair_url_qr_code.
+
+Gera fotos sintéticas (JPEG) de tamanhos típicos de celular, com o QR da NFC-e
+ocupando uma fração da cena, e mede a mediana de cada abordagem.
+
+Uso (a partir de Bussiness/nfce-scraper):
+    python scripts/benchmark_leitor_qr.py --repeticoes 5
+"""
+
+import sys
+import time
+import argparse
+import statistics
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import qrcode
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from pyzbar.pyzbar import decode as pyzbar_decode
+from leitor_qr import extrair_url_qr_code
+
+URL_EXEMPLO = "http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p=52250339346861034147651070004999491107141815|2|1|1|DF46C0CAD32EF01BE6B47848D0D7BD145878E215"
+
+# (largura, altura) e fração do menor lado ocupada pelo QR
+CENARIOS = {
+    '1 MP': ((1280, 960), 0.35),
+    '4 MP': ((2304, 1728), 0.25),
+    '12 MP': ((4032, 3024), 0.20),
+    '12 MP (QR pequeno)': ((4032, 3024), 0.06),
+}
+
+
+def gerar_foto(tamanho, fracao_qr, semente=0):
+    """Fundo com ruído (simula papel/mesa) e o QR colado fora do centro, salvo como JPEG."""
+    rng = np.random.default_rng(semente)
+    largura, altura = tamanho
+    fundo = rng.normal(200, 25, size=(altura, largura)).clip(0, 255).astype(np.uint8)
+    foto = Image.fromarray(fundo).convert('RGB')
+
+    lado = int(min(tamanho) * fracao_qr)
+    qr = qrcode.make(URL_EXEMPLO, border=2).convert('RGB').resize((lado, lado), Image.NEAREST)
+    foto.paste(qr, (int(largura * 0.55), int(altura * 0.3)))
+
+    buffer = BytesIO()
+    foto.save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def leitura_original(image_bytes):
+    """Implementação anterior: RGB em resolução total + pyzbar na imagem inteira."""
+    img_np = np.array(Image.open(BytesIO(image_bytes)).convert('RGB'))
+    decoded_objects = pyzbar_decode(img_np)
+    return decoded_objects[0].data.decode('utf-8') if decoded_objects else None
+
+
+def medir(funcao, dados, repeticoes):
+    tempos, resultado = [], None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao(dados)
+        tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos), resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara a leitura de QR original x múltiplas escalas.")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'Cenário':<20}{'Original (ms)':>15}{'Multiescala (ms)':>18}{'Ganho':>8}  Lidos")
+    for nome, (tamanho, fracao) in CENARIOS.items():
+        foto = gerar_foto(tamanho, fracao)
+        t_original, r_original = medir(leitura_original, foto, args.repeticoes)
+        t_novo, r_novo = medir(extrair_url_qr_code, foto, args.repeticoes)
+        lidos = f"{'OK' if r_original == URL_EXEMPLO else '--'}/{'OK' if r_novo == URL_EXEMPLO else '--'}"
+        print(f"{nome:<20}{t_original * 1000:>15.1f}{t_novo * 1000:>18.1f}{t_original / t_novo:>7.1f}x  {lidos}")
+
+
+if __name__ == '__main__':
+    main()
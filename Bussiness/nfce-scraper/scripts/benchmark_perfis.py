@@ -0,0 +1,107 @@
+"""
+Benchmark: perfil 'padrao' x perfil 'leve' do navegador headless.
+
+Serve localmente uma NFC-e que referencia imagens, fontes e CSS (servidos com
+atraso artificial, como um portal da SEFAZ lento) e mede, para cada perfil, o
+tempo de abertura do Chrome e o tempo de raspagem por nota. Requer Chrome instalado.
+
+Uso (a partir de Bussiness/nfce-scraper):
+    python scripts/benchmark_perfis.py --repeticoes 10 --atraso 0.3
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scraper_nfce import PERFIS_NAVEGADOR, iniciar_driver, raspar_com_driver
+
+PASTA_FIXTURES = Path(__file__).resolve().parent.parent / "tests" / "fixtures"
+
+RECURSOS_PESADOS = """
+  <link rel="stylesheet" href="/recursos/estilo.css">
+  <link rel="stylesheet" href="/recursos/fontes.css">
+  <img src="/recursos/logo.png"><img src="/recursos/banner.jpg"><img src="/recursos/selo.gif">
+"""
+
+
+class _HandlerComAtraso(SimpleHTTPRequestHandler):
+    """Serve tests/fixtures; qualquer caminho em /recursos/ responde após 'atraso' segundos."""
+
+    atraso = 0.3
+
+    def do_GET(self):
+        if self.path.startswith('/recursos/'):
+            time.sleep(self.atraso)
+            tipo = 'text/css' if self.path.endswith('.css') else 'image/png'
+            corpo = b"body { font-family: 'Fonte', sans-serif; }" if tipo == 'text/css' else b"\x89PNG\r\n"
+            self.send_response(200)
+            self.send_header('Content-Type', tipo)
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+            return
+        if self.path.startswith('/nfce_pesada.html'):
+            pagina = (PASTA_FIXTURES / "nfce_go.html").read_text(encoding='utf-8')
+            corpo = pagina.replace("</head>", RECURSOS_PESADOS + "</head>").encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+def medir_perfil(perfil, url, repeticoes):
+    inicio = time.perf_counter()
+    driver = iniciar_driver(perfil)
+    t_abertura = time.perf_counter() - inicio
+
+    tempos = []
+    try:
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            dados_nota, lista_itens = raspar_com_driver(driver, url, perfil)
+            tempos.append(time.perf_counter() - inicio)
+            assert dados_nota and len(lista_itens) == 5, f"Raspagem falhou no perfil '{perfil}'"
+            driver.get("about:blank")
+    finally:
+        driver.quit()
+    return t_abertura, statistics.median(tempos)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compara os perfis de navegador do scraper.")
+    parser.add_argument('--repeticoes', type=int, default=10)
+    parser.add_argument('--atraso', type=float, default=0.3, help="Atraso (s) de cada imagem/fonte/CSS")
+    args = parser.parse_args(argv)
+
+    _HandlerComAtraso.atraso = args.atraso
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), partial(_HandlerComAtraso, directory=str(PASTA_FIXTURES)))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/nfce_pesada.html"
+
+    try:
+        resultados = {perfil: medir_perfil(perfil, url, args.repeticoes) for perfil in PERFIS_NAVEGADOR}
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    print(f"\n=== Mediana de {args.repeticoes} raspagens (recursos com {args.atraso:.2f}s de atraso) ===")
+    print(f"{'Perfil':<10}{'Abertura (s)':>14}{'Raspagem (ms)':>16}")
+    for perfil, (t_abertura, t_raspagem) in resultados.items():
+        print(f"{perfil:<10}{t_abertura:>14.2f}{t_raspagem * 1000:>16.1f}")
+
+
+if __name__ == '__main__':
+    main()
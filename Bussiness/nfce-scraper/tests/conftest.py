@@ -0,0 +1,44 @@
+"""
+Configuração de fixtures para pytest
+"""
+
+import pytest
+import sys
+import threading
+from functools import partial
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+
+# Adicionar diretório raiz ao path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+class _HandlerSilencioso(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="session")
+def servidor_fixtures():
+    """Servidor HTTP local que serve as páginas salvas em tests/fixtures/"""
+    handler = partial(_HandlerSilencioso, directory=str(FIXTURES_DIR))
+    servidor = HTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture(autouse=True)
+def metricas_isoladas(monkeypatch):
+    """Cada teste usa um coletor de métricas próprio, sem gravar em data/"""
+    metricas_scraper = pytest.importorskip("metricas_scraper")
+    coletor = metricas_scraper.MetricasScraper(arquivo=None)
+    monkeypatch.setattr(metricas_scraper, "_metricas", coletor)
+    return coletor
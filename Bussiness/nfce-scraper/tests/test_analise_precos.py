@@ -0,0 +1,125 @@
+"""
+Testes para agregados_precos.py e analise_precos.py
+"""
+
+import pytest
+import analise_precos
+from banco_nfce import BancoNfce
+from agregados_precos import cnpj_da_chave
+
+LOJA_A = "52250339346861034147651070004999491107141815"   # CNPJ 39346861034147
+LOJA_B = "52250311222333000144651070004999491107141815"   # CNPJ 11222333000144
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco isolado em diretório temporário"""
+    banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+    yield banco
+    banco.fechar()
+
+
+def salvar(banco, chave, data_venda, itens):
+    nota = {'hash_qr': chave, 'data_venda': data_venda, 'hora_venda': "10:00:00",
+            'valor_total': sum(quantidade * preco for _, quantidade, preco in itens)}
+    banco.salvar_nota(nota, [
+        {'produto': produto, 'quantidade': quantidade, 'preco_unitario': preco, 'total_item': quantidade * preco}
+        for produto, quantidade, preco in itens
+    ])
+
+
+def chave(loja, sufixo):
+    return loja[:-4] + f"{sufixo:04d}"
+
+
+@pytest.fixture
+def banco_com_notas(banco):
+    salvar(banco, chave(LOJA_A, 1), "2025-01-10", [("ARROZ TIPO 1 5KG", 1, 20.0), ("FEIJAO 1KG", 2, 8.0)])
+    salvar(banco, chave(LOJA_B, 2), "2025-01-20", [("Arroz Tp1 5kg", 1, 22.0)])
+    salvar(banco, chave(LOJA_A, 3), "2025-02-05", [("ARROZ TIPO 1 5KG", 2, 23.1), ("FEIJAO 1KG", 1, 8.8)])
+    return banco
+
+
+class TestAgregados:
+    """Testes da manutenção incremental dos agregados"""
+
+    def test_cnpj_da_chave(self):
+        assert cnpj_da_chave(LOJA_A) == "39346861034147"
+        assert cnpj_da_chave("123") is None
+
+    def test_incremental_igual_ao_recalculo(self, banco_com_notas):
+        consulta = "SELECT * FROM agg_produto_mes ORDER BY produto_id, mes"
+        incremental = banco_com_notas.ler_sql(consulta)
+        lojas_incremental = banco_com_notas.ler_sql("SELECT * FROM agg_loja_mes ORDER BY cnpj, mes")
+
+        banco_com_notas.recalcular_agregados()
+        assert banco_com_notas.ler_sql(consulta).equals(incremental)
+        assert banco_com_notas.ler_sql("SELECT * FROM agg_loja_mes ORDER BY cnpj, mes").equals(lojas_incremental)
+
+    def test_nota_repetida_nao_soma_de_novo(self, banco_com_notas):
+        antes = banco_com_notas.ler_sql("SELECT SUM(compras) AS total FROM agg_produto_mes")['total'][0]
+        salvar(banco_com_notas, chave(LOJA_A, 1), "2025-01-10", [("ARROZ TIPO 1 5KG", 1, 20.0)])
+        assert banco_com_notas.ler_sql("SELECT SUM(compras) AS total FROM agg_produto_mes")['total'][0] == antes
+
+    def test_banco_existente_ganha_agregados(self, tmp_path):
+        caminho = str(tmp_path / "nfce.sqlite")
+        banco = BancoNfce(caminho=caminho)
+        salvar(banco, chave(LOJA_A, 1), "2025-01-10", [("CAFE 500G", 1, 18.0)])
+        banco._conn.execute("DELETE FROM agg_produto_mes")
+        banco._conn.commit()
+        banco.fechar()
+
+        reaberto = BancoNfce(caminho=caminho)
+        assert not reaberto.agregados.vazio()
+        reaberto.fechar()
+
+
+class TestAnalises:
+    """Testes das consultas sobre os agregados"""
+
+    def test_historico_produto(self, banco_com_notas):
+        historico = analise_precos.historico_produto("arroz tipo 1 5kg", banco=banco_com_notas)
+        assert list(historico['mes']) == ["2025-01", "2025-02"]
+        assert historico['preco_medio'].tolist() == pytest.approx([21.0, 23.1])
+        assert historico['variacao_pct'].iloc[1] == pytest.approx(10.0)
+        assert historico['preco_min'].iloc[0] == 20.0
+
+    def test_historico_separado_por_produto(self, banco_com_notas):
+        salvar(banco_com_notas, chave(LOJA_A, 4), "2025-01-15", [("ARROZ TIPO 1 1KG", 1, 5.0)])
+        salvar(banco_com_notas, chave(LOJA_A, 5), "2025-02-15", [("ARROZ TIPO 1 1KG", 1, 5.5)])
+
+        historico = analise_precos.historico_produto("arroz", banco=banco_com_notas)
+        assert set(historico['produto']) == {"ARROZ TIPO 1 5 KG", "ARROZ TIPO 1 1 KG"}
+        for _, serie in historico.groupby('produto_id'):
+            assert list(serie['mes']) == ["2025-01", "2025-02"]
+            assert serie['variacao_pct'].iloc[1] == pytest.approx(10.0)
+        cinco_quilos = historico[historico['produto'] == "ARROZ TIPO 1 5 KG"]
+        assert cinco_quilos['preco_medio'].tolist() == pytest.approx([21.0, 23.1])
+
+    def test_produto_inexistente(self, banco_com_notas):
+        assert analise_precos.historico_produto("detergente", banco=banco_com_notas).empty
+
+    def test_gasto_por_loja(self, banco_com_notas):
+        lojas = analise_precos.gasto_por_loja(banco=banco_com_notas)
+        assert lojas['cnpj'].tolist() == ["39346861034147", "11222333000144"]
+        assert lojas['gasto_total'].iloc[0] == pytest.approx(36.0 + 55.0)
+        assert lojas['notas'].iloc[0] == 2
+
+        fevereiro = analise_precos.gasto_por_loja(mes_inicio="2025-02", banco=banco_com_notas)
+        assert fevereiro['cnpj'].tolist() == ["39346861034147"]
+
+    def test_indice_precos(self, banco_com_notas):
+        indice = analise_precos.indice_precos(banco=banco_com_notas)
+        assert indice['mes'].tolist() == ["2025-01", "2025-02"]
+        assert indice['indice'].iloc[0] == pytest.approx(100.0)
+        # Arroz 21.0 -> 23.1 (+10%) e feijão 8.0 -> 8.8 (+10%)
+        assert indice['indice'].iloc[1] == pytest.approx(110.0)
+        assert indice['produtos_comparados'].iloc[1] == 2
+
+    def test_formatar_cnpj(self):
+        assert analise_precos.formatar_cnpj("39346861034147") == "39.346.861/0341-47"
+
+    def test_cli(self, banco_com_notas, monkeypatch, capsys):
+        monkeypatch.setattr(analise_precos, "obter_banco", lambda: banco_com_notas)
+        analise_precos.main(['indice'])
+        assert "2025-02" in capsys.readouterr().out
@@ -0,0 +1,195 @@
+"""
+Testes para banco_nfce.py e a exportação CSV de salvador_csv.py
+"""
+
+import pytest
+import pandas as pd
+import salvador_csv
+from banco_nfce import BancoNfce
+
+CHAVE = "52250339346861034147651070004999491107141815"
+
+
+def nota_exemplo():
+    return {'valor_total': 126.89, 'data_hora_nfce': "05/03/2025 18:42:10", 'data_extracao': "2025-03-06 10:00:00"}
+
+
+def itens_exemplo():
+    return [
+        {'descricao_produto': "ARROZ TIPO 1 5KG", 'quantidade': 1.0, 'unidade': "UN", 'preco_unitario': 24.90, 'total_item': 24.90},
+        {'descricao_produto': "FEIJAO CARIOCA 1KG", 'quantidade': 2.0, 'unidade': "UN", 'preco_unitario': 8.49, 'total_item': 16.98},
+    ]
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch):
+    """Banco isolado em diretório temporário, usado também por salvador_csv"""
+    banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+    monkeypatch.setattr(salvador_csv, "obter_banco", lambda: banco)
+    yield banco
+    banco.fechar()
+
+
+class TestSeparaDataHora:
+    """Testes da conversão do campo datEmi"""
+
+    def test_data_e_hora(self):
+        assert salvador_csv.separar_data_hora("05/03/2025 18:42:10") == ("2025-03-05", "18:42:10")
+
+    def test_sem_segundos(self):
+        assert salvador_csv.separar_data_hora("05/03/2025 18:42 ") == ("2025-03-05", "18:42:00")
+
+    def test_invalida(self):
+        assert salvador_csv.separar_data_hora(None) == (None, None)
+
+
+class TestBancoNfce:
+    """Testes do armazenamento SQLite"""
+
+    def test_salva_nota_e_itens(self, banco):
+        assert salvador_csv.salvar_dados_em_csv(nota_exemplo(), itens_exemplo(), CHAVE) is True
+        assert CHAVE in banco
+
+        itens = banco.ler_itens()
+        assert list(itens['produto']) == ["ARROZ TIPO 1 5KG", "FEIJAO CARIOCA 1KG"]
+        assert (itens['data_venda'] == "2025-03-05").all()
+        assert (itens['valor_total_nota'] == 126.89).all()
+
+    def test_nota_repetida_nao_duplica(self, banco):
+        salvador_csv.salvar_dados_em_csv(nota_exemplo(), itens_exemplo(), CHAVE)
+        assert salvador_csv.salvar_dados_em_csv(nota_exemplo(), itens_exemplo(), CHAVE) is False
+        assert banco.contar_notas() == 1
+        assert len(banco.ler_itens()) == 2
+
+    def test_falha_nos_itens_desfaz_a_nota(self, banco):
+        itens = itens_exemplo()
+        itens[1]['quantidade'] = object()  # Tipo não suportado pelo sqlite3
+        with pytest.raises(Exception):
+            banco.salvar_nota({'hash_qr': CHAVE}, itens)
+        assert CHAVE not in banco
+
+    def test_filtros(self, banco):
+        salvador_csv.salvar_dados_em_csv(nota_exemplo(), itens_exemplo(), CHAVE)
+        outra = dict(nota_exemplo(), data_hora_nfce="10/04/2025 09:00:00")
+        salvador_csv.salvar_dados_em_csv(outra, itens_exemplo()[:1], "1" * 44)
+
+        assert len(banco.ler_notas(data_inicio="2025-04-01")) == 1
+        assert len(banco.ler_itens(produto="ARROZ TIPO 1 5KG")) == 2
+        assert len(banco.ler_itens(produto="ARROZ TIPO 1 5KG", data_fim="2025-03-31")) == 1
+
+    def test_usa_indices(self, banco):
+        plano = banco._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM itens WHERE produto = ?", ("X",)
+        ).fetchall()
+        assert any("idx_itens_produto" in linha[-1] for linha in plano)
+
+
+class TestExportarCsv:
+    """Testes da regeneração dos CSVs"""
+
+    def test_exporta_colunas_do_csv(self, banco, tmp_path):
+        salvador_csv.salvar_dados_em_csv(nota_exemplo(), itens_exemplo(), CHAVE)
+        arquivo_itens, arquivo_notas = salvador_csv.exportar_csv(
+            str(tmp_path / "itens.csv"), str(tmp_path / "notas.csv")
+        )
+
+        itens = pd.read_csv(arquivo_itens, sep=';', dtype={'hash_qr': str})
+        notas = pd.read_csv(arquivo_notas, sep=';', dtype={'hash_qr': str})
+        assert list(itens.columns) == salvador_csv.COLUNAS_ITENS
+        assert list(notas.columns) == salvador_csv.COLUNAS_NOTAS
+        assert len(itens) == 2
+        assert notas.loc[0, 'hash_qr'] == CHAVE
+
+
+class TestImportarCsvLegado:
+    """Testes da importação dos CSVs gravados antes do banco"""
+
+    def escrever_legado(self, pasta, notas, itens):
+        pd.DataFrame(notas, columns=salvador_csv.COLUNAS_NOTAS).to_csv(
+            pasta / "notas_nfce.csv", index=False, sep=';', encoding='utf-8')
+        pd.DataFrame(itens, columns=salvador_csv.COLUNAS_ITENS).to_csv(
+            pasta / "itens_nfce.csv", index=False, sep=';', encoding='utf-8')
+
+    def linhas_legado(self, hash_qr=CHAVE):
+        nota = {'data_venda': "2025-03-05", 'hora_venda': "18:42:10", 'valor_total': 126.89, 'hash_qr': hash_qr}
+        itens = [
+            {'produto': "ARROZ TIPO 1 5KG", 'quantidade': 1.0, 'preco_unitario': 24.90, 'total_item': 24.90,
+             'valor_total_nota': 126.89, 'hash_qr': hash_qr, 'data_venda': "2025-03-05"},
+            {'produto': "FEIJAO CARIOCA 1KG", 'quantidade': 2.0, 'preco_unitario': 8.49, 'total_item': 16.98,
+             'valor_total_nota': 126.89, 'hash_qr': hash_qr, 'data_venda': "2025-03-05"},
+        ]
+        return nota, itens
+
+    def test_banco_novo_importa_csvs(self, tmp_path):
+        nota, itens = self.linhas_legado()
+        self.escrever_legado(tmp_path, [nota], itens)
+
+        banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+        try:
+            assert banco.contar_notas() == 1
+            df = banco.ler_itens()
+            assert list(df['produto']) == ["ARROZ TIPO 1 5KG", "FEIJAO CARIOCA 1KG"]
+            assert df.loc[0, 'hash_qr'] == CHAVE  # Os 44 dígitos não viram número
+            assert banco.ler_notas().loc[0, 'valor_total'] == 126.89
+            assert len(banco.historico_precos("arroz tipo 1 5kg")) == 1
+        finally:
+            banco.fechar()
+
+    def test_importa_uma_vez_so(self, tmp_path):
+        nota, itens = self.linhas_legado()
+        self.escrever_legado(tmp_path, [nota], itens)
+        BancoNfce(caminho=str(tmp_path / "nfce.sqlite")).fechar()
+
+        outra, itens_outra = self.linhas_legado("1" * 44)
+        self.escrever_legado(tmp_path, [nota, outra], itens + itens_outra)
+        banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+        try:
+            assert banco.contar_notas() == 1  # Banco já populado: os CSVs não são relidos
+        finally:
+            banco.fechar()
+
+    def test_nota_anexada_duas_vezes(self, tmp_path):
+        nota, itens = self.linhas_legado()
+        self.escrever_legado(tmp_path, [nota, nota], itens + itens)
+
+        banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+        try:
+            assert banco.contar_notas() == 1
+            assert len(banco.ler_itens()) == 2
+        finally:
+            banco.fechar()
+
+    def test_itens_sem_linha_de_nota(self, tmp_path):
+        _, itens = self.linhas_legado()
+        self.escrever_legado(tmp_path, [], itens)
+
+        banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+        try:
+            notas = banco.ler_notas()
+            assert list(notas['hash_qr']) == [CHAVE]
+            assert notas.loc[0, 'valor_total'] == 126.89
+            assert notas.loc[0, 'data_venda'] == "2025-03-05"
+        finally:
+            banco.fechar()
+
+    def test_csvs_vazios_sao_ignorados(self, tmp_path):
+        (tmp_path / "notas_nfce.csv").write_text("")
+        (tmp_path / "itens_nfce.csv").write_text("")
+        banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+        try:
+            assert banco.contar_notas() == 0
+        finally:
+            banco.fechar()
+
+    def test_exportacao_preserva_historico(self, tmp_path, monkeypatch):
+        nota, itens = self.linhas_legado()
+        self.escrever_legado(tmp_path, [nota], itens)
+        banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+        monkeypatch.setattr(salvador_csv, "obter_banco", lambda: banco)
+        try:
+            salvador_csv.salvar_dados_em_csv(nota_exemplo(), itens_exemplo(), "1" * 44)
+            salvador_csv.exportar_csv(str(tmp_path / "itens_nfce.csv"), str(tmp_path / "notas_nfce.csv"))
+            notas = pd.read_csv(tmp_path / "notas_nfce.csv", sep=';', dtype={'hash_qr': str})
+            assert sorted(notas['hash_qr']) == sorted([CHAVE, "1" * 44])
+        finally:
+            banco.fechar()
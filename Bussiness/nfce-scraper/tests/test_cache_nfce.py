@@ -0,0 +1,132 @@
+"""
+Testes para cache_nfce.py
+"""
+
+import pytest
+import threading
+import time
+from cache_nfce import CacheNfce
+
+CHAVE = "52250339346861034147651070004999491107141815"
+DADOS_NOTA = {'valor_total': 126.89, 'data_hora_nfce': "05/03/2025 18:42:10"}
+LISTA_ITENS = [{'descricao_produto': "ARROZ TIPO 1 5KG", 'quantidade': 1.0, 'total_item': 24.90}]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    """Cache isolado em diretório temporário"""
+    cache = CacheNfce(caminho=str(tmp_path / "cache.sqlite"), tamanho_lru=2)
+    yield cache
+    cache.fechar()
+
+
+class TestCacheNfce:
+    """Testes do cache de raspagens"""
+
+    def test_chave_inexistente(self, cache):
+        assert cache.obter(CHAVE) is None
+        assert CHAVE not in cache
+
+    def test_guardar_e_obter(self, cache):
+        cache.guardar(CHAVE, DADOS_NOTA, LISTA_ITENS, "<html>nota</html>")
+        assert cache.obter(CHAVE) == (DADOS_NOTA, LISTA_ITENS)
+        assert cache.obter_html(CHAVE) == "<html>nota</html>"
+
+    def test_persistencia_em_disco(self, tmp_path):
+        caminho = str(tmp_path / "cache.sqlite")
+        primeiro = CacheNfce(caminho=caminho)
+        primeiro.guardar(CHAVE, DADOS_NOTA, LISTA_ITENS)
+        primeiro.fechar()
+
+        segundo = CacheNfce(caminho=caminho)
+        assert segundo.obter(CHAVE) == (DADOS_NOTA, LISTA_ITENS)
+        segundo.fechar()
+
+    def test_retorno_e_uma_copia(self, cache):
+        """salvar_dados_em_csv altera os dicts; o cache não pode mudar junto"""
+        cache.guardar(CHAVE, DADOS_NOTA, LISTA_ITENS)
+        dados_nota, lista_itens = cache.obter(CHAVE)
+        dados_nota['hash_qr'] = CHAVE
+        lista_itens[0]['hash_qr'] = CHAVE
+        assert 'hash_qr' not in cache.obter(CHAVE)[0]
+        assert 'hash_qr' not in cache.obter(CHAVE)[1][0]
+
+    def test_lru_limitado(self, cache):
+        for i in range(5):
+            cache.guardar(str(i) * 44, DADOS_NOTA, LISTA_ITENS)
+        assert len(cache._lru) == 2
+        # Entradas fora do LRU continuam no SQLite
+        assert cache.obter("0" * 44) == (DADOS_NOTA, LISTA_ITENS)
+
+
+class TestObterOuRaspar:
+    """Testes da integração cache -> scraper"""
+
+    def test_raspa_apenas_uma_vez(self, cache):
+        chamadas = []
+
+        def raspar():
+            chamadas.append(1)
+            return dict(DADOS_NOTA), list(LISTA_ITENS), "<html></html>"
+
+        assert cache.obter_ou_raspar(CHAVE, raspar)[2] is False
+        assert cache.obter_ou_raspar(CHAVE, raspar) == (DADOS_NOTA, LISTA_ITENS, True)
+        assert len(chamadas) == 1
+
+    def test_falha_nao_e_cacheada(self, cache):
+        assert cache.obter_ou_raspar(CHAVE, lambda: (None, None, None)) == (None, None, False)
+        assert cache.obter(CHAVE) is None
+
+    def test_envios_simultaneos(self, cache):
+        chamadas = []
+
+        def raspar_lento():
+            chamadas.append(1)
+            time.sleep(0.1)
+            return dict(DADOS_NOTA), list(LISTA_ITENS), None
+
+        threads = [threading.Thread(target=cache.obter_ou_raspar, args=(CHAVE, raspar_lento)) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(chamadas) == 1
+
+    def test_falha_e_nova_tentativa_simultaneas(self, cache):
+        """Depois de uma falha, quem esperava e quem chega depois nunca raspam ao mesmo tempo"""
+        em_andamento, pico, chamadas = [0], [0], []
+        lock = threading.Lock()
+
+        def raspar_instavel():
+            with lock:
+                chamadas.append(1)
+                em_andamento[0] += 1
+                pico[0] = max(pico[0], em_andamento[0])
+                falhar = len(chamadas) == 1
+            time.sleep(0.05)
+            with lock:
+                em_andamento[0] -= 1
+            if falhar:
+                return None, None, None
+            return dict(DADOS_NOTA), list(LISTA_ITENS), None
+
+        resultados = []
+
+        def enviar():
+            resultados.append(cache.obter_ou_raspar(CHAVE, raspar_instavel))
+
+        threads = [threading.Thread(target=enviar) for _ in range(4)]
+        for t in threads:
+            t.start()
+        time.sleep(0.02)  # Primeira raspagem (que falha) em andamento, três esperando
+        atrasadas = [threading.Thread(target=enviar) for _ in range(4)]
+        for t in atrasadas:
+            t.start()
+            time.sleep(0.01)
+        for t in threads + atrasadas:
+            t.join()
+
+        assert pico[0] == 1
+        assert len(chamadas) == 2  # A falha e uma única nova tentativa
+        assert sum(1 for r in resultados if r[0] is None) == 1
+        assert cache._locks_chave == {}
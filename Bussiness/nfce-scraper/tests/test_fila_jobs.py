@@ -0,0 +1,163 @@
+"""
+Testes para fila_jobs.py e worker_nfce.py
+"""
+
+import pytest
+import sqlite3
+import threading
+import time
+from fila_jobs import FilaJobs, PENDENTE, PROCESSANDO, CONCLUIDO, FALHA
+
+URL = "http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p=52250339346861034147651070004999491107141815|2|1|1|ABC"
+CHAVE = "52250339346861034147651070004999491107141815"
+
+
+@pytest.fixture
+def fila(tmp_path):
+    """Fila isolada em diretório temporário"""
+    fila = FilaJobs(caminho=str(tmp_path / "fila.sqlite"), max_tentativas=2)
+    yield fila
+    fila.fechar()
+
+
+class TestFilaJobs:
+    """Testes do ciclo de vida dos jobs"""
+
+    def test_enfileirar_e_reservar(self, fila):
+        job_id = fila.enfileirar(URL, CHAVE)
+        assert fila.obter(job_id)['status'] == PENDENTE
+
+        job = fila.reservar("teste")
+        assert job['id'] == job_id
+        assert job['status'] == PROCESSANDO
+        assert job['tentativas'] == 1
+        assert fila.reservar("teste") is None
+
+    def test_mesma_nota_reaproveita_job(self, fila):
+        assert fila.enfileirar(URL, CHAVE) == fila.enfileirar(URL, CHAVE)
+
+    def test_concluir(self, fila):
+        job_id = fila.enfileirar(URL, CHAVE)
+        fila.reservar("teste")
+        fila.concluir(job_id, {'itens': 5, 'valor_total': 126.89})
+
+        job = fila.obter(job_id)
+        assert job['status'] == CONCLUIDO
+        assert job['resultado'] == {'itens': 5, 'valor_total': 126.89}
+        # Nota concluída pode ser enfileirada de novo
+        assert fila.enfileirar(URL, CHAVE) != job_id
+
+    def test_falha_volta_para_fila_ate_o_limite(self, tmp_path):
+        fila = FilaJobs(caminho=str(tmp_path / "fila.sqlite"), max_tentativas=2, backoff_base=0)
+        job_id = fila.enfileirar(URL, CHAVE)
+        fila.reservar("teste")
+        fila.falhar(job_id, "timeout")
+        assert fila.obter(job_id)['status'] == PENDENTE
+
+        assert fila.reservar("teste")['id'] == job_id
+        fila.falhar(job_id, "timeout")
+        assert fila.obter(job_id)['status'] == FALHA
+        assert fila.obter(job_id)['erro'] == "timeout"
+        fila.fechar()
+
+    def test_falha_espera_o_backoff(self, tmp_path):
+        fila = FilaJobs(caminho=str(tmp_path / "fila.sqlite"), max_tentativas=3, backoff_base=0.1)
+        job_id = fila.enfileirar(URL, CHAVE)
+        outro_id = fila.enfileirar(URL.replace("5225", "5226"), "1" * 44)
+
+        fila.reservar("teste")
+        antes = time.time()
+        fila.falhar(job_id, "timeout")
+        job = fila.obter(job_id)
+        assert 0.1 <= job['disponivel_em'] - antes <= 0.13  # Até 25% de jitter
+        # Em backoff o job é pulado; o seguinte da fila é reservado no lugar
+        assert fila.reservar("teste")['id'] == outro_id
+        assert fila.reservar("teste") is None
+
+        time.sleep(job['disponivel_em'] - time.time() + 0.01)
+        assert fila.reservar("teste")['id'] == job_id
+        fila.falhar(job_id, "timeout")
+        # Segunda falha: espera dobra
+        assert fila.obter(job_id)['disponivel_em'] - time.time() >= 0.19
+        fila.fechar()
+
+    def test_migra_fila_sem_backoff(self, tmp_path):
+        caminho = str(tmp_path / "fila.sqlite")
+        conn = sqlite3.connect(caminho)
+        conn.execute("CREATE TABLE jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, hash_qr TEXT, "
+                     "status TEXT NOT NULL, tentativas INTEGER NOT NULL DEFAULT 0, resultado TEXT, erro TEXT, "
+                     "worker TEXT, criado_em REAL NOT NULL, iniciado_em REAL, concluido_em REAL)")
+        conn.execute("INSERT INTO jobs (url, hash_qr, status, criado_em) VALUES (?, ?, ?, ?)",
+                     (URL, CHAVE, PENDENTE, time.time()))
+        conn.commit()
+        conn.close()
+
+        fila = FilaJobs(caminho=caminho)
+        assert fila.reservar("teste")['hash_qr'] == CHAVE
+        fila.fechar()
+
+    def test_job_abandonado_volta_para_fila(self, tmp_path):
+        fila = FilaJobs(caminho=str(tmp_path / "fila.sqlite"), timeout_processando=0)
+        job_id = fila.enfileirar(URL, CHAVE)
+        fila.reservar("worker-morto")
+        time.sleep(0.01)
+
+        job = fila.reservar("worker-novo")
+        assert job['id'] == job_id
+        assert job['tentativas'] == 2
+        fila.fechar()
+
+    def test_reservas_concorrentes_entre_conexoes(self, tmp_path):
+        """Duas instâncias (como dois processos) nunca pegam o mesmo job"""
+        caminho = str(tmp_path / "fila.sqlite")
+        produtora = FilaJobs(caminho=caminho)
+        for i in range(20):
+            produtora.enfileirar(f"{URL}{i}", str(i) * 44)
+
+        consumidoras = [FilaJobs(caminho=caminho) for _ in range(4)]
+        reservados = []
+
+        def consumir(fila):
+            while (job := fila.reservar("teste")) is not None:
+                reservados.append(job['id'])
+
+        threads = [threading.Thread(target=consumir, args=(f,)) for f in consumidoras]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert sorted(reservados) == list(range(1, 21))
+        for f in consumidoras + [produtora]:
+            f.fechar()
+
+    def test_workers_ativos(self, fila):
+        assert fila.workers_ativos() == 0
+        fila.registrar_worker("host:1")
+        assert fila.workers_ativos() == 1
+        fila.remover_worker("host:1")
+        assert fila.workers_ativos() == 0
+
+
+class TestWorker:
+    """Testes do worker consumindo a fila"""
+
+    def test_processa_jobs(self, fila, monkeypatch):
+        worker_nfce = pytest.importorskip("worker_nfce", exc_type=ImportError)
+        monkeypatch.setattr(worker_nfce, "processar_job", lambda job: {'itens': 1, 'hash_qr': job['hash_qr']})
+        job_ok = fila.enfileirar(URL, CHAVE)
+
+        worker = worker_nfce.WorkerNfce(fila=fila, threads=2, intervalo_ocioso=0.01)
+        thread = threading.Thread(target=worker.executar)
+        thread.start()
+        try:
+            for _ in range(200):
+                if fila.obter(job_ok)['status'] == CONCLUIDO:
+                    break
+                time.sleep(0.01)
+        finally:
+            worker.parar()
+            thread.join()
+
+        assert fila.obter(job_ok)['resultado'] == {'itens': 1, 'hash_qr': CHAVE}
+        assert fila.workers_ativos() == 0
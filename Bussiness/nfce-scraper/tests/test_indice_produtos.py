@@ -0,0 +1,108 @@
+"""
+Testes para indice_produtos.py e o histórico de preços do banco
+"""
+
+import pytest
+import sqlite3
+from banco_nfce import BancoNfce
+from indice_produtos import normalizar_descricao, trigramas
+
+
+@pytest.fixture
+def banco(tmp_path):
+    """Banco isolado em diretório temporário"""
+    banco = BancoNfce(caminho=str(tmp_path / "nfce.sqlite"))
+    yield banco
+    banco.fechar()
+
+
+def salvar(banco, hash_qr, data_venda, itens):
+    nota = {'hash_qr': hash_qr, 'data_venda': data_venda, 'hora_venda': "10:00:00", 'valor_total': 10.0}
+    return banco.salvar_nota(nota, [
+        {'produto': produto, 'quantidade': 1.0, 'preco_unitario': preco, 'total_item': preco}
+        for produto, preco in itens
+    ])
+
+
+class TestNormalizacao:
+    """Testes da normalização das descrições"""
+
+    @pytest.mark.parametrize("descricao", ["ARROZ TIPO 1 5KG", "Arroz Tp1 5kg.", "arroz  tipo 1 - 5 Kgs"])
+    def test_variacoes_do_mesmo_produto(self, descricao):
+        assert normalizar_descricao(descricao) == "ARROZ TIPO 1 5 KG"
+
+    def test_acentos_e_decimal(self):
+        assert normalizar_descricao("Refrig. Guaraná 1,5Lt") == "REFRIGERANTE GUARANA 1.5 L"
+
+    def test_unidade_so_apos_numero(self):
+        # 'G' isolado não vira unidade fora de uma medida
+        assert normalizar_descricao("VITAMINA C G") == "VITAMINA C G"
+        assert normalizar_descricao("CAFE 500GR") == "CAFE 500 G"
+
+    def test_vazio(self):
+        assert normalizar_descricao(None) == ""
+
+    def test_trigramas_com_bordas(self):
+        assert trigramas("OVO") == {" OV", "OVO", "VO "}
+
+
+class TestIndiceProdutos:
+    """Testes do índice mantido a cada nota salva"""
+
+    def test_variacoes_compartilham_produto_id(self, banco):
+        salvar(banco, "1" * 44, "2025-01-10", [("ARROZ TIPO 1 5KG", 24.90)])
+        salvar(banco, "2" * 44, "2025-02-10", [("Arroz Tp1 5kg", 26.50)])
+
+        historico = banco.historico_precos("arroz tipo 1 5kg")
+        assert list(historico['preco_unitario']) == [24.90, 26.50]
+        assert historico['produto_id'].nunique() == 1
+
+    def test_busca_por_tokens(self, banco):
+        salvar(banco, "1" * 44, "2025-01-10", [("LEITE UHT INTEGRAL 1L", 4.79), ("LEITE EM PO 400G", 19.90),
+                                              ("FEIJAO CARIOCA 1KG", 8.49)])
+        nomes = [nome for _, nome, _ in banco.buscar_produtos("leite")]
+        assert sorted(nomes) == ["LEITE EM PO 400 G", "LEITE UHT INTEGRAL 1 L"]
+        assert [nome for _, nome, _ in banco.buscar_produtos("leite integral")] == ["LEITE UHT INTEGRAL 1 L"]
+
+    def test_busca_aproximada(self, banco):
+        salvar(banco, "1" * 44, "2025-01-10", [("FEIJAO CARIOCA 1KG", 8.49)])
+        resultado = banco.buscar_produtos("feijao carioka")
+        assert resultado and resultado[0][1] == "FEIJAO CARIOCA 1 KG"
+        assert resultado[0][2] < 1.0
+
+    def test_busca_sem_resultado(self, banco):
+        salvar(banco, "1" * 44, "2025-01-10", [("FEIJAO CARIOCA 1KG", 8.49)])
+        assert banco.buscar_produtos("detergente") == []
+        assert banco.historico_precos("detergente").empty
+
+    def test_consulta_usa_indice(self, banco):
+        plano = banco._conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM itens WHERE produto_id IN (1, 2)"
+        ).fetchall()
+        assert any("idx_itens_produto_id" in linha[-1] for linha in plano)
+
+    def test_nota_desfeita_nao_deixa_produto(self, banco):
+        with pytest.raises(Exception):
+            banco.salvar_nota({'hash_qr': "1" * 44}, [{'produto': "SABAO EM PO", 'quantidade': object()}])
+        assert banco.buscar_produtos("sabao em po") == []
+        # E o produto pode ser criado normalmente depois
+        salvar(banco, "1" * 44, "2025-01-10", [("SABAO EM PO", 12.0)])
+        assert len(banco.historico_precos("sabao em po")) == 1
+
+    def test_migra_banco_antigo(self, tmp_path):
+        caminho = str(tmp_path / "antigo.sqlite")
+        conn = sqlite3.connect(caminho)
+        conn.executescript("""
+            CREATE TABLE notas (hash_qr TEXT PRIMARY KEY, data_venda TEXT, hora_venda TEXT,
+                                forma_pagamento TEXT, valor_total REAL, data_extracao TEXT);
+            CREATE TABLE itens (hash_qr TEXT NOT NULL, sequencia INTEGER NOT NULL, produto TEXT, quantidade REAL,
+                                unidade TEXT, preco_unitario REAL, total_item REAL, PRIMARY KEY (hash_qr, sequencia));
+            INSERT INTO notas (hash_qr, data_venda) VALUES ('abc', '2025-01-01');
+            INSERT INTO itens VALUES ('abc', 1, 'CAFE TORRADO 500G', 1, 'UN', 18.9, 18.9);
+        """)
+        conn.commit()
+        conn.close()
+
+        banco = BancoNfce(caminho=caminho)
+        assert list(banco.historico_precos("cafe 500g")['preco_unitario']) == [18.9]
+        banco.fechar()
@@ -0,0 +1,63 @@
+"""
+Testes para leitor_qr.py (requer a biblioteca nativa zbar)
+"""
+
+import pytest
+from io import BytesIO
+from PIL import Image
+
+qrcode = pytest.importorskip("qrcode")
+leitor_qr = pytest.importorskip("leitor_qr", exc_type=ImportError)
+
+URL = "http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p=52250339346861034147651070004999491107141815|2|1|1|DF46C0CAD32EF01BE6B47848D0D7BD145878E215"
+
+
+def gerar_foto(tamanho, lado_qr, posicao=(0.55, 0.3)):
+    foto = Image.new('RGB', tamanho, (210, 210, 210))
+    qr = qrcode.make(URL, border=2).convert('RGB').resize((lado_qr, lado_qr), Image.NEAREST)
+    foto.paste(qr, (int(tamanho[0] * posicao[0]), int(tamanho[1] * posicao[1])))
+    buffer = BytesIO()
+    foto.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestExtrairHash:
+    """Testes da extração da Chave de Acesso"""
+
+    def test_url_valida(self):
+        assert leitor_qr.extrair_hash_da_url(URL) == "52250339346861034147651070004999491107141815"
+
+    def test_url_sem_payload(self):
+        assert leitor_qr.extrair_hash_da_url("http://nfe.sefaz.go.gov.br/?chave=123") is None
+
+
+class TestExtrairUrlQrCode:
+    """Testes da leitura em múltiplas escalas"""
+
+    def test_imagem_pequena(self):
+        assert leitor_qr.extrair_url_qr_code(gerar_foto((600, 600), 300, (0.2, 0.2))) == URL
+
+    def test_foto_grande_le_na_reduzida(self):
+        assert leitor_qr.extrair_url_qr_code(gerar_foto((4000, 3000), 1200)) == URL
+
+    def test_qr_pequeno_le_no_recorte(self):
+        """QR pequeno demais para a imagem reduzida: precisa do recorte em resolução total"""
+        assert leitor_qr.extrair_url_qr_code(gerar_foto((4000, 3000), 260)) == URL
+
+    def test_bytes_invalidos(self):
+        assert leitor_qr.extrair_url_qr_code(b"nao e imagem") is None
+
+
+class TestLocalizarRegiao:
+    """Testes do mapeamento da região candidata para a imagem original"""
+
+    def test_regiao_contem_o_qr(self):
+        import numpy as np
+        import cv2
+        cinza = np.asarray(Image.open(BytesIO(gerar_foto((4000, 3000), 1200))).convert('L'))
+        escala = leitor_qr.LADO_MAX_RAPIDO / max(cinza.shape)
+        reduzida = cv2.resize(cinza, None, fx=escala, fy=escala, interpolation=cv2.INTER_AREA)
+
+        topo, base, esquerda, direita = leitor_qr.localizar_regiao_qr(reduzida, escala, cinza.shape)
+        assert topo <= 900 and base >= 900 + 1200
+        assert esquerda <= 2200 and direita >= 2200 + 1200
@@ -0,0 +1,157 @@
+"""
+Testes para lote_nfce.py (raspagem e gravação substituídas por funções falsas)
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlparse
+
+import pytest
+
+lote_nfce = pytest.importorskip("lote_nfce", exc_type=ImportError)
+
+
+def _url(host, numero):
+    return f"https://{host}/nfce?p={numero:044d}|2|1"
+
+
+class ScraperFalso:
+    """Substitui raspar_dados_nfce_com_cache: mede concorrência e registra inícios por host"""
+
+    def __init__(self, duracao=0.05, falhas=()):
+        self.duracao = duracao
+        self.falhas = set(falhas)
+        self.chamadas = defaultdict(int)
+        self.inicios = defaultdict(list)
+        self.em_andamento = defaultdict(int)
+        self.pico_host = defaultdict(int)
+        self.total = 0
+        self.pico_total = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url, hash_qr):
+        host = urlparse(url).netloc
+        with self._lock:
+            self.chamadas[hash_qr] += 1
+            self.inicios[host].append(time.monotonic())
+            self.em_andamento[host] += 1
+            self.total += 1
+            self.pico_host[host] = max(self.pico_host[host], self.em_andamento[host])
+            self.pico_total = max(self.pico_total, self.total)
+        time.sleep(self.duracao)
+        with self._lock:
+            self.em_andamento[host] -= 1
+            self.total -= 1
+        if hash_qr in self.falhas:
+            return None, None, None
+        return {'valor_total': 10.0}, [{'descricao_produto': "ITEM"}], "<html></html>"
+
+
+class CacheFalso:
+    def __init__(self, notas=None):
+        self.notas = notas or {}
+
+    def obter(self, chave):
+        return self.notas.get(chave)
+
+
+@pytest.fixture
+def ambiente(monkeypatch):
+    """Troca scraper, gravação e cache do lote; devolve (scraper, salvos, cache)"""
+    scraper, salvos, cache = ScraperFalso(), [], CacheFalso()
+    monkeypatch.setattr(lote_nfce, "raspar_dados_nfce_com_cache", lambda url, hash_qr: scraper(url, hash_qr))
+    monkeypatch.setattr(lote_nfce, "salvar_dados_em_csv",
+                        lambda dados_nota, lista_itens, hash_qr: salvos.append(hash_qr))
+    monkeypatch.setattr(lote_nfce, "obter_cache", lambda: cache)
+    return scraper, salvos, cache
+
+
+def _executar(urls, **kwargs):
+    kwargs.setdefault('intervalo_min', 0)
+    kwargs.setdefault('backoff_base', 0.01)
+    return asyncio.run(lote_nfce.executar_lote(urls, **kwargs))
+
+
+class TestExecutarLote:
+    """Testes dos limites, retentativas e gravação do modo lote"""
+
+    def test_limite_por_host_e_global(self, ambiente):
+        scraper, _, _ = ambiente
+        urls = [_url(host, i) for host in ("a.test", "b.test", "c.test") for i in range(1, 7)]
+        resultados = _executar(urls, max_concorrentes=4, max_por_host=2)
+        assert all(r['sucesso'] for r in resultados)
+        assert max(scraper.pico_host.values()) <= 2
+        assert scraper.pico_total <= 4
+        assert scraper.pico_total > 2  # Hosts diferentes rodam em paralelo
+
+    def test_espera_do_host_nao_ocupa_vaga_global(self, ambiente):
+        scraper, _, _ = ambiente
+        scraper.duracao = 0
+        urls = [_url("a.test", i) for i in range(1, 4)] + [_url("b.test", 4)]
+        _executar(urls, max_concorrentes=1, max_por_host=2, intervalo_min=0.2)
+        # O host b não espera o intervalo do host a
+        assert scraper.inicios["b.test"][0] - scraper.inicios["a.test"][0] < 0.1
+
+    def test_intervalo_minimo_por_host(self, ambiente):
+        scraper, _, _ = ambiente
+        scraper.duracao = 0
+        urls = [_url("a.test", i) for i in range(1, 5)] + [_url("b.test", i) for i in range(5, 9)]
+        _executar(urls, max_por_host=4, intervalo_min=0.1)
+        for inicios in scraper.inicios.values():
+            intervalos = [b - a for a, b in zip(inicios, inicios[1:])]
+            assert min(intervalos) >= 0.09
+
+    def test_retentativas_e_falha(self, ambiente):
+        scraper, salvos, _ = ambiente
+        falha = f"{1:044d}"
+        scraper.falhas.add(falha)
+        resultado, = _executar([_url("a.test", 1)], tentativas=3)
+        assert scraper.chamadas[falha] == 3
+        assert resultado['tentativas'] == 3
+        assert not resultado['sucesso']
+        assert resultado['erro'].startswith("Falha na raspagem")
+        assert salvos == []
+
+    def test_backoff_exponencial(self, ambiente):
+        scraper, _, _ = ambiente
+        scraper.duracao = 0
+        scraper.falhas.add(f"{1:044d}")
+        _executar([_url("a.test", 1)], tentativas=3, backoff_base=0.05)
+        inicios = scraper.inicios["a.test"]
+        # Esperas de 0,05 e 0,1 s (mais até 25% de jitter)
+        assert 0.05 <= inicios[1] - inicios[0] < 0.1
+        assert 0.1 <= inicios[2] - inicios[1] < 0.18
+
+    def test_ao_concluir_uma_vez_por_url(self, ambiente):
+        _, salvos, _ = ambiente
+        urls = [_url("a.test", i) for i in range(1, 6)]
+        concluidos = []
+        resultados = _executar(urls, ao_concluir=concluidos.append)
+        assert sorted(r['url'] for r in concluidos) == sorted(urls)
+        assert concluidos == resultados
+        assert sorted(salvos) == sorted(f"{i:044d}" for i in range(1, 6))
+
+    def test_notas_em_cache_nao_chegam_ao_scraper(self, ambiente):
+        scraper, salvos, cache = ambiente
+        em_cache = f"{1:044d}"
+        cache.notas[em_cache] = ({'valor_total': 5.0}, [{'descricao_produto': "CACHE"}])
+        resultados = _executar([_url("a.test", 1), _url("a.test", 2)])
+        assert em_cache not in scraper.chamadas
+        assert scraper.chamadas[f"{2:044d}"] == 1
+        assert all(r['sucesso'] for r in resultados)
+        assert em_cache in salvos
+        assert lote_nfce.obter_metricas().contadores['cache_hit'] == 1
+
+    def test_url_sem_chave(self, ambiente):
+        scraper, _, _ = ambiente
+        resultado, = _executar(["https://a.test/sem-chave"])
+        assert resultado['erro'] == "Chave de acesso não encontrada na URL"
+        assert not scraper.chamadas
+
+    def test_chave_com_digito_errado(self, ambiente):
+        scraper, _, _ = ambiente
+        resultado, = _executar(["52250339346861034147651070004999491107141810"])
+        assert "dígito verificador" in resultado['erro']
+        assert not scraper.chamadas
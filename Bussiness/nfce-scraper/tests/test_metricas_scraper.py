@@ -0,0 +1,113 @@
+"""
+Testes para metricas_scraper.py
+"""
+
+import json
+import pytest
+import urllib.request
+from metricas_scraper import MetricasScraper, resumir_jsonl
+
+
+@pytest.fixture
+def metricas(tmp_path):
+    return MetricasScraper(arquivo=str(tmp_path / "metricas.jsonl"), limites=(0.5, 1))
+
+
+def ler_linhas(metricas):
+    with open(metricas.arquivo, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+class TestColetor:
+    """Testes de fases, eventos e histograma"""
+
+    def test_fases_e_eventos_da_raspagem(self, metricas):
+        with metricas.raspagem("http://sefaz/nota", "auto") as registro:
+            metricas.registrar_fase('navegacao', 0.2)
+            metricas.registrar_fase('navegacao', 0.1)
+            metricas.incrementar('timeout_espera')
+            registro['sucesso'] = True
+
+        linha = ler_linhas(metricas)[0]
+        assert linha['sucesso'] is True
+        assert linha['fases']['navegacao'] == pytest.approx(0.3)
+        assert linha['eventos'] == ['timeout_espera']
+        assert metricas.resumo()['fases']['navegacao']['contagem'] == 2
+
+    def test_raspagem_aninhada_conta_uma_vez(self, metricas):
+        with metricas.raspagem("url", "auto"):
+            with metricas.raspagem("url", "selenium") as interna:
+                interna['sucesso'] = True
+        assert metricas.raspagens == 1
+        assert ler_linhas(metricas)[0]['sucesso'] is True
+
+    def test_fase_fora_de_raspagem(self, metricas):
+        with metricas.fase('inicio_driver'):
+            pass
+        assert 'inicio_driver' in metricas.resumo()['fases']
+        assert metricas.raspagens == 0
+
+    def test_histograma(self, metricas):
+        for total in (0.1, 0.7, 3.0):
+            metricas.buckets[metricas._indice_bucket(total)] += 1
+        assert metricas.resumo()['histograma'] == {'0.5': 1, '1': 1, '+Inf': 1}
+
+    def test_sem_arquivo(self):
+        metricas = MetricasScraper(arquivo=None)
+        with metricas.raspagem("url"):
+            pass
+        assert metricas.raspagens == 1
+
+
+class TestExportadores:
+    """Testes do JSON lines agregado e do formato Prometheus"""
+
+    def test_resumir_jsonl(self, metricas):
+        for i in range(10):
+            with metricas.raspagem(f"url{i}") as registro:
+                metricas.registrar_fase('http_download', 0.1 * (i + 1))
+                if i % 2:
+                    metricas.incrementar('falha_parse_http')
+                registro['sucesso'] = i % 2 == 0
+
+        with open(metricas.arquivo, encoding="utf-8") as f:
+            resumo = resumir_jsonl(f)
+        assert resumo['raspagens'] == 10
+        assert resumo['sucessos'] == 5
+        assert resumo['eventos'] == {'falha_parse_http': 5}
+        assert resumo['fases']['http_download']['p50_s'] == pytest.approx(0.55)
+        assert resumo['fases']['http_download']['max_s'] == pytest.approx(1.0)
+
+    def test_texto_prometheus(self, metricas):
+        with metricas.raspagem("url"):
+            metricas.registrar_fase('extracao', 0.25)
+            metricas.incrementar('cache_miss')
+        texto = metricas.texto_prometheus()
+        assert 'nfce_scraper_eventos_total{evento="cache_miss"} 1' in texto
+        assert 'nfce_scraper_fase_segundos_count{fase="extracao"} 1' in texto
+        assert 'nfce_scraper_latencia_segundos_bucket{le="+Inf"} 1' in texto
+        assert 'nfce_scraper_latencia_segundos_count 1' in texto
+
+    def test_servidor_prometheus(self, metricas):
+        servidor = metricas.iniciar_servidor_prometheus(porta=0)
+        try:
+            url = f"http://127.0.0.1:{servidor.server_address[1]}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as resposta:
+                assert b"nfce_scraper_latencia_segundos_count 0" in resposta.read()
+        finally:
+            servidor.shutdown()
+            servidor.server_close()
+
+
+class TestInstrumentacaoScraper:
+    """O scraper registra as fases HTTP de cada raspagem"""
+
+    def test_raspagem_http(self, servidor_fixtures, metricas_isoladas):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        scraper_nfce.raspar_dados_nfce(f"{servidor_fixtures}/nfce_go.html", modo='http')
+        scraper_nfce.raspar_dados_nfce(f"{servidor_fixtures}/nfce_erro.html", modo='http')
+
+        resumo = metricas_isoladas.resumo()
+        assert resumo['raspagens'] == 2
+        assert resumo['fases']['http_download']['contagem'] == 2
+        assert resumo['eventos'] == {'falha_parse_http': 1}
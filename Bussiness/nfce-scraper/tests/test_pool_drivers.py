@@ -0,0 +1,205 @@
+"""
+Testes para pool_drivers.py
+"""
+
+import pytest
+import threading
+import time
+from pool_drivers import PoolDrivers
+
+
+class DriverFalso:
+    """Imita o WebDriver: registra as chamadas e pode falhar no reset"""
+
+    def __init__(self, numero):
+        self.numero = numero
+        self.paginas = []
+        self.fechado = False
+        self.falhar_reset = False
+
+    def execute_script(self, script):
+        pass
+
+    def delete_all_cookies(self):
+        if self.falhar_reset:
+            raise RuntimeError("chrome not reachable")
+
+    def get(self, url):
+        self.paginas.append(url)
+
+    def quit(self):
+        self.fechado = True
+
+
+@pytest.fixture
+def criados():
+    return []
+
+
+@pytest.fixture
+def fabrica(criados):
+    def criar():
+        driver = DriverFalso(len(criados))
+        criados.append(driver)
+        return driver
+    return criar
+
+
+class TestPoolDrivers:
+    """Testes do empréstimo e reciclagem de navegadores"""
+
+    def test_reutiliza_o_mais_quente(self, fabrica, criados):
+        pool = PoolDrivers(fabrica, tamanho=2)
+        pool.aquecer()
+        assert len(criados) == 2
+        with pool.driver() as primeiro:
+            pass
+        with pool.driver() as segundo:
+            pass
+        # LIFO: o que acabou de voltar é emprestado de novo
+        assert segundo is primeiro
+        assert len(criados) == 2
+
+    def test_reset_ao_devolver(self, fabrica):
+        pool = PoolDrivers(fabrica, tamanho=1)
+        with pool.driver() as driver:
+            driver.get("https://sefaz/nota")
+        assert driver.paginas[-1] == "about:blank"
+
+    def test_recicla_apos_max_paginas(self, fabrica, criados):
+        pool = PoolDrivers(fabrica, tamanho=1, max_paginas=3)
+        usados = []
+        for _ in range(4):
+            with pool.driver() as driver:
+                usados.append(driver)
+        assert usados[:3] == [criados[0]] * 3
+        assert criados[0].fechado
+        assert usados[3] is criados[1]
+
+    def test_descarta_driver_que_falha_no_reset(self, fabrica, criados):
+        pool = PoolDrivers(fabrica, tamanho=1)
+        with pool.driver() as driver:
+            driver.falhar_reset = True
+        assert driver.fechado
+        with pool.driver() as novo:
+            assert novo is not driver
+        assert len(criados) == 2
+
+    def test_timeout_sem_vagas(self, fabrica):
+        pool = PoolDrivers(fabrica, tamanho=1)
+        with pool.driver():
+            with pytest.raises(TimeoutError):
+                with pool.driver(timeout=0.05):
+                    pass
+
+    def test_vaga_liberada_apos_excecao(self, fabrica):
+        pool = PoolDrivers(fabrica, tamanho=1)
+        with pytest.raises(ValueError):
+            with pool.driver():
+                raise ValueError("falha na raspagem")
+        with pool.driver(timeout=0.05):
+            pass
+
+    def test_concorrencia_limitada_ao_tamanho(self, fabrica, criados):
+        pool = PoolDrivers(fabrica, tamanho=2)
+        dentro, pico, lock = [0], [0], threading.Lock()
+        barreira = threading.Barrier(4)
+
+        def raspar():
+            barreira.wait()
+            for _ in range(5):
+                with pool.driver(timeout=5):
+                    with lock:
+                        dentro[0] += 1
+                        pico[0] = max(pico[0], dentro[0])
+                    with lock:
+                        dentro[0] -= 1
+
+        threads = [threading.Thread(target=raspar) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert pico[0] <= 2
+        assert len(criados) <= 2
+
+    def test_aquecer_com_drivers_emprestados(self, fabrica, criados):
+        pool = PoolDrivers(fabrica, tamanho=2)
+        with pool.driver():
+            pool.aquecer()
+            # Um emprestado + um ocioso: não passa do tamanho do pool
+            assert len(criados) == 2
+        pool.aquecer()
+        assert len(criados) == 2
+
+    def test_encerrar_fecha_ociosos_e_devolvidos(self, fabrica, criados):
+        pool = PoolDrivers(fabrica, tamanho=2)
+        pool.aquecer()
+        with pool.driver() as emprestado:
+            pool.encerrar()
+            ocioso = next(driver for driver in criados if driver is not emprestado)
+            assert ocioso.fechado
+            assert not emprestado.fechado
+        assert emprestado.fechado
+        with pytest.raises(RuntimeError):
+            with pool.driver():
+                pass
+
+    def test_emprestimo_durante_aquecimento(self, criados):
+        abrindo = threading.Event()
+
+        def fabrica_lenta():
+            abrindo.set()
+            time.sleep(0.1)
+            driver = DriverFalso(len(criados))
+            criados.append(driver)
+            return driver
+
+        pool = PoolDrivers(fabrica_lenta, tamanho=1)
+        aquecimento = threading.Thread(target=pool.aquecer)
+        aquecimento.start()
+        abrindo.wait()
+        # A vaga já está reservada pelo aquecimento: o empréstimo espera esse navegador
+        with pool.driver(timeout=1) as driver:
+            assert driver is criados[0]
+        aquecimento.join()
+        assert len(criados) == 1
+
+    def test_encerrar_durante_aquecimento(self, criados):
+        abrindo, liberar = threading.Event(), threading.Event()
+
+        def fabrica_lenta():
+            abrindo.set()
+            liberar.wait()
+            driver = DriverFalso(len(criados))
+            criados.append(driver)
+            return driver
+
+        pool = PoolDrivers(fabrica_lenta, tamanho=2)
+        aquecimento = threading.Thread(target=pool.aquecer)
+        aquecimento.start()
+        abrindo.wait()
+        pool.encerrar()
+        liberar.set()
+        aquecimento.join()
+        # O navegador aberto depois do encerramento é fechado e nenhum outro é criado
+        assert len(criados) == 1
+        assert criados[0].fechado
+        assert pool._livres.empty()
+
+    def test_falha_da_fabrica_libera_a_vaga(self, criados):
+        falhar = [True]
+
+        def fabrica_instavel():
+            if falhar[0]:
+                falhar[0] = False
+                raise RuntimeError("chromedriver não iniciou")
+            driver = DriverFalso(len(criados))
+            criados.append(driver)
+            return driver
+
+        pool = PoolDrivers(fabrica_instavel, tamanho=1)
+        with pytest.raises(RuntimeError):
+            pool.aquecer()
+        pool.aquecer()
+        assert len(criados) == 1
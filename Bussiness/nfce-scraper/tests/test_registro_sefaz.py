@@ -0,0 +1,138 @@
+"""
+Testes para registro_sefaz.py e o despacho por UF em scraper_nfce.py
+"""
+
+import pytest
+from registro_sefaz import (
+    REGISTRO,
+    ChaveInvalida,
+    extrair_chave,
+    chave_valida,
+    obter_estado,
+    resolver,
+    resolver_url
+)
+from scraper_http import extrair_dados_html, extrair_dados_html_svrs
+
+CHAVE_GO = "52250339346861034147651070004999491107141815"
+CHAVE_RS = "43250692665611000177650010000482131000482130"
+CHAVE_SP = "35250644000000000100650010000001231000001235"  # UF não registrada
+
+
+class TestExtrairChave:
+    """Testes de extração da Chave de Acesso"""
+
+    def test_chave_pura(self):
+        assert extrair_chave(CHAVE_GO) == CHAVE_GO
+
+    def test_chave_digitada_em_blocos(self):
+        blocos = ' '.join(CHAVE_GO[i:i + 4] for i in range(0, 44, 4))
+        assert extrair_chave(blocos) == CHAVE_GO
+
+    def test_qr_code_v2(self):
+        url = f"http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p={CHAVE_GO}|2|1|1|ABC123"
+        assert extrair_chave(url) == CHAVE_GO
+
+    def test_qr_code_v3_sem_token(self):
+        assert extrair_chave(f"https://www.sefaz.rs.gov.br/NFCE/NFCE-COM.aspx?p={CHAVE_RS}|3|1") == CHAVE_RS
+
+    def test_parametro_chnfe(self):
+        assert extrair_chave(f"https://exemplo.gov.br/consulta?chNFe={CHAVE_RS}&nVersao=100") == CHAVE_RS
+
+    def test_sem_chave(self):
+        assert extrair_chave("http://127.0.0.1:8000/nfce_go.html") is None
+        assert extrair_chave("") is None
+
+
+class TestChaveValida:
+    """Testes do dígito verificador"""
+
+    def test_chaves_validas(self):
+        assert chave_valida(CHAVE_GO)
+        assert chave_valida(CHAVE_RS)
+
+    def test_digito_errado(self):
+        assert not chave_valida(CHAVE_GO[:-1] + '0')
+
+    def test_formato_invalido(self):
+        assert not chave_valida("123")
+
+
+class TestResolver:
+    """Testes do registro de UFs"""
+
+    def test_estado_pelo_codigo_da_uf(self):
+        assert obter_estado(CHAVE_GO).sigla == 'GO'
+        assert obter_estado(CHAVE_RS).extrator is extrair_dados_html_svrs
+        assert obter_estado(CHAVE_SP) is None
+
+    def test_chave_pura_monta_url(self):
+        chave, url, estado = resolver(CHAVE_RS)
+        assert chave == CHAVE_RS
+        assert url == f"{REGISTRO['43'].url_consulta}?p={CHAVE_RS}|3|1"
+        assert estado.sigla == 'RS'
+
+    def test_url_mantida(self):
+        url = f"http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p={CHAVE_GO}|2|1|1|ABC"
+        assert resolver_url(url) == url
+
+    def test_chave_com_digito_errado_e_rejeitada(self):
+        chave_errada = CHAVE_GO[:-1] + '0'
+        with pytest.raises(ChaveInvalida, match="dígito verificador"):
+            resolver(chave_errada)
+        with pytest.raises(ChaveInvalida):
+            resolver_url(chave_errada)
+
+    def test_url_com_digito_errado_mantida(self):
+        # Só a chave digitada é conferida; a URL do QR Code vai para a SEFAZ como veio
+        url = f"http://nfe.sefaz.go.gov.br/nfeweb/sites/nfce/danfeNFCe?p={CHAVE_GO[:-1]}0|2|1"
+        assert resolver_url(url) == url
+
+    def test_uf_nao_registrada(self):
+        assert resolver(CHAVE_SP) == (CHAVE_SP, None, None)
+
+
+class TestDespachoPorEstado:
+    """Testes de raspar_nfce usando o parser da UF"""
+
+    def test_outra_uf_usa_parser_proprio_sem_selenium(self, servidor_fixtures, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: pytest.fail("Selenium chamado"))
+
+        url = f"{servidor_fixtures}/nfce_svrs.html?p={CHAVE_RS}|3|1"
+        dados_nota, lista_itens = scraper_nfce.raspar_dados_nfce(url, modo='auto')
+        assert dados_nota['valor_total'] == 113.61
+        assert len(lista_itens) == 2
+
+    def test_outra_uf_com_falha_nao_abre_navegador(self, servidor_fixtures, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: pytest.fail("Selenium chamado"))
+
+        url = f"{servidor_fixtures}/nfce_erro.html?p={CHAVE_RS}|3|1"
+        assert scraper_nfce.raspar_dados_nfce(url, modo='selenium') == (None, None)
+
+    def test_uf_nao_registrada_falha_sem_acessar_a_rede(self, monkeypatch, metricas_isoladas):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_http", lambda *args: pytest.fail("HTTP chamado"))
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: pytest.fail("Selenium chamado"))
+
+        assert scraper_nfce.raspar_dados_nfce(CHAVE_SP) == (None, None)
+        assert metricas_isoladas.contadores['estado_nao_suportado'] == 1
+
+    def test_chave_pura_usa_url_e_parser_da_uf(self, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        chamadas = []
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_http",
+                            lambda url, extrator: chamadas.append((url, extrator)) or (None, None, None))
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: (None, None, None))
+
+        scraper_nfce.raspar_dados_nfce(CHAVE_GO, modo='auto')
+        assert chamadas == [(REGISTRO['52'].montar_url(CHAVE_GO), extrair_dados_html)]
+
+    def test_chave_com_digito_errado_nao_chega_ao_navegador(self, monkeypatch, metricas_isoladas):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_http", lambda *args: pytest.fail("HTTP chamado"))
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: pytest.fail("Selenium chamado"))
+
+        assert scraper_nfce.raspar_dados_nfce(CHAVE_GO[:-1] + '0', modo='auto') == (None, None)
+        assert metricas_isoladas.contadores['chave_invalida'] == 1
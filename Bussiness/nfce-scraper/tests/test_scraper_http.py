@@ -0,0 +1,237 @@
+"""
+Testes para scraper_http.py e o modo 'auto' de scraper_nfce.py
+"""
+
+import pytest
+from pathlib import Path
+from scraper_http import (
+    limpar_valor,
+    extrair_dados_html,
+    extrair_dados_html_svrs,
+    raspar_dados_nfce_http
+)
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def ler_fixture(nome):
+    return (FIXTURES_DIR / nome).read_text(encoding="utf-8")
+
+
+class TestLimparValor:
+    """Testes para limpeza de valores monetários"""
+
+    def test_valor_brasileiro(self):
+        assert limpar_valor("R$ 1.234,56") == 1234.56
+
+    def test_valor_vazio(self):
+        assert limpar_valor("") == 0.0
+
+    def test_valor_invalido(self):
+        assert limpar_valor("sem valor") == 0.0
+
+
+class TestExtrairDadosHtml:
+    """Testes de parse do HTML salvo da DANFE"""
+
+    def test_extrai_cabecalho(self):
+        dados_nota, _ = extrair_dados_html(ler_fixture("nfce_go.html"))
+        assert dados_nota['valor_total'] == 126.89
+        assert dados_nota['data_hora_nfce'] == "05/03/2025 18:42:10"
+
+    def test_extrai_itens(self):
+        _, lista_itens = extrair_dados_html(ler_fixture("nfce_go.html"))
+        assert len(lista_itens) == 5
+        assert lista_itens[0] == {
+            'descricao_produto': "ARROZ TIPO 1 5KG",
+            'quantidade': 1.0,
+            'unidade': "UN",
+            'preco_unitario': 24.90,
+            'total_item': 24.90
+        }
+        assert lista_itens[3]['quantidade'] == 1.235
+
+    def test_pagina_sem_estrutura(self):
+        assert extrair_dados_html(ler_fixture("nfce_erro.html")) == (None, None)
+
+    def test_html_vazio(self):
+        assert extrair_dados_html("") == (None, None)
+
+
+class TestExtrairDadosSvrs:
+    """Testes do parser do layout padrão (SVRS), usado por RS, DF e outras UFs"""
+
+    def test_extrai_cabecalho(self):
+        dados_nota, _ = extrair_dados_html_svrs(ler_fixture("nfce_svrs.html"))
+        assert dados_nota['valor_total'] == 113.61
+        assert dados_nota['data_hora_nfce'] == "14/06/2025 10:05:33"
+
+    def test_extrai_itens_sem_rotulos(self):
+        _, lista_itens = extrair_dados_html_svrs(ler_fixture("nfce_svrs.html"))
+        assert lista_itens[1] == {
+            'descricao_produto': 'PICANHA BOVINA KG',
+            'quantidade': 1.126,
+            'unidade': 'KG',
+            'preco_unitario': 69.90,
+            'total_item': 78.71
+        }
+
+    def test_layout_de_go_nao_casa(self):
+        assert extrair_dados_html_svrs(ler_fixture("nfce_go.html")) == (None, None)
+
+
+class TestRasparHttp:
+    """Testes de raspagem contra o servidor HTTP local"""
+
+    def test_raspa_pagina_valida(self, servidor_fixtures):
+        dados_nota, lista_itens = raspar_dados_nfce_http(f"{servidor_fixtures}/nfce_go.html")
+        assert dados_nota['valor_total'] == 126.89
+        assert len(lista_itens) == 5
+
+    def test_pagina_inexistente(self, servidor_fixtures):
+        assert raspar_dados_nfce_http(f"{servidor_fixtures}/nao_existe.html") == (None, None)
+
+
+class TestModoAuto:
+    """Testes do fallback HTTP -> Selenium em raspar_dados_nfce"""
+
+    def test_http_sucesso_nao_abre_navegador(self, servidor_fixtures, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        chamadas = []
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: chamadas.append(url))
+
+        dados_nota, _ = scraper_nfce.raspar_dados_nfce(f"{servidor_fixtures}/nfce_go.html", modo='auto')
+        assert dados_nota['valor_total'] == 126.89
+        assert chamadas == []
+
+    def test_falha_de_parse_usa_selenium(self, servidor_fixtures, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: ({'valor_total': 1.0}, [], "<html></html>"))
+
+        dados_nota, _ = scraper_nfce.raspar_dados_nfce(f"{servidor_fixtures}/nfce_erro.html", modo='auto')
+        assert dados_nota == {'valor_total': 1.0}
+
+    def test_modo_http_nao_usa_selenium(self, servidor_fixtures, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "raspar_nfce_selenium", lambda url: pytest.fail("Selenium chamado"))
+
+        assert scraper_nfce.raspar_dados_nfce(f"{servidor_fixtures}/nfce_erro.html", modo='http') == (None, None)
+
+
+class _DriverFalso:
+    """Simula o retorno de SCRIPT_EXTRACAO a partir de uma página salva, contando os RPCs."""
+
+    def __init__(self, pagina_html):
+        from lxml import html as lxml_html
+        documento = lxml_html.fromstring(pagina_html)
+        tabela = documento.xpath('//*[@id="tabProdutos"]')
+        self.retorno = {
+            'valor_total': documento.xpath('//*[contains(@class, "txtValorTotal")]')[0].text_content(),
+            'data_hora': documento.xpath('//*[@id="datEmi"]')[0].text_content().strip(),
+            'tabela': lxml_html.tostring(tabela[0], encoding='unicode') if tabela else None
+        }
+        self.chamadas = 0
+
+    def execute_script(self, script):
+        self.chamadas += 1
+        return self.retorno
+
+
+class TestExtracaoChamadaUnica:
+    """Testes da extração via um único execute_script (caminho Selenium)"""
+
+    def test_mesmo_resultado_do_parse_http(self):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        driver = _DriverFalso(ler_fixture("nfce_go.html"))
+
+        dados_nota, lista_itens = scraper_nfce.extrair_com_driver(driver)
+        dados_http, itens_http = extrair_dados_html(ler_fixture("nfce_go.html"))
+
+        assert driver.chamadas == 1
+        assert lista_itens == itens_http
+        assert dados_nota['valor_total'] == dados_http['valor_total']
+        assert dados_nota['data_hora_nfce'] == dados_http['data_hora_nfce']
+
+    def test_sem_tabela_levanta_erro(self):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        driver = _DriverFalso(ler_fixture("nfce_go.html"))
+        driver.retorno['tabela'] = None
+
+        with pytest.raises(ValueError):
+            scraper_nfce.extrair_com_driver(driver)
+
+
+class TestPerfisNavegador:
+    """Testes da seleção de perfil do navegador"""
+
+    def test_perfil_leve(self):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        config = scraper_nfce.obter_perfil('leve')
+        assert config['page_load_strategy'] == 'eager'
+        assert config['bloquear_recursos'] is True
+
+    def test_perfil_padrao_do_modulo(self, monkeypatch):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        monkeypatch.setattr(scraper_nfce, "PERFIL_NAVEGADOR", 'padrao')
+        assert scraper_nfce.obter_perfil()['page_load_strategy'] == 'normal'
+
+    def test_perfil_desconhecido(self):
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        with pytest.raises(ValueError):
+            scraper_nfce.obter_perfil('turbo')
+
+    @pytest.fixture
+    def chrome_falso(self, monkeypatch):
+        """Substitui webdriver.Chrome: guarda as Options recebidas e os comandos CDP"""
+        scraper_nfce = pytest.importorskip("scraper_nfce")
+        criados = []
+
+        class ChromeFalso:
+            def __init__(self, service=None, options=None):
+                self.options = options
+                self.comandos_cdp = []
+                criados.append(self)
+
+            def execute_cdp_cmd(self, comando, parametros):
+                self.comandos_cdp.append((comando, parametros))
+
+        monkeypatch.setattr(scraper_nfce.webdriver, "Chrome", ChromeFalso)
+        monkeypatch.setattr(scraper_nfce, "resolver_caminho_driver", lambda: "chromedriver")
+        return scraper_nfce, criados
+
+    def test_driver_perfil_leve(self, chrome_falso):
+        scraper_nfce, criados = chrome_falso
+        driver = scraper_nfce.iniciar_driver('leve')
+
+        assert criados == [driver]
+        assert driver.options.page_load_strategy == 'eager'
+        prefs = driver.options.experimental_options['prefs']
+        assert prefs["profile.managed_default_content_settings.images"] == 2
+        assert prefs["profile.managed_default_content_settings.fonts"] == 2
+        assert "--headless" in driver.options.arguments
+        assert "--disable-extensions" in driver.options.arguments
+        assert driver.comandos_cdp == [
+            ("Network.enable", {}),
+            ("Network.setBlockedURLs", {"urls": scraper_nfce.RECURSOS_BLOQUEADOS}),
+        ]
+        assert {"*.png", "*.woff2", "*.css"} <= set(scraper_nfce.RECURSOS_BLOQUEADOS)
+
+    def test_driver_perfil_padrao(self, chrome_falso):
+        scraper_nfce, _ = chrome_falso
+        driver = scraper_nfce.iniciar_driver('padrao')
+
+        assert driver.options.page_load_strategy == 'normal'
+        assert 'prefs' not in driver.options.experimental_options
+        assert "--disable-extensions" not in driver.options.arguments
+        assert driver.comandos_cdp == []
+
+    def test_driver_sem_cdp(self, chrome_falso, monkeypatch):
+        """Sem suporte a CDP o driver ainda é devolvido (as prefs continuam bloqueando imagens)"""
+        scraper_nfce, _ = chrome_falso
+
+        def sem_cdp(comando, parametros):
+            raise RuntimeError("CDP indisponível")
+
+        monkeypatch.setattr(scraper_nfce.webdriver.Chrome, "execute_cdp_cmd", staticmethod(sem_cdp))
+        driver = scraper_nfce.iniciar_driver('leve')
+        assert driver.options.experimental_options['prefs']
@@ -0,0 +1,119 @@
+# worker_nfce.py
+
+import os
+import time
+import socket
+import signal
+import argparse
+import threading
+
+from leitor_qr import extrair_hash_da_url
+from scraper_nfce import raspar_dados_nfce_com_cache, TAMANHO_POOL
+from salvador_csv import salvar_dados_em_csv
+from fila_jobs import obter_fila
+
+# --- Worker de Raspagem ---
+# Processo separado do Streamlit: consome a fila (fila_jobs.py) e é o único dono
+# dos navegadores. Rode em um terminal à parte:  python worker_nfce.py
+INTERVALO_OCIOSO = 0.5     # Segundos entre consultas à fila quando ela está vazia
+INTERVALO_HEARTBEAT = 5
+
+
+def processar_job(job):
+    """
+    Raspa e salva a nota de um job.
+
+    Returns:
+        Dict de resultado (itens, valor_total, veio_do_cache, nota_nova).
+
+    Raises:
+        RuntimeError se a raspagem não trouxer dados válidos.
+    """
+    hash_qr = job['hash_qr'] or extrair_hash_da_url(job['url'])
+    if not hash_qr:
+        raise RuntimeError("Chave de acesso não encontrada na URL")
+
+    dados_nota, lista_itens, veio_do_cache = raspar_dados_nfce_com_cache(job['url'], hash_qr)
+    if not dados_nota or not lista_itens:
+        raise RuntimeError("Não foi possível extrair dados válidos da NFC-e")
+
+    nota_nova = salvar_dados_em_csv(dados_nota, lista_itens, hash_qr)
+    return {
+        'hash_qr': hash_qr,
+        'itens': len(lista_itens),
+        'valor_total': dados_nota.get('valor_total'),
+        'veio_do_cache': veio_do_cache,
+        'nota_nova': nota_nova,
+    }
+
+
+class WorkerNfce:
+    """Pool de threads consumindo a fila; cada thread processa um job por vez."""
+
+    def __init__(self, fila=None, threads=TAMANHO_POOL, intervalo_ocioso=INTERVALO_OCIOSO):
+        self.fila = fila or obter_fila()
+        self.threads = threads
+        self.intervalo_ocioso = intervalo_ocioso
+        self.nome = f"{socket.gethostname()}:{os.getpid()}"
+        self._parar = threading.Event()
+
+    def executar(self):
+        """Bloqueia até parar() ser chamado (ou SIGINT/SIGTERM no main)."""
+        print(f"--- WORKER {self.nome}: {self.threads} threads consumindo a fila ---")
+        self.fila.registrar_worker(self.nome)
+        consumidores = [
+            threading.Thread(target=self._consumir, name=f"worker-{i}", daemon=True)
+            for i in range(self.threads)
+        ]
+        for consumidor in consumidores:
+            consumidor.start()
+
+        try:
+            while not self._parar.wait(INTERVALO_HEARTBEAT):
+                self.fila.registrar_worker(self.nome)
+        finally:
+            self._parar.set()
+            for consumidor in consumidores:
+                consumidor.join()
+            self.fila.remover_worker(self.nome)
+            print(f"--- WORKER {self.nome} encerrado ---")
+
+    def parar(self):
+        self._parar.set()
+
+    def _consumir(self):
+        nome_thread = f"{self.nome}/{threading.current_thread().name}"
+        while not self._parar.is_set():
+            job = self.fila.reservar(nome_thread)
+            if job is None:
+                self._parar.wait(self.intervalo_ocioso)
+                continue
+
+            inicio = time.perf_counter()
+            try:
+                resultado = processar_job(job)
+            except Exception as e:
+                print(f"[job {job['id']}] FALHA (tentativa {job['tentativas']}): {e}")
+                self.fila.falhar(job['id'], e)
+                continue
+
+            self.fila.concluir(job['id'], resultado)
+            print(f"[job {job['id']}] OK {resultado['itens']} itens em {time.perf_counter() - inicio:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker que consome a fila de raspagens de NFC-e.")
+    parser.add_argument('--threads', type=int, default=TAMANHO_POOL,
+                        help="Raspagens simultâneas (use o mesmo valor de TAMANHO_POOL)")
+    args = parser.parse_args(argv)
+
+    worker = WorkerNfce(threads=args.threads)
+    signal.signal(signal.SIGTERM, lambda *_: worker.parar())
+    try:
+        worker.executar()
+    except KeyboardInterrupt:
+        worker.parar()
+
+
+if __name__ == '__main__':
+    main()